@@ -1,13 +1,31 @@
+import os
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 
-from .database import engine
+from .database import engine, SessionLocal
 from . import models
 from .routers import sync, trabajos, chat, analytics, auth   #IMPORTAMOS LOS ROUTERS
+from .services.sync_jobs import iniciar_reconciliacion
+from .services.daily_rollup import asegurar_resumen
+from .services.status_summary import asegurar_categorias
+
+# Logs estructurados del ETL (logger "app.etl": tiempos por etapa de cada corrida)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s %(message)s")
 
 # 1️⃣ Crear tablas (solo en desarrollo)
+# pg_trgm: índices trigram de la búsqueda ?q= en /api/trabajos y /api/clientes
+with engine.begin() as conn:
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
 models.Base.metadata.create_all(bind=engine)
 
+# create_all no agrega índices nuevos a tablas que ya existían: se crean aquí si faltan
+for tabla in (models.OrdenTrabajo.__table__, models.VisitaCampo.__table__,
+              models.Cliente.__table__, models.Equipo.__table__, models.Tecnico.__table__):
+    for indice in tabla.indexes:
+        indice.create(bind=engine, checkfirst=True)
+
 app = FastAPI(
     title="Sistema de Productividad Técnica",
     version="2.0.0"
@@ -20,6 +38,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],  # Cursor de la página siguiente y total en los listados
 )
 
 # 3️⃣ RUTAS
@@ -29,6 +48,31 @@ app.include_router(chat.router)
 app.include_router(analytics.router)
 app.include_router(auth.router)
 
+# Reconciliación periódica (pull completo) si SYNC_RECONCILIAR_MINUTOS > 0
+@app.on_event("startup")
+def arrancar_reconciliacion():
+    iniciar_reconciliacion()
+
+
+# Resumen diario de analítica: se construye una vez si la base ya tenía órdenes
+@app.on_event("startup")
+def preparar_resumen_diario():
+    db = SessionLocal()
+    try:
+        asegurar_resumen(db)
+    finally:
+        db.close()
+
+
+# Reglas por defecto estado -> categoría del resumen de estados (solo si la tabla está vacía)
+@app.on_event("startup")
+def preparar_categorias_estado():
+    db = SessionLocal()
+    try:
+        asegurar_categorias(db)
+    finally:
+        db.close()
+
 # 4️⃣ HEALTH CHECK
 @app.get("/")
 def read_root():
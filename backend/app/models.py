@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Boolean, JSON, Float, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import text
 from .database import Base
 from datetime import datetime
 
@@ -24,6 +25,11 @@ class Industria(Base):
 
 class Tecnico(Base):
     __tablename__ = "tecnicos"
+    __table_args__ = (
+        # Búsqueda por técnico dentro de ?q= de /api/trabajos
+        Index("ix_tecnicos_nombre_trgm", "nombre_completo", postgresql_using="gin",
+              postgresql_ops={"nombre_completo": "gin_trgm_ops"}),
+    )
     id = Column(Integer, primary_key=True, index=True)
     nombre_completo = Column(String, unique=True, index=True)
     activo = Column(Boolean, default=True)
@@ -37,8 +43,18 @@ class TipoServicio(Base):
 
 # --- TABLAS PRINCIPALES ---
 
+# Texto de búsqueda libre (?q=) con índice trigram (pg_trgm) sobre la MISMA expresión: el filtro
+# ILIKE '%q%' de los listados solo usa el índice si la expresión coincide exactamente.
+BUSQUEDA_CLIENTES_SQL = "(coalesce(nombre_fiscal, '') || ' ' || coalesce(ruc, '') || ' ' || id_cliente_appsheet)"
+BUSQUEDA_ORDENES_SQL = ("(id_appsheet || ' ' || coalesce(no_orden_taller, '') || ' ' "
+                        "|| coalesce(observaciones, '') || ' ' || coalesce(dano_reportado, ''))")
+
+
 class Cliente(Base):
     __tablename__ = "clientes"
+    __table_args__ = (
+        Index("ix_clientes_busqueda_trgm", text(f"{BUSQUEDA_CLIENTES_SQL} gin_trgm_ops"), postgresql_using="gin"),
+    )
 
     id_cliente_appsheet = Column(String, primary_key=True)  # ID Original del Excel
     clave = Column(String, nullable=True)
@@ -63,6 +79,10 @@ class Cliente(Base):
 
 class Equipo(Base):
     __tablename__ = "equipos"
+    __table_args__ = (
+        # Búsqueda por serie dentro de ?q= de /api/trabajos
+        Index("ix_equipos_serie_trgm", "serie", postgresql_using="gin", postgresql_ops={"serie": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     # Identificación única compuesta (opcional, aquí usamos auto-id para flexibilidad)
@@ -85,6 +105,15 @@ class Equipo(Base):
 
 class OrdenTrabajo(Base):
     __tablename__ = "ordenes_trabajo"  # Antes TrabajoTecnico
+    __table_args__ = (
+        # Paginación por cursor de /api/trabajos (ORDER BY fecha_ingreso DESC, id_appsheet DESC)
+        Index("ix_ordenes_fecha_id", "fecha_ingreso", "id_appsheet"),
+        # Filtros de /api/trabajos (y búsqueda por cliente/técnico/serie, que llega como IN de IDs)
+        Index("ix_ordenes_tecnico_fecha", "tecnico_id", "fecha_ingreso", "id_appsheet"),
+        Index("ix_ordenes_cliente", "cliente_id"),
+        Index("ix_ordenes_equipo", "equipo_id"),
+        Index("ix_ordenes_busqueda_trgm", text(f"{BUSQUEDA_ORDENES_SQL} gin_trgm_ops"), postgresql_using="gin"),
+    )
 
     id_appsheet = Column(String, primary_key=True)
     fecha_ingreso = Column(Date, index=True)
@@ -117,6 +146,10 @@ class OrdenTrabajo(Base):
 
 class VisitaCampo(Base):
     __tablename__ = "visitas_campo"
+    __table_args__ = (
+        # Paginación por cursor de /api/campo (ORDER BY ultima_fecha DESC, id_campo_appsheet DESC)
+        Index("ix_visitas_fecha_id", "ultima_fecha", "id_campo_appsheet"),
+    )
 
     id_campo_appsheet = Column(String, primary_key=True)
     codigo = Column(String, nullable=True)
@@ -137,4 +170,95 @@ class VisitaCampo(Base):
     tecnico1_rel = relationship("Tecnico", foreign_keys=[tecnico1_id])
     tecnico2_rel = relationship("Tecnico", foreign_keys=[tecnico2_id])
 
-    ultima_actualizacion = Column(DateTime, default=datetime.now)
\ No newline at end of file
+    ultima_actualizacion = Column(DateTime, default=datetime.now)
+
+# --- RESÚMENES PARA ANALÍTICA ---
+
+class ResumenDiarioOrdenes(Base):
+    """Órdenes por día, técnico, servicio, ciudad y estado (ver services/daily_rollup.py)."""
+    __tablename__ = "resumen_diario_ordenes"
+
+    id = Column(Integer, primary_key=True)
+    fecha = Column(Date, index=True)
+    tecnico_id = Column(Integer, nullable=True)
+    servicio_id = Column(Integer, nullable=True)
+    con_cliente = Column(Boolean, default=True)  # False si la orden no tiene cliente registrado
+    ciudad = Column(String, nullable=True)
+    estado = Column(String, nullable=True)
+    ordenes = Column(Integer, default=0)
+
+class CategoriaEstado(Base):
+    """Regla estado de la hoja -> categoría canónica del resumen de estados (ver services/status_summary.py)."""
+    __tablename__ = "categorias_estado"
+
+    patron = Column(String, primary_key=True)  # Texto que debe contener el estado (sin distinguir mayúsculas)
+    categoria = Column(String)                  # terminado, en_proceso, pendiente...
+    prioridad = Column(Integer, default=100)    # Gana la regla de menor prioridad si varias coinciden
+
+class InformeIA(Base):
+    """Informe de Gemini memorizado por huella de las métricas + versión del prompt (ver services/insight_cache.py)."""
+    __tablename__ = "informes_ia"
+
+    huella = Column(String(64), primary_key=True)  # sha256 de métricas + PROMPT_VERSION + modelo
+    prompt_version = Column(String)
+    modelo = Column(String)
+    periodo = Column(String, nullable=True)
+    contenido = Column(Text)
+    creado = Column(DateTime, default=datetime.now)
+
+# --- TABLAS DE CONTROL ETL ---
+
+class HuellaFila(Base):
+    """Hash del contenido normalizado de cada fila de origen, para la sincronización incremental."""
+    __tablename__ = "huellas_sync"
+
+    tabla = Column(String, primary_key=True)      # Tabla destino (ej. 'ordenes_trabajo')
+    id_origen = Column(String, primary_key=True)  # id_appsheet / id_campo_appsheet / id_cliente_appsheet
+    huella = Column(String(32))
+    actualizado = Column(DateTime, default=datetime.now)
+
+
+class VersionDatos(Base):
+    """Contador por tabla que el ETL incrementa en cada commit con cambios (ver services/data_version.py)."""
+    __tablename__ = "versiones_datos"
+
+    tabla = Column(String, primary_key=True)  # Tabla destino (ej. 'ordenes_trabajo')
+    version = Column(Integer, default=0)
+    actualizado = Column(DateTime, default=datetime.now)
+
+
+class TrabajoSync(Base):
+    """Ejecución en segundo plano de una sincronización (ver services/sync_jobs.py)."""
+    __tablename__ = "sync_jobs"
+
+    id = Column(String, primary_key=True)  # uuid
+    hoja = Column(String, index=True)      # 'clientes', 'ingresos', 'campo' o 'todo'
+    estado = Column(String, index=True)    # pendiente, ejecutando, completado, error, abandonado
+    filas_leidas = Column(Integer, default=0)
+    filas_transformadas = Column(Integer, default=0)
+    filas_cargadas = Column(Integer, default=0)
+    iniciado = Column(DateTime, default=datetime.now)
+    finalizado = Column(DateTime, nullable=True)
+    resultado = Column(JSON, nullable=True)
+
+
+class CorridaSync(Base):
+    """Historial de corridas del ETL con tiempos por etapa (ver services/etl_metrics.py)."""
+    __tablename__ = "sync_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, nullable=True)
+    hoja = Column(String, index=True)
+    estado = Column(String)                 # success, warning, error
+    iniciado = Column(DateTime, default=datetime.now, index=True)
+    segundos = Column(Float)
+    filas_leidas = Column(Integer, default=0)
+    filas_transformadas = Column(Integer, default=0)
+    filas_cargadas = Column(Integer, default=0)
+    filas_por_segundo = Column(Float, nullable=True)
+    sentencias_sql = Column(Integer, default=0)
+    segundos_sql = Column(Float, default=0)
+    llamadas_api = Column(Integer, default=0)  # Google Sheets
+    bytes_api = Column(Integer, default=0)
+    etapas = Column(JSON, nullable=True)       # {descarga, transformacion, resolucion, carga} en segundos
+    error = Column(Text, nullable=True)
@@ -1,16 +1,84 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc
+from fastapi import APIRouter, Depends, Query
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sqlalchemy import func, desc, cast, select, literal_column, text, DateTime
 from app.database import get_db
-from app.models import OrdenTrabajo, Cliente, Tecnico, TipoServicio, Equipo
-from app.services.analytics_service import generar_analisis_estrategico
+from app.models import OrdenTrabajo, Cliente, Tecnico, TipoServicio
+from app.services.insight_cache import obtener_informe
+from app.services.dashboard_queries import (
+    GRANULARIDADES, SQL_REINCIDENCIAS_KPI, SQL_REINCIDENCIAS_TECNICO, SQL_REINCIDENCIAS_CLIENTE,
+    kpi_calidad, metricas_una_consulta
+)
+from app.services.dashboard_cache import CACHE_DASHBOARD
+from app.services.conditional_get import condicional
 from datetime import date, timedelta
 from typing import Optional
 
 router = APIRouter(prefix="/api/analytics", tags=["Analítica"])
 
+GRANULARIDAD = Query("month", pattern="^(day|week|month|quarter)$")
+
+# Ventana (días) para considerar que un equipo volvió por la misma falla
+DIAS_REINCIDENCIA = Query(30, ge=1, le=365)
+
+# modo=resumen: secciones desde el resumen diario, KPI desde las órdenes (una sentencia)
+# modo=unico: todas las secciones desde las órdenes en una sentencia | modo=multiple: una consulta por sección
+MODO_DASHBOARD = Query("resumen", pattern="^(resumen|unico|multiple)$")
+
+
+def obtener_tendencias(db: Session, start_date: date, end_date: date, granularity: str = "month"):
+    """
+    Conteo de órdenes por periodo agrupado en el servidor (date_trunc + GROUP BY).
+    generate_series completa los periodos sin órdenes con 0 para que el gráfico no tenga huecos.
+    """
+    campo, paso, formato = GRANULARIDADES[granularity]
+    # El campo va como literal (viene de la lista blanca) para que SELECT y GROUP BY coincidan
+    truncar = lambda valor: func.date_trunc(literal_column(f"'{campo}'"), cast(valor, DateTime))
+
+    periodo = truncar(OrdenTrabajo.fecha_ingreso)
+    conteo = (
+        db.query(periodo.label("periodo"), func.count().label("total"))
+        .filter(OrdenTrabajo.fecha_ingreso >= start_date, OrdenTrabajo.fecha_ingreso <= end_date)
+        .group_by(periodo)
+        .subquery()
+    )
+    serie = select(
+        func.generate_series(truncar(start_date), truncar(end_date), literal_column(f"interval '{paso}'")).label("periodo")
+    ).subquery()
+
+    filas = (
+        db.query(func.to_char(serie.c.periodo, formato), func.coalesce(conteo.c.total, 0))
+        .outerjoin(conteo, conteo.c.periodo == serie.c.periodo)
+        .order_by(serie.c.periodo)
+        .all()
+    )
+    return [{"date": f[0], "count": f[1]} for f in filas]
+
+
+def obtener_reincidencias(db: Session, start_date: date, end_date: date, dias: int = 30):
+    """
+    KPI de calidad sin materializar órdenes: series repetidas en el periodo (misma regla de
+    siempre) más las reincidencias dentro de `dias`, desglosadas por técnico y por cliente.
+    """
+    params = {"inicio": start_date, "fin": end_date, "dias": dias}
+    kpi = db.execute(text(SQL_REINCIDENCIAS_KPI), params).one()
+    por_tecnico = db.execute(text(SQL_REINCIDENCIAS_TECNICO), params).all()
+    por_cliente = db.execute(text(SQL_REINCIDENCIAS_CLIENTE), params).all()
+
+    return kpi_calidad(
+        kpi.total, kpi.series_repetidas, kpi.en_ventana, dias,
+        [{"name": r.nombre, "count": r.reincidencias} for r in por_tecnico],
+        [{"id": r.cliente_id, "name": r.nombre, "count": r.reincidencias} for r in por_cliente],
+    )
+
+
+def obtener_metricas_raw(db: Session, start_date: date, end_date: date, granularity: str = "month",
+                         dias: int = 30, modo: str = "resumen"):
+    if modo == "resumen":
+        return metricas_una_consulta(db, start_date, end_date, granularity, dias, fuente="resumen")
+    if modo == "unico":
+        return metricas_una_consulta(db, start_date, end_date, granularity, dias)
 
-def obtener_metricas_raw(db: Session, start_date: date, end_date: date):
     # 1. RENDIMIENTO TÉCNICO (Usando tabla Tecnico relacionada)
     tech_perf = (
         db.query(
@@ -25,17 +93,8 @@ def obtener_metricas_raw(db: Session, start_date: date, end_date: date):
     )
     tech_data = [{"name": t[0], "total": t[1]} for t in tech_perf]
 
-    # 2. TENDENCIAS (Por Mes)
-    jobs = db.query(OrdenTrabajo.fecha_ingreso).filter(
-        OrdenTrabajo.fecha_ingreso >= start_date, OrdenTrabajo.fecha_ingreso <= end_date
-    ).all()
-
-    trends_map = {}
-    for j in jobs:
-        if j.fecha_ingreso:
-            key = j.fecha_ingreso.strftime("%Y-%m")
-            trends_map[key] = trends_map.get(key, 0) + 1
-    trends_data = [{"date": k, "count": v} for k, v in sorted(trends_map.items())]
+    # 2. TENDENCIAS (día / semana / mes / trimestre, agrupadas en el servidor)
+    trends_data = obtener_tendencias(db, start_date, end_date, granularity)
 
     # 3. SERVICIOS (Usando tabla TipoServicio relacionada)
     serv_dist = (
@@ -59,44 +118,8 @@ def obtener_metricas_raw(db: Session, start_date: date, end_date: date):
     )
     loc_data = [{"city": l[0] or "S/N", "count": l[1]} for l in loc_dist]
 
-    # 5. CÁLCULO DE CALIDAD (ALGORITMO DE REINCIDENCIA)
-    # Traemos las órdenes con sus equipos para analizar series repetidas
-    ordenes_raw = (
-        db.query(OrdenTrabajo)
-        .join(Equipo, OrdenTrabajo.equipo_id == Equipo.id)
-        .filter(OrdenTrabajo.fecha_ingreso >= start_date, OrdenTrabajo.fecha_ingreso <= end_date)
-        .options(joinedload(OrdenTrabajo.equipo_rel))
-        .all()
-    )
-
-    # Agrupar por serie
-    equipos_vistos = {}
-    reincidencias = 0
-    total_ordenes = len(ordenes_raw)
-
-    for orden in ordenes_raw:
-        if orden.equipo_rel and orden.equipo_rel.serie:
-            serie = orden.equipo_rel.serie.upper()
-            if len(serie) > 3 and serie != "S/N":  # Ignorar series basura
-                if serie in equipos_vistos:
-                    # ¡Ya vimos esta serie en este periodo! Es una reincidencia.
-                    equipos_vistos[serie] += 1
-                    if equipos_vistos[serie] == 2:  # Contamos solo cuando se repite la primera vez
-                        reincidencias += 1
-                else:
-                    equipos_vistos[serie] = 1
-
-    # Fórmula KPI
-    tasa_calidad = 100
-    if total_ordenes > 0:
-        pct_fallas = (reincidencias / total_ordenes) * 100
-        tasa_calidad = round(max(0, 100 - pct_fallas), 1)
-
-    kpi_data = {
-        "total_trabajos": total_ordenes,
-        "reincidencias_detectadas": reincidencias,
-        "tasa_calidad": tasa_calidad
-    }
+    # 5. CÁLCULO DE CALIDAD (REINCIDENCIA, resuelta en SQL)
+    kpi_data = obtener_reincidencias(db, start_date, end_date, dias)
 
     return {
         "periodo": f"{start_date} al {end_date}",
@@ -108,20 +131,31 @@ def obtener_metricas_raw(db: Session, start_date: date, end_date: date):
     }
 
 
-@router.get("/dashboard")
+CACHE_DASHBOARD.calcular = obtener_metricas_raw
+
+
+# ETag / 304 según la versión de las tablas que alimentan el dashboard
+@router.get("/dashboard", dependencies=[Depends(condicional(OrdenTrabajo.__tablename__, Cliente.__tablename__))])
 def get_analytics_dashboard(start_date: Optional[date] = None, end_date: Optional[date] = None,
-                            db: Session = Depends(get_db)):
+                            granularity: str = GRANULARIDAD, dias: int = DIAS_REINCIDENCIA,
+                            modo: str = MODO_DASHBOARD, db: Session = Depends(get_db)):
     if not end_date: end_date = date.today()
     if not start_date: start_date = end_date - timedelta(days=180)
-    return obtener_metricas_raw(db, start_date, end_date)
+    return CACHE_DASHBOARD.obtener(db, start_date, end_date, granularity, dias, modo)
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """Aciertos/fallos de la caché del dashboard en este proceso."""
+    return CACHE_DASHBOARD.estadisticas()
 
 
 @router.get("/insight")
-def get_ai_insight(start_date: Optional[date] = None, end_date: Optional[date] = None, db: Session = Depends(get_db)):
+async def get_ai_insight(start_date: Optional[date] = None, end_date: Optional[date] = None, db: Session = Depends(get_db)):
     if not end_date: end_date = date.today()
     if not start_date: start_date = end_date - timedelta(days=180)
 
-    raw = obtener_metricas_raw(db, start_date, end_date)
-    # Convertimos a formato simple para que la IA entienda
-    texto = generar_analisis_estrategico(raw)
-    return {"content": texto}
\ No newline at end of file
+    # Async: la espera a Gemini no ocupa un hilo del threadpool; el SQL sí va al threadpool
+    raw = await run_in_threadpool(CACHE_DASHBOARD.obtener, db, start_date, end_date)
+    # Mismas métricas => mismo informe: se reutiliza el guardado o la llamada en curso
+    return await obtener_informe(db, raw)
\ No newline at end of file
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from app.database import get_db
 from app.services.chat_service import interpretar_intencion, buscar_datos_y_generar_excel
+from app.services.llm_gateway import estado_llm
 import base64
 
 router = APIRouter(prefix="/api/chat", tags=["IA"])
@@ -13,9 +15,9 @@ class MensajeUsuario(BaseModel):
 
 
 @router.post("/mensaje")
-def procesar_mensaje(mensaje: MensajeUsuario, db: Session = Depends(get_db)):
-    # 1. La IA entiende qué quiere el usuario
-    intencion_data = interpretar_intencion(mensaje.texto)
+async def procesar_mensaje(mensaje: MensajeUsuario, db: Session = Depends(get_db)):
+    # 1. La IA entiende qué quiere el usuario (async: no retiene un hilo mientras Gemini responde)
+    intencion_data = await interpretar_intencion(mensaje.texto)
 
     if not intencion_data:
         return {"tipo": "texto",
@@ -23,7 +25,7 @@ def procesar_mensaje(mensaje: MensajeUsuario, db: Session = Depends(get_db)):
 
     # 2. Si quiere reporte, buscamos en DB
     if intencion_data.get("intencion") == "reporte_tecnico":
-        archivo_excel, respuesta = buscar_datos_y_generar_excel(intencion_data, db)
+        archivo_excel, respuesta = await run_in_threadpool(buscar_datos_y_generar_excel, intencion_data, db)
 
         # Si archivo_excel es None, respuesta es el mensaje de error ("No se encontró...")
         if archivo_excel is None:
@@ -43,4 +45,10 @@ def procesar_mensaje(mensaje: MensajeUsuario, db: Session = Depends(get_db)):
         }
 
     return {"tipo": "texto",
-            "contenido": "Entendí tu mensaje, pero por ahora solo sé generar reportes de técnicos. ¡Prueba pidiéndome uno!"}
\ No newline at end of file
+            "contenido": "Entendí tu mensaje, pero por ahora solo sé generar reportes de técnicos. ¡Prueba pidiéndome uno!"}
+
+
+@router.get("/llm")
+def get_estado_llm():
+    """Estado del circuito y latencia/errores por modelo de este proceso."""
+    return estado_llm()
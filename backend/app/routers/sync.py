@@ -1,18 +1,82 @@
-from fastapi import APIRouter, Depends
+import os
+import hmac
+from fastapi import APIRouter, HTTPException, Query, Header, Depends
+from fastapi.encoders import jsonable_encoder
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.services.etl_service import ejecutar_etl_clientes, ejecutar_etl_ingresos, ejecutar_etl_campo
+from app.schemas import LoteEventosSync
+from app.services.event_ingest import aplicar_eventos
+from app.services.etl_metrics import listar_corridas
+from app.services.sync_jobs import encolar_sync, obtener_job, SyncEnCurso
+from app.services.sheets_client import estado_cliente
 
 router = APIRouter(prefix="/api/sync", tags=["Sincronización"])
 
-@router.post("/clientes")
-def sync_clientes(db: Session = Depends(get_db)):
-    return ejecutar_etl_clientes(db)
+# Las sincronizaciones corren en segundo plano: el POST devuelve un job_id
+# y el avance se consulta en GET /api/sync/jobs/{job_id}
 
-@router.post("/ingresos")
-def sync_ingresos(db: Session = Depends(get_db)):
-    return ejecutar_etl_ingresos(db)
+# Token compartido con el webhook de AppSheet. /events puede borrar órdenes y clientes: sin
+# token configurado responde 503 (solo para desarrollo local: SYNC_WEBHOOK_SIN_TOKEN=1)
+SYNC_WEBHOOK_TOKEN = os.getenv("SYNC_WEBHOOK_TOKEN")
+SYNC_WEBHOOK_SIN_TOKEN = os.getenv("SYNC_WEBHOOK_SIN_TOKEN", "0") == "1"
 
-@router.post("/campo")
-def sync_campo(db: Session = Depends(get_db)):
-    return ejecutar_etl_campo(db)
\ No newline at end of file
+def _encolar(hoja, tamano_lote, forzar, modo):
+    try:
+        return encolar_sync(hoja, tamano_lote, forzar, modo)
+    except SyncEnCurso as e:
+        raise HTTPException(status_code=409, detail=jsonable_encoder({"estado": "en_curso", "mensaje": str(e), "job": e.job}))
+
+# modo=lotes: INSERT multi-fila por lotes (diario) | modo=copy: COPY a staging + merge SQL (backfills)
+MODO = Query("lotes", pattern="^(lotes|copy)$")
+
+# Filas por INSERT multi-fila (por defecto ETL_BATCH_SIZE)
+TAMANO_LOTE = Query(None, ge=1)
+
+@router.post("/clientes", status_code=202)
+def sync_clientes(tamano_lote: Optional[int] = TAMANO_LOTE, forzar: bool = False, modo: str = MODO):
+    return _encolar("clientes", tamano_lote, forzar, modo)
+
+@router.post("/ingresos", status_code=202)
+def sync_ingresos(tamano_lote: Optional[int] = TAMANO_LOTE, forzar: bool = False, modo: str = MODO):
+    return _encolar("ingresos", tamano_lote, forzar, modo)
+
+@router.post("/campo", status_code=202)
+def sync_campo(tamano_lote: Optional[int] = TAMANO_LOTE, forzar: bool = False, modo: str = MODO):
+    return _encolar("campo", tamano_lote, forzar, modo)
+
+@router.post("/todo", status_code=202)
+def sync_todo(tamano_lote: Optional[int] = TAMANO_LOTE, forzar: bool = False, modo: str = MODO):
+    """Pipeline completo: una sola descarga de las tres pestañas y carga en orden de FKs."""
+    return _encolar("todo", tamano_lote, forzar, modo)
+
+@router.get("/jobs/{job_id}")
+def estado_sync(job_id: str):
+    job = obtener_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
+
+@router.get("/runs")
+def corridas_sync(hoja: Optional[str] = None, limite: int = Query(20, ge=1, le=200)):
+    """Historial de corridas: tiempos por etapa, filas/seg, sentencias SQL y consumo de la API."""
+    return listar_corridas(hoja, limite)
+
+@router.get("/sheets-api")
+def consumo_sheets():
+    """Consumo acumulado de la API de Google Sheets (llamadas, bytes, tiempo de red) y estado del token."""
+    return estado_cliente()
+
+@router.post("/events")
+def sync_eventos(lote: LoteEventosSync, db: Session = Depends(get_db),
+                 x_webhook_token: Optional[str] = Header(None)):
+    """
+    Cambios fila a fila (upsert/delete) enviados por webhooks de AppSheet.
+    Cada evento se aplica en su propia transacción con el mismo mapeo y carga del ETL.
+    """
+    if not SYNC_WEBHOOK_TOKEN:
+        if not SYNC_WEBHOOK_SIN_TOKEN:
+            raise HTTPException(status_code=503, detail="Webhook deshabilitado: falta SYNC_WEBHOOK_TOKEN")
+    elif not hmac.compare_digest(x_webhook_token or "", SYNC_WEBHOOK_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de webhook inválido")
+    return aplicar_eventos(db, [e.model_dump() for e in lote.eventos])
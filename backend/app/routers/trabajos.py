@@ -1,57 +1,266 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+from itertools import islice
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, union, literal, literal_column
 from sqlalchemy.orm import Session, joinedload
-from typing import List
-from ..database import get_db
+from typing import List, Optional, Union
+from ..database import get_db, SessionLocal
 from .. import models, schemas
+from ..services.compact_payload import ordenes_compactas
+from ..services.status_summary import resumen_estados, clasificacion_estados
+from ..services.conditional_get import condicional, CABECERAS_CACHE
+from ..services.pagination import (
+    CursorInvalido, codificar_cursor, decodificar_cursor, ordenar, despues_de, paginar, contar
+)
 
 router = APIRouter(
     prefix="/api",
     tags=["Operaciones"]
 )
 
+# Paginación: ?limit=N y, para la página siguiente, ?cursor=<valor del header X-Next-Cursor>.
+# Sin X-Next-Cursor en la respuesta no hay más páginas. `skip` queda por compatibilidad (OFFSET).
+# La primera página (sin cursor) trae además X-Total-Count con el total de filas que cumplen
+# los filtros; las siguientes no lo recalculan.
+#
+# Streaming: con `Accept: application/x-ndjson` la respuesta es una fila JSON por línea, leída
+# de un cursor del servidor (yield_per) y serializada por lotes: la memoria no crece con el
+# total y el primer byte sale con el primer lote. Sin `limit` transmite todo desde el cursor.
+LIMITE = Query(None, ge=1)
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO_JSON = 5000
+
+# formato=compacto (solo /api/trabajos, modo JSON): IDs en las órdenes + relaciones side-loaded
+FORMATO = Query("completo", pattern="^(completo|compacto)$")
+
+# GET condicional (ETag / 304): tablas cuya versión identifica cada listado. Las cargas de
+# ingresos también crean clientes (los que faltan), por eso clientes depende de ordenes_trabajo.
+VERSION_TRABAJOS = Depends(condicional(models.OrdenTrabajo.__tablename__, models.Cliente.__tablename__))
+VERSION_CAMPO = Depends(condicional(models.VisitaCampo.__tablename__))
+VERSION_CLIENTES = Depends(condicional(models.Cliente.__tablename__, models.OrdenTrabajo.__tablename__))
+
+NDJSON = "application/x-ndjson"
+TAMANO_LOTE_STREAM = 500
+
+# Ordenamientos permitidos: nombre -> (columna, es_fecha). `?orden=-campo` es descendente.
+ORDENES_TRABAJOS = {
+    "fecha_ingreso": (models.OrdenTrabajo.fecha_ingreso, True),
+    "estado": (models.OrdenTrabajo.estado, False),
+    "id_appsheet": (models.OrdenTrabajo.id_appsheet, False),
+}
+ORDENES_CLIENTES = {
+    "id_cliente_appsheet": (models.Cliente.id_cliente_appsheet, False),
+    "nombre_fiscal": (models.Cliente.nombre_fiscal, False),
+    "ciudad": (models.Cliente.ciudad, False),
+}
+
+
+def _quiere_stream(request: Request):
+    return NDJSON in request.headers.get("accept", "")
+
+
+def _patron(q):
+    """Texto libre -> patrón ILIKE '%q%' (escapando los comodines del usuario)."""
+    q = q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{q}%"
+
+
+def _orden(orden, permitidos):
+    nombre = orden.lstrip("-")
+    if nombre not in permitidos:
+        raise HTTPException(status_code=400, detail=f"Orden no soportado: {orden}. Opciones: {', '.join(permitidos)}")
+    columna, es_fecha = permitidos[nombre]
+    return orden, columna, es_fecha, orden.startswith("-")
+
+
+def _despues_del_cursor(cursor, orden, columna, columna_id, es_fecha, descendente):
+    try:
+        valor, id_fila = decodificar_cursor(cursor, orden, es_fecha)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return despues_de(columna, columna_id, valor, id_fila, descendente)
+
+
+def _listar(request: Request, response: Response, db: Session, construir, esquema, limit, siguiente, total=None):
+    """
+    Modo JSON: una página (lista) + X-Next-Cursor. Modo NDJSON: StreamingResponse.
+    `construir(db)` arma la consulta ya filtrada y ordenada; `total()` cuenta (solo 1ª página).
+    """
+    cabeceras = {"X-Total-Count": str(total())} if total else {}
+    if _quiere_stream(request):
+        # La respuesta inyectada no se usa en streaming: se copian el ETag y compañía
+        cabeceras.update({k: response.headers[k] for k in CABECERAS_CACHE if k in response.headers})
+        return StreamingResponse(_transmitir(construir, esquema, limit), media_type=NDJSON, headers=cabeceras)
+
+    response.headers.update(cabeceras)
+    limit = min(limit or LIMITE_DEFECTO, LIMITE_MAXIMO_JSON)
+    filas, cursor_siguiente = paginar(construir(db), limit, siguiente)
+    if cursor_siguiente:
+        response.headers["X-Next-Cursor"] = cursor_siguiente
+    return filas
+
+
+def _transmitir(construir, esquema, limit):
+    # Sesión propia: la de get_db se cierra antes de que termine de enviarse el cuerpo
+    db = SessionLocal()
+    try:
+        query = construir(db)
+        if limit:
+            query = query.limit(limit)
+        filas = iter(query.yield_per(TAMANO_LOTE_STREAM))
+        while True:
+            lote = list(islice(filas, TAMANO_LOTE_STREAM))
+            if not lote:
+                break
+            # Un yield por lote: cada vuelta del generador salta al threadpool
+            yield "".join(esquema.model_validate(f).model_dump_json() + "\n" for f in lote)
+    finally:
+        db.close()
+
+
+def _filtros_ordenes(fecha_desde, fecha_hasta, estado, tecnico_id, servicio_id, cliente_id, ciudad, q):
+    """
+    Condiciones sobre ordenes_trabajo (las de otras tablas van como subconsultas IN) para que
+    el listado y el conteo compartan filtros sin JOINs. `q` usa los índices trigram (pg_trgm).
+    """
+    orden = models.OrdenTrabajo
+    filtros = []
+    if fecha_desde: filtros.append(orden.fecha_ingreso >= fecha_desde)
+    if fecha_hasta: filtros.append(orden.fecha_ingreso <= fecha_hasta)
+    if estado: filtros.append(orden.estado.in_(estado))
+    if tecnico_id: filtros.append(orden.tecnico_id == tecnico_id)
+    if servicio_id: filtros.append(orden.servicio_id == servicio_id)
+    if cliente_id: filtros.append(orden.cliente_id == cliente_id)
+    if ciudad:
+        filtros.append(orden.cliente_id.in_(
+            select(models.Cliente.id_cliente_appsheet).where(models.Cliente.ciudad.ilike(ciudad.strip()))
+        ))
+    if q and q.strip():
+        # UNION de búsquedas que usan cada una su índice (trigram de la expresión de texto,
+        # cliente_id, tecnico_id y equipo_id), en vez de un OR que obliga a recorrer la tabla
+        patron = literal(_patron(q))
+        clientes = select(models.Cliente.id_cliente_appsheet).where(
+            literal_column(models.BUSQUEDA_CLIENTES_SQL).ilike(patron))
+        equipos = select(models.Equipo.id).where(models.Equipo.serie.ilike(patron))
+        tecnicos = select(models.Tecnico.id).where(models.Tecnico.nombre_completo.ilike(patron))
+        filtros.append(orden.id_appsheet.in_(union(
+            select(orden.id_appsheet).where(literal_column(models.BUSQUEDA_ORDENES_SQL).ilike(patron)),
+            select(orden.id_appsheet).where(orden.cliente_id.in_(clientes)),
+            select(orden.id_appsheet).where(orden.tecnico_id.in_(tecnicos)),
+            select(orden.id_appsheet).where(orden.equipo_id.in_(equipos)),
+        )))
+    return filtros
+
+
 # 1. LISTAR ORDENES DE TRABAJO (INGRESOS)
-@router.get("/trabajos", response_model=List[schemas.OrdenTrabajoResponse])
-def listar_ordenes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/trabajos", response_model=Union[List[schemas.OrdenTrabajoResponse], schemas.OrdenesCompactas],
+            dependencies=[VERSION_TRABAJOS])
+def listar_ordenes(request: Request, response: Response, cursor: Optional[str] = None, limit: Optional[int] = LIMITE,
+                   skip: int = 0, formato: str = FORMATO, orden: str = "-fecha_ingreso",
+                   fecha_desde: Optional[date] = None, fecha_hasta: Optional[date] = None,
+                   estado: Optional[List[str]] = Query(None), tecnico_id: Optional[int] = None,
+                   servicio_id: Optional[int] = None, cliente_id: Optional[str] = None,
+                   ciudad: Optional[str] = None, q: Optional[str] = None, db: Session = Depends(get_db)):
     """
     Obtiene las órdenes de taller con sus relaciones cargadas eficientemente.
+    Filtros opcionales, búsqueda `q` (orden, observaciones, daño, cliente, RUC, técnico, serie) y
+    orden estable (campo, id_appsheet), paginado por cursor.
     """
-    return (
-        db.query(models.OrdenTrabajo)
-        .options(
-            joinedload(models.OrdenTrabajo.cliente_rel),
-            joinedload(models.OrdenTrabajo.tecnico_rel),
-            joinedload(models.OrdenTrabajo.servicio_rel),
-            joinedload(models.OrdenTrabajo.equipo_rel)
-        )
-        .order_by(models.OrdenTrabajo.fecha_ingreso.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    modelo = models.OrdenTrabajo
+    orden, columna, es_fecha, descendente = _orden(orden, ORDENES_TRABAJOS)
+    filtros = _filtros_ordenes(fecha_desde, fecha_hasta, estado, tecnico_id, servicio_id, cliente_id, ciudad, q)
+    condiciones = list(filtros)
+    if cursor:
+        condiciones.append(_despues_del_cursor(cursor, orden, columna, modelo.id_appsheet, es_fecha, descendente))
+    compacto = formato == "compacto" and not _quiere_stream(request)
+
+    def construir(db):
+        query = db.query(modelo)
+        if not compacto:
+            query = query.options(
+                joinedload(modelo.cliente_rel),
+                joinedload(modelo.tecnico_rel),
+                joinedload(modelo.servicio_rel),
+                joinedload(modelo.equipo_rel)
+            )
+        query = query.filter(*condiciones).order_by(*ordenar(columna, modelo.id_appsheet, descendente))
+        return query.offset(skip) if skip and not cursor else query
+
+    filas = _listar(request, response, db, construir, schemas.OrdenTrabajoResponse, limit,
+                    lambda o: codificar_cursor(orden, getattr(o, columna.key), o.id_appsheet),
+                    total=None if cursor else lambda: contar(db, modelo, filtros))
+    return ordenes_compactas(db, filas) if compacto else filas
+
+# 1.1 RESUMEN DE ESTADOS (PÁGINA DE INICIO)
+@router.get("/trabajos/summary")
+def resumen_trabajos(start_date: Optional[date] = None, end_date: Optional[date] = None, db: Session = Depends(get_db)):
+    """
+    Totales, terminados/en proceso, conteos por categoría de estado, servicio y técnico y KPI de
+    reingresos del rango, en una sola consulta. Sin fechas: histórico completo.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date no puede ser posterior a end_date")
+    return resumen_estados(db, start_date, end_date)
+
+
+@router.get("/trabajos/estados")
+def categorias_de_estado(db: Session = Depends(get_db)):
+    """Reglas de la tabla categorias_estado y la categoría que recibe cada estado de la base."""
+    return clasificacion_estados(db)
 
 # 2. LISTAR VISITAS DE CAMPO (NUEVO)
-@router.get("/campo", response_model=List[schemas.VisitaCampoResponse])
-def listar_campo(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return (
-        db.query(models.VisitaCampo)
-        .options(
-            joinedload(models.VisitaCampo.tecnico1_rel),
-            joinedload(models.VisitaCampo.tecnico2_rel),
-            joinedload(models.VisitaCampo.equipo_rel)
+@router.get("/campo", response_model=List[schemas.VisitaCampoResponse], dependencies=[VERSION_CAMPO])
+def listar_campo(request: Request, response: Response, cursor: Optional[str] = None, limit: Optional[int] = LIMITE,
+                 skip: int = 0, db: Session = Depends(get_db)):
+    visita = models.VisitaCampo
+    orden = "-ultima_fecha"
+    condiciones = []
+    if cursor:
+        condiciones.append(_despues_del_cursor(cursor, orden, visita.ultima_fecha, visita.id_campo_appsheet, True, True))
+
+    def construir(db):
+        query = (
+            db.query(visita)
+            .options(
+                joinedload(visita.tecnico1_rel),
+                joinedload(visita.tecnico2_rel),
+                joinedload(visita.equipo_rel)
+            )
+            .filter(*condiciones)
+            .order_by(*ordenar(visita.ultima_fecha, visita.id_campo_appsheet, True))
         )
-        .order_by(models.VisitaCampo.ultima_fecha.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        return query.offset(skip) if skip and not cursor else query
+
+    return _listar(request, response, db, construir, schemas.VisitaCampoResponse, limit,
+                   lambda v: codificar_cursor(orden, v.ultima_fecha, v.id_campo_appsheet))
 
 # 3. LISTAR CLIENTES
-@router.get("/clientes", response_model=List[schemas.ClienteResponse])
-def listar_clientes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return (
-        db.query(models.Cliente)
-        .options(joinedload(models.Cliente.industria_rel))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
\ No newline at end of file
+@router.get("/clientes", response_model=List[schemas.ClienteResponse], dependencies=[VERSION_CLIENTES])
+def listar_clientes(request: Request, response: Response, cursor: Optional[str] = None, limit: Optional[int] = LIMITE,
+                    skip: int = 0, orden: str = "id_cliente_appsheet", ciudad: Optional[str] = None,
+                    industria_id: Optional[int] = None, q: Optional[str] = None, db: Session = Depends(get_db)):
+    """Filtros por ciudad e industria; `q` busca en nombre fiscal, RUC e ID (índices trigram)."""
+    cliente = models.Cliente
+    orden, columna, es_fecha, descendente = _orden(orden, ORDENES_CLIENTES)
+    filtros = []
+    if ciudad: filtros.append(cliente.ciudad.ilike(ciudad.strip()))
+    if industria_id: filtros.append(cliente.industria_id == industria_id)
+    if q and q.strip():
+        filtros.append(literal_column(models.BUSQUEDA_CLIENTES_SQL).ilike(literal(_patron(q))))
+    condiciones = list(filtros)
+    if cursor:
+        condiciones.append(_despues_del_cursor(cursor, orden, columna, cliente.id_cliente_appsheet, es_fecha, descendente))
+
+    def construir(db):
+        query = (
+            db.query(cliente)
+            .options(joinedload(cliente.industria_rel))
+            .filter(*condiciones)
+            .order_by(*ordenar(columna, cliente.id_cliente_appsheet, descendente))
+        )
+        return query.offset(skip) if skip and not cursor else query
+
+    return _listar(request, response, db, construir, schemas.ClienteResponse, limit,
+                   lambda c: codificar_cursor(orden, getattr(c, columna.key), c.id_cliente_appsheet),
+                   total=None if cursor else lambda: contar(db, cliente, filtros))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Dict, Any
 from datetime import date, datetime
 
 
@@ -72,6 +72,48 @@ class OrdenTrabajoResponse(BaseModel):
         from_attributes = True
 
 
+# --- ORDENES EN FORMATO COMPACTO (?formato=compacto) ---
+# Las órdenes llevan solo los IDs; cada cliente/técnico/servicio/industria/equipo viaja una vez
+# en su diccionario (id -> objeto), en vez de repetirse dentro de cada orden.
+class ClienteCompacto(BaseModel):
+    id_cliente_appsheet: str
+    nombre_fiscal: Optional[str] = None
+    ruc: Optional[str] = None
+    ciudad: Optional[str] = None
+    direccion: Optional[str] = None
+    telefono: Optional[str] = None
+    contacto: Optional[str] = None
+    industria_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class OrdenTrabajoCompacta(BaseModel):
+    id_appsheet: str
+    fecha_ingreso: Optional[date] = None
+    no_orden_taller: Optional[str] = None
+    no_orden_campo: Optional[str] = None
+    estado: Optional[str] = None
+    observaciones: Optional[str] = None
+    cliente_id: Optional[str] = None
+    tecnico_id: Optional[int] = None
+    servicio_id: Optional[int] = None
+    equipo_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class OrdenesCompactas(BaseModel):
+    ordenes: List[OrdenTrabajoCompacta]
+    clientes: Dict[str, ClienteCompacto]
+    industrias: Dict[int, IndustriaBase]
+    tecnicos: Dict[int, TecnicoBase]
+    servicios: Dict[int, TipoServicioBase]
+    equipos: Dict[int, EquipoBase]
+
+
 # --- VISITAS DE CAMPO ---
 class VisitaCampoResponse(BaseModel):
     id_campo_appsheet: str
@@ -87,4 +129,15 @@ class VisitaCampoResponse(BaseModel):
     equipo_rel: Optional[EquipoBase] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- EVENTOS DE SINCRONIZACIÓN (webhooks de AppSheet) ---
+class EventoSync(BaseModel):
+    tabla: str                              # Clientes | Ingresos | Campo
+    accion: str = "upsert"                  # upsert | delete
+    id: Optional[Union[str, int]] = None    # obligatorio en delete si no viene la fila
+    fila: Optional[Dict[str, Any]] = None   # {encabezado de la hoja: valor}
+
+
+class LoteEventosSync(BaseModel):
+    eventos: List[EventoSync]
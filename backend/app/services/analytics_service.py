@@ -1,20 +1,18 @@
-import os
 import json
-from google import genai
 from google.genai import types
+from app.services.llm_gateway import generar, ErrorLLM, LLMNoConfigurado
 
+MODELO_INFORME = "gemini-3-flash-preview"
 
-def generar_analisis_estrategico(datos_json):
-    """
-    Envía los datos estadísticos a Gemini 3 para que genere un informe ejecutivo
-    estrictamente basado en el rango de fechas seleccionado.
-    """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        return "Error: Falta configurar la API Key de Gemini."
+# Subir al cambiar el prompt o la configuración: invalida los informes guardados (services/insight_cache.py)
+PROMPT_VERSION = "1"
 
-    client = genai.Client(api_key=api_key)
 
+class InformeNoGenerado(Exception):
+    """El informe no se pudo generar; el mensaje es el texto que se muestra al usuario."""
+
+
+def construir_prompt(datos_json):
     # 1. Extraemos el periodo del JSON para forzar el título correcto
     # Esto asegura que la IA sepa exactamente de qué fechas hablar
     rango_fechas = datos_json.get("periodo", "Rango seleccionado")
@@ -57,17 +55,35 @@ def generar_analisis_estrategico(datos_json):
 
     Mantén un tono profesional, analítico y directo al punto.
     """
+    return prompt
+
+
+async def redactar_informe(datos_json):
+    """Pide el informe a Gemini (vía llm_gateway); lanza InformeNoGenerado si no se pudo."""
+    prompt = construir_prompt(datos_json)
 
     try:
         # ✅ USANDO EL MODELO SOLICITADO: gemini-3-flash-preview
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview",
-            contents=prompt,
+        return await generar(
+            prompt,
+            modelo=MODELO_INFORME,
             config=types.GenerateContentConfig(
                 temperature=0.2,  # Temperatura baja para máxima precisión analítica
                 max_output_tokens=1500
             )
         )
-        return response.text
-    except Exception as e:
-        return f"⚠️ No se pudo generar el análisis con Gemini 3. Error: {str(e)}"
\ No newline at end of file
+    except LLMNoConfigurado:
+        raise InformeNoGenerado("Error: Falta configurar la API Key de Gemini.")
+    except ErrorLLM as e:
+        raise InformeNoGenerado(f"⚠️ No se pudo generar el análisis con Gemini 3. Error: {str(e)}")
+
+
+async def generar_analisis_estrategico(datos_json):
+    """
+    Envía los datos estadísticos a Gemini 3 para que genere un informe ejecutivo
+    estrictamente basado en el rango de fechas seleccionado.
+    """
+    try:
+        return await redactar_informe(datos_json)
+    except InformeNoGenerado as e:
+        return str(e)
@@ -0,0 +1,84 @@
+import os
+import time
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+# Tamaño por defecto de cada INSERT multi-fila (configurable por entorno)
+TAMANO_LOTE = int(os.getenv("ETL_BATCH_SIZE", "1000"))
+
+
+def _primera_linea(error):
+    texto = str(error).strip()
+    return texto.splitlines()[0] if texto else error.__class__.__name__
+
+
+def _upsert(db: Session, model, filas, claves):
+    stmt = insert(model).values(filas)
+    columnas = [c for c in filas[0].keys() if c not in claves]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=claves,
+        set_={c: stmt.excluded[c] for c in columnas}
+    )
+    db.execute(stmt)
+
+
+def upsert_por_lotes(db: Session, model, filas, clave, tamano_lote=None, avance=None):
+    """
+    Carga `filas` (lista de diccionarios con las mismas llaves) mediante
+    `INSERT ... VALUES (...), (...) ON CONFLICT DO UPDATE` en lotes de `tamano_lote`.
+
+    Cada lote corre dentro de un SAVEPOINT: si falla, se reintenta fila por fila para
+    aislar las filas dañadas sin perder el resto de la transacción. No hace commit.
+
+    `clave` es el nombre de la columna de conflicto, o una lista si la PK es compuesta.
+    `avance`, si se indica, recibe el total de filas cargadas al terminar cada lote.
+
+    Retorna un resumen con filas cargadas, errores por fila y tiempos por lote.
+    """
+    inicio = time.perf_counter()
+    tamano_lote = tamano_lote or TAMANO_LOTE
+    if tamano_lote < 1:
+        # Con un tamaño negativo range() queda vacío: no se cargaría nada y las huellas
+        # marcarían las filas como ya sincronizadas
+        raise ValueError(f"tamano_lote debe ser >= 1 (recibido {tamano_lote}; revisar ETL_BATCH_SIZE)")
+    claves = [clave] if isinstance(clave, str) else list(clave)
+    resumen = {"procesados": 0, "errores": [], "lotes": []}
+
+    # Una misma clave repetida en un lote rompe el ON CONFLICT; gana la última aparición
+    unicas = {}
+    for fila in filas:
+        unicas[tuple(fila[c] for c in claves)] = fila
+    filas = list(unicas.values())
+
+    for n, desde in enumerate(range(0, len(filas), tamano_lote), start=1):
+        lote = filas[desde:desde + tamano_lote]
+        t0 = time.perf_counter()
+        cargadas = len(lote)
+
+        try:
+            with db.begin_nested():
+                _upsert(db, model, lote, claves)
+        except Exception as e:
+            print(f"⚠️ Lote {n} de {model.__tablename__} falló ({e.__class__.__name__}), reintentando fila por fila...")
+            cargadas = 0
+            for fila in lote:
+                try:
+                    with db.begin_nested():
+                        _upsert(db, model, [fila], claves)
+                    cargadas += 1
+                except Exception as e_fila:
+                    id_fila = fila[claves[0]] if len(claves) == 1 else tuple(fila[c] for c in claves)
+                    resumen["errores"].append({"id": id_fila, "error": _primera_linea(e_fila)})
+
+        resumen["procesados"] += cargadas
+        resumen["lotes"].append({
+            "lote": n,
+            "filas": len(lote),
+            "cargadas": cargadas,
+            "segundos": round(time.perf_counter() - t0, 3)
+        })
+        if avance:
+            avance(resumen["procesados"])
+
+    resumen["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resumen
@@ -1,4 +1,3 @@
-import os
 import json
 import pandas as pd
 from io import BytesIO
@@ -7,22 +6,17 @@ from sqlalchemy import or_, and_
 # ⚠️ IMPORTANTE: Importamos los nuevos modelos normalizados
 from app.models import OrdenTrabajo, Cliente, Tecnico, TipoServicio
 
-# Librería moderna de Google
-from google import genai
+# Librería moderna de Google (las llamadas pasan por llm_gateway)
 from google.genai import types
+from app.services.llm_gateway import generar, ErrorLLM, LLMNoConfigurado
 
+MODELO_CHAT = "gemini-3-flash-preview"
 
-def interpretar_intencion(mensaje: str):
+
+async def interpretar_intencion(mensaje: str):
     """
     Usa la IA para convertir texto natural en filtros de fecha y nombre.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("⚠️ Falta GEMINI_API_KEY en .env")
-        return None
-
-    client = genai.Client(api_key=api_key)
-
     prompt = f"""
     Eres un asistente experto en SQL. Analiza este mensaje: "{mensaje}".
 
@@ -44,17 +38,19 @@ def interpretar_intencion(mensaje: str):
     """
 
     try:
-        # Usamos gemini-1.5-flash que es rápido y estable
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview",
-            contents=prompt,
+        texto = await generar(
+            prompt,
+            modelo=MODELO_CHAT,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
             )
         )
-        return json.loads(response.text)
+        return json.loads(texto)
 
-    except Exception as e:
+    except LLMNoConfigurado:
+        print("⚠️ Falta GEMINI_API_KEY en .env")
+        return None
+    except (ErrorLLM, ValueError) as e:
         print(f"⚠️ Error IA: {e}")
         return None
 
@@ -0,0 +1,61 @@
+import re
+import unicodedata
+
+
+def normalizar_header(texto):
+    if not texto: return ""
+    texto = str(texto).lower().strip()
+    texto = ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+    texto = re.sub(r'[^a-z0-9]', '', texto)
+    return texto
+
+
+class ExtractorColumnas:
+    """
+    Plan de extracción compilado UNA vez por hoja.
+
+    Resuelve un mapeo (MAPEO_CLIENTES, MAPEO_INGRESOS, MAPEO_CAMPO) contra la fila de
+    encabezados y guarda la posición de cada campo. Luego cada fila de `get_all_values()`
+    se lee por índice, sin construir diccionarios ni volver a normalizar encabezados.
+
+    Reglas (idénticas al antiguo `obtener_valor`):
+      - Si hay encabezados repetidos, gana la última columna.
+      - Entre los alias posibles de un campo, gana el primero que exista.
+      - Celda vacía -> None (NULL en BD); en otro caso, texto sin espacios extremos.
+    """
+
+    def __init__(self, headers, mapeo):
+        self.headers = [str(h) for h in headers]
+        posicion = {}
+        for i, h in enumerate(self.headers):
+            posicion[normalizar_header(h)] = i
+
+        self.plan = {}
+        self.faltantes = []
+        for campo, posibles in mapeo.items():
+            for p in posibles:
+                if p in posicion:
+                    self.plan[campo] = posicion[p]
+                    break
+            else:
+                self.faltantes.append(campo)
+
+        usados = set(self.plan.values())
+        self.sin_mapear = [h for i, h in enumerate(self.headers) if h and i not in usados]
+        self._campos = list(mapeo.keys())
+        self._items = list(self.plan.items())
+
+    def extraer(self, fila):
+        """Convierte una fila (lista de celdas) en un diccionario {campo_bd: valor}."""
+        datos = dict.fromkeys(self._campos)
+        largo = len(fila)
+        for campo, i in self._items:
+            if i < largo:
+                val = fila[i]
+                if val != "" and val is not None:
+                    datos[campo] = str(val).strip()
+        return datos
+
+    def reporte(self):
+        """Diagnóstico para imprimir una sola vez al inicio del ETL."""
+        return {"faltantes": self.faltantes, "sin_mapear": self.sin_mapear}
@@ -0,0 +1,25 @@
+from sqlalchemy.orm import Session
+from app.models import Cliente, Industria, Tecnico, TipoServicio, Equipo
+
+# Respuesta "side-loaded" de /api/trabajos?formato=compacto: con miles de órdenes y pocos
+# cientos de clientes/técnicos, cada objeto relacionado se lee y serializa una sola vez.
+
+
+def _por_id(db: Session, model, columna_id, ids):
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    return {getattr(fila, columna_id): fila for fila in db.query(model).filter(getattr(model, columna_id).in_(ids))}
+
+
+def ordenes_compactas(db: Session, ordenes):
+    """Órdenes (sin relaciones cargadas) + diccionarios id -> objeto de lo que referencian."""
+    clientes = _por_id(db, Cliente, "id_cliente_appsheet", (o.cliente_id for o in ordenes))
+    return {
+        "ordenes": ordenes,
+        "clientes": clientes,
+        "industrias": _por_id(db, Industria, "id", (c.industria_id for c in clientes.values())),
+        "tecnicos": _por_id(db, Tecnico, "id", (o.tecnico_id for o in ordenes)),
+        "servicios": _por_id(db, TipoServicio, "id", (o.servicio_id for o in ordenes)),
+        "equipos": _por_id(db, Equipo, "id", (o.equipo_id for o in ordenes)),
+    }
@@ -0,0 +1,71 @@
+import hashlib
+from datetime import date, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.services.data_version import versiones_de
+
+# GET condicional para los listados y el dashboard. Los datos solo cambian cuando el ETL
+# confirma una carga (y entonces incrementa versiones_datos), así que la respuesta se
+# identifica por la versión de las tablas de las que sale:
+#   ETag          = hash(versiones de esas tablas + ruta + query + Accept + fecha de hoy)
+#   Last-Modified = la última actualización de esas tablas
+# Si el cliente manda If-None-Match (o If-Modified-Since) y nada cambió, se responde 304 sin
+# cuerpo después de UNA lectura a versiones_datos, sin tocar las tablas principales.
+# Cache-Control: no-cache obliga al navegador a revalidar en cada consulta (nunca datos viejos
+# tras un sync); la revalidación la hace el propio navegador, axios no cambia.
+
+CABECERAS_CACHE = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def _etag(request: Request, versiones):
+    # La fecha entra porque las rutas sin rango explícito usan "hasta hoy"
+    partes = [request.url.path, str(request.query_params), request.headers.get("accept", ""), date.today().isoformat()]
+    partes += [f"{tabla}:{version}" for tabla, (version, _) in sorted(versiones.items())]
+    return 'W/"' + hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _coincide_etag(if_none_match, etag):
+    # Comparación débil (RFC 9110): se ignora el prefijo W/
+    valor = etag.removeprefix("W/")
+    candidatos = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidatos or valor in candidatos
+
+
+def _sin_cambios_desde(if_modified_since, ultima):
+    try:
+        desde = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return desde is not None and ultima.replace(microsecond=0) <= desde
+
+
+def condicional(*tablas):
+    """
+    Dependencia para rutas GET: pone ETag/Last-Modified en la respuesta y corta con 304 si el
+    cliente ya tiene esa versión. Uso: `Depends(condicional("ordenes_trabajo", "clientes"))`.
+    """
+    def verificar(request: Request, response: Response, db: Session = Depends(get_db)):
+        versiones = versiones_de(db, tablas)
+        etag = _etag(request, versiones)
+        fechas = [actualizado for _, actualizado in versiones.values() if actualizado]
+        ultima = max(fechas).astimezone(timezone.utc) if fechas else None
+
+        cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+        if ultima:
+            cabeceras["Last-Modified"] = format_datetime(ultima, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            sin_cambios = _coincide_etag(if_none_match, etag)
+        else:
+            if_modified_since = request.headers.get("if-modified-since")
+            sin_cambios = bool(ultima and if_modified_since and _sin_cambios_desde(if_modified_since, ultima))
+        if sin_cambios:
+            raise HTTPException(status_code=304, headers=cabeceras)
+
+        response.headers.update(cabeceras)
+        return cabeceras
+
+    return verificar
@@ -0,0 +1,203 @@
+import io
+import csv
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Modo de carga masiva: COPY FROM STDIN a tablas staging UNLOGGED + merge con SQL por conjuntos.
+# Pensado para backfills grandes; el modo por lotes (bulk_loader) sigue siendo el de uso diario.
+
+NULO = r"\N"
+
+STAGING = {
+    "stg_clientes": [
+        ("ord", "integer"), ("id_cliente_appsheet", "text"), ("clave", "text"), ("nombre_fiscal", "text"),
+        ("ruc", "text"), ("ciudad", "text"), ("direccion", "text"), ("contacto", "text"),
+        ("telefono", "text"), ("correo", "text"), ("industria_nombre", "text"),
+    ],
+    "stg_ordenes": [
+        ("ord", "integer"), ("id_appsheet", "text"), ("fecha_ingreso", "date"), ("tipo_ingreso", "text"),
+        ("no_orden_taller", "text"), ("no_orden_campo", "text"), ("estado", "text"),
+        ("observaciones", "text"), ("dano_reportado", "text"), ("cliente_id", "text"),
+        ("servicio_nombre", "text"), ("tecnico_nombre", "text"), ("serie", "text"), ("marca", "text"),
+        ("modelo", "text"), ("tipo_equipo", "text"), ("capacidad", "text"), ("sensibilidad", "text"),
+    ],
+    "stg_visitas": [
+        ("ord", "integer"), ("id_campo_appsheet", "text"), ("codigo", "text"), ("agencia_zona", "text"),
+        ("ubicacion", "text"), ("estado", "text"), ("enlace_informe", "text"), ("ultima_fecha", "date"),
+        ("tecnico1", "text"), ("tecnico2", "text"), ("serie", "text"), ("marca", "text"), ("modelo", "text"),
+    ],
+}
+
+# --- MERGE POR CONJUNTOS ---
+# En caso de IDs repetidos en la hoja gana la última fila (ord DESC), igual que el modo por lotes.
+# Los equipos nuevos toman los datos de la primera fila en que aparece la serie (ord ASC).
+
+SQL_CLIENTES = [
+    """
+    INSERT INTO industrias (nombre)
+    SELECT DISTINCT industria_nombre FROM stg_clientes WHERE industria_nombre IS NOT NULL
+    ON CONFLICT (nombre) DO NOTHING
+    """,
+    """
+    INSERT INTO clientes (id_cliente_appsheet, clave, nombre_fiscal, ruc, ciudad, direccion,
+                          contacto, telefono, correo, industria_id, ultima_actualizacion)
+    SELECT DISTINCT ON (s.id_cliente_appsheet)
+           s.id_cliente_appsheet, s.clave, s.nombre_fiscal, s.ruc, s.ciudad, s.direccion,
+           s.contacto, s.telefono, s.correo, i.id, now()
+    FROM stg_clientes s
+    LEFT JOIN industrias i ON i.nombre = s.industria_nombre
+    ORDER BY s.id_cliente_appsheet, s.ord DESC
+    ON CONFLICT (id_cliente_appsheet) DO UPDATE SET
+        clave = EXCLUDED.clave, nombre_fiscal = EXCLUDED.nombre_fiscal, ruc = EXCLUDED.ruc,
+        ciudad = EXCLUDED.ciudad, direccion = EXCLUDED.direccion, contacto = EXCLUDED.contacto,
+        telefono = EXCLUDED.telefono, correo = EXCLUDED.correo, industria_id = EXCLUDED.industria_id,
+        ultima_actualizacion = EXCLUDED.ultima_actualizacion
+    """,
+]
+
+SQL_ORDENES = [
+    """
+    INSERT INTO tecnicos (nombre_completo, activo)
+    SELECT DISTINCT tecnico_nombre, true FROM stg_ordenes WHERE tecnico_nombre IS NOT NULL
+    ON CONFLICT (nombre_completo) DO NOTHING
+    """,
+    """
+    INSERT INTO tipos_servicio (nombre)
+    SELECT DISTINCT servicio_nombre FROM stg_ordenes WHERE servicio_nombre IS NOT NULL
+    ON CONFLICT (nombre) DO NOTHING
+    """,
+    """
+    INSERT INTO clientes (id_cliente_appsheet, nombre_fiscal, ultima_actualizacion)
+    SELECT DISTINCT cliente_id, 'Cliente ' || cliente_id, now() FROM stg_ordenes WHERE cliente_id IS NOT NULL
+    ON CONFLICT (id_cliente_appsheet) DO NOTHING
+    """,
+    """
+    INSERT INTO equipos (serie, marca, modelo, tipo_equipo, capacidad, sensibilidad, cliente_id)
+    SELECT DISTINCT ON (s.serie) s.serie, s.marca, s.modelo, s.tipo_equipo, s.capacidad, s.sensibilidad, s.cliente_id
+    FROM stg_ordenes s
+    WHERE s.serie IS NOT NULL AND NOT EXISTS (SELECT 1 FROM equipos e WHERE e.serie = s.serie)
+    ORDER BY s.serie, s.ord
+    """,
+    """
+    INSERT INTO ordenes_trabajo (id_appsheet, fecha_ingreso, tipo_ingreso, no_orden_taller, no_orden_campo,
+                                 estado, observaciones, dano_reportado, cliente_id, equipo_id,
+                                 servicio_id, tecnico_id, ultima_actualizacion)
+    SELECT DISTINCT ON (s.id_appsheet)
+           s.id_appsheet, s.fecha_ingreso, s.tipo_ingreso, s.no_orden_taller, s.no_orden_campo,
+           s.estado, s.observaciones, s.dano_reportado, s.cliente_id, eq.id, ts.id, t.id, now()
+    FROM stg_ordenes s
+    LEFT JOIN tecnicos t ON t.nombre_completo = s.tecnico_nombre
+    LEFT JOIN tipos_servicio ts ON ts.nombre = s.servicio_nombre
+    LEFT JOIN LATERAL (SELECT e.id FROM equipos e WHERE e.serie = s.serie ORDER BY e.id LIMIT 1) eq ON true
+    ORDER BY s.id_appsheet, s.ord DESC
+    ON CONFLICT (id_appsheet) DO UPDATE SET
+        fecha_ingreso = EXCLUDED.fecha_ingreso, tipo_ingreso = EXCLUDED.tipo_ingreso,
+        no_orden_taller = EXCLUDED.no_orden_taller, no_orden_campo = EXCLUDED.no_orden_campo,
+        estado = EXCLUDED.estado, observaciones = EXCLUDED.observaciones,
+        dano_reportado = EXCLUDED.dano_reportado, cliente_id = EXCLUDED.cliente_id,
+        equipo_id = EXCLUDED.equipo_id, servicio_id = EXCLUDED.servicio_id,
+        tecnico_id = EXCLUDED.tecnico_id, ultima_actualizacion = EXCLUDED.ultima_actualizacion
+    """,
+]
+
+SQL_VISITAS = [
+    """
+    INSERT INTO tecnicos (nombre_completo, activo)
+    SELECT DISTINCT nombre, true FROM (
+        SELECT tecnico1 AS nombre FROM stg_visitas UNION SELECT tecnico2 FROM stg_visitas
+    ) t WHERE nombre IS NOT NULL
+    ON CONFLICT (nombre_completo) DO NOTHING
+    """,
+    """
+    INSERT INTO equipos (serie, marca, modelo)
+    SELECT DISTINCT ON (s.serie) s.serie, s.marca, s.modelo
+    FROM stg_visitas s
+    WHERE s.serie IS NOT NULL AND NOT EXISTS (SELECT 1 FROM equipos e WHERE e.serie = s.serie)
+    ORDER BY s.serie, s.ord
+    """,
+    """
+    INSERT INTO visitas_campo (id_campo_appsheet, codigo, agencia_zona, ubicacion, estado, enlace_informe,
+                               ultima_fecha, equipo_id, tecnico1_id, tecnico2_id, ultima_actualizacion)
+    SELECT DISTINCT ON (s.id_campo_appsheet)
+           s.id_campo_appsheet, s.codigo, s.agencia_zona, s.ubicacion, s.estado, s.enlace_informe,
+           s.ultima_fecha, eq.id, t1.id, t2.id, now()
+    FROM stg_visitas s
+    LEFT JOIN tecnicos t1 ON t1.nombre_completo = s.tecnico1
+    LEFT JOIN tecnicos t2 ON t2.nombre_completo = s.tecnico2
+    LEFT JOIN LATERAL (SELECT e.id FROM equipos e WHERE e.serie = s.serie ORDER BY e.id LIMIT 1) eq ON true
+    ORDER BY s.id_campo_appsheet, s.ord DESC
+    ON CONFLICT (id_campo_appsheet) DO UPDATE SET
+        codigo = EXCLUDED.codigo, agencia_zona = EXCLUDED.agencia_zona, ubicacion = EXCLUDED.ubicacion,
+        estado = EXCLUDED.estado, enlace_informe = EXCLUDED.enlace_informe,
+        ultima_fecha = EXCLUDED.ultima_fecha, equipo_id = EXCLUDED.equipo_id,
+        tecnico1_id = EXCLUDED.tecnico1_id, tecnico2_id = EXCLUDED.tecnico2_id,
+        ultima_actualizacion = EXCLUDED.ultima_actualizacion
+    """,
+]
+
+
+def _preparar_staging(db: Session, tabla):
+    columnas = ", ".join(f"{c} {tipo}" for c, tipo in STAGING[tabla])
+    db.execute(text(f"CREATE UNLOGGED TABLE IF NOT EXISTS {tabla} ({columnas})"))
+    # TRUNCATE toma un lock exclusivo hasta el commit: dos cargas COPY no se pisan
+    db.execute(text(f"TRUNCATE {tabla}"))
+
+
+def _copiar(db: Session, tabla, filas):
+    """Serializa las filas a CSV en memoria y las envía con COPY FROM STDIN (psycopg2 copy_expert)."""
+    columnas = [c for c, _ in STAGING[tabla]]
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for ord_, fila in enumerate(filas):
+        escritor.writerow([ord_] + [NULO if fila[c] is None else fila[c] for c in columnas[1:]])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv, NULL '{NULO}')",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _cargar(db: Session, tabla, filas, sentencias):
+    """
+    Staging + merge dentro de la transacción actual (no hace commit).
+    Retorna un resumen con la misma forma que `upsert_por_lotes` más tiempos por fase.
+    """
+    inicio = time.perf_counter()
+    tiempos = {}
+
+    t0 = time.perf_counter()
+    _preparar_staging(db, tabla)
+    _copiar(db, tabla, filas)
+    tiempos["copy"] = round(time.perf_counter() - t0, 3)
+
+    t0 = time.perf_counter()
+    procesados = 0
+    for sql in sentencias:
+        procesados = db.execute(text(sql)).rowcount  # la última sentencia es el upsert principal
+    tiempos["merge"] = round(time.perf_counter() - t0, 3)
+
+    return {
+        "procesados": procesados,
+        "errores": [],
+        "lotes": [],
+        "tiempos": tiempos,
+        "segundos": round(time.perf_counter() - inicio, 3)
+    }
+
+
+def copiar_clientes(db: Session, filas):
+    return _cargar(db, "stg_clientes", filas, SQL_CLIENTES)
+
+
+def copiar_ordenes(db: Session, filas):
+    return _cargar(db, "stg_ordenes", filas, SQL_ORDENES)
+
+
+def copiar_visitas(db: Session, filas):
+    return _cargar(db, "stg_visitas", filas, SQL_VISITAS)
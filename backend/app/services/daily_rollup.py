@@ -0,0 +1,105 @@
+import zlib
+from sqlalchemy import select, text, exists
+from sqlalchemy.orm import Session
+from app.models import OrdenTrabajo, Cliente, ResumenDiarioOrdenes
+
+# Resumen diario de órdenes (día, técnico, servicio, ciudad, estado -> cantidad) para la analítica.
+# El ETL lo mantiene en la misma transacción de la carga, recalculando SOLO los días afectados:
+#   - órdenes cargadas: su fecha anterior y la nueva
+#   - clientes cuya ciudad cambió: los días con órdenes de ese cliente
+#   - borrados por eventos: los días de las filas borradas
+
+TAMANO_CONSULTA = 5000
+
+# Serializa los recálculos: dos transacciones que borran y reinsertan el mismo día duplicarían filas
+_LOCK_RESUMEN = zlib.crc32(b"resumen_diario_ordenes")
+
+SQL_BORRAR_DIAS = "DELETE FROM resumen_diario_ordenes WHERE fecha = ANY(:dias)"
+
+SQL_INSERTAR = """
+INSERT INTO resumen_diario_ordenes (fecha, tecnico_id, servicio_id, con_cliente, ciudad, estado, ordenes)
+SELECT o.fecha_ingreso, o.tecnico_id, o.servicio_id, c.id_cliente_appsheet IS NOT NULL, c.ciudad, o.estado, count(*)
+FROM ordenes_trabajo o
+LEFT JOIN clientes c ON c.id_cliente_appsheet = o.cliente_id
+WHERE o.fecha_ingreso IS NOT NULL {filtro}
+GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+
+def _en_trozos(valores):
+    valores = list(valores)
+    for i in range(0, len(valores), TAMANO_CONSULTA):
+        yield valores[i:i + TAMANO_CONSULTA]
+
+
+def dias_de_ordenes(db: Session, ids):
+    """Fechas que tienen HOY en la base las órdenes indicadas (antes de sobrescribirlas o borrarlas)."""
+    dias = set()
+    for trozo in _en_trozos(ids):
+        dias.update(db.execute(
+            select(OrdenTrabajo.fecha_ingreso).distinct()
+            .where(OrdenTrabajo.id_appsheet.in_(trozo), OrdenTrabajo.fecha_ingreso.isnot(None))
+        ).scalars())
+    return dias
+
+
+def dias_de_clientes(db: Session, ids):
+    """Fechas con órdenes de los clientes indicados."""
+    dias = set()
+    for trozo in _en_trozos(ids):
+        dias.update(db.execute(
+            select(OrdenTrabajo.fecha_ingreso).distinct()
+            .where(OrdenTrabajo.cliente_id.in_(trozo), OrdenTrabajo.fecha_ingreso.isnot(None))
+        ).scalars())
+    return dias
+
+
+def dias_por_cambio_de_ciudad(db: Session, filas):
+    """Días a recalcular porque la ciudad de un cliente existente va a cambiar."""
+    nuevas = {r["id_cliente_appsheet"]: r["ciudad"] for r in filas}
+    cambiados = []
+    for trozo in _en_trozos(nuevas):
+        for id_cliente, ciudad in db.execute(
+            select(Cliente.id_cliente_appsheet, Cliente.ciudad).where(Cliente.id_cliente_appsheet.in_(trozo))
+        ).all():
+            if ciudad != nuevas[id_cliente]:
+                cambiados.append(id_cliente)
+    return dias_de_clientes(db, cambiados)
+
+
+def refrescar_dias(db: Session, dias):
+    """Recalcula el resumen de esos días desde ordenes_trabajo (no hace commit)."""
+    dias = sorted(d for d in dias if d is not None)
+    if not dias:
+        return 0
+    db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_RESUMEN})
+    db.execute(text(SQL_BORRAR_DIAS), {"dias": dias})
+    db.execute(text(SQL_INSERTAR.format(filtro="AND o.fecha_ingreso = ANY(:dias)")), {"dias": dias})
+    print(f"📅 Resumen diario recalculado para {len(dias)} días")
+    return len(dias)
+
+
+def reconstruir_resumen(db: Session):
+    """Recalcula el resumen completo (carga inicial o reparación) y hace commit."""
+    db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_RESUMEN})
+    db.execute(text("DELETE FROM resumen_diario_ordenes"))
+    db.execute(text(SQL_INSERTAR.format(filtro="")))
+    db.commit()
+    print("📅 Resumen diario reconstruido")
+
+
+def asegurar_resumen(db: Session):
+    """Si el resumen está vacío pero ya hay órdenes (instalaciones previas), lo construye."""
+    vacio = not db.execute(select(exists().where(ResumenDiarioOrdenes.id.isnot(None)))).scalar()
+    if vacio and db.execute(select(exists().where(OrdenTrabajo.fecha_ingreso.isnot(None)))).scalar():
+        reconstruir_resumen(db)
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.daily_rollup   (reconstrucción completa)
+    from app.database import SessionLocal
+    sesion = SessionLocal()
+    try:
+        reconstruir_resumen(sesion)
+    finally:
+        sesion.close()
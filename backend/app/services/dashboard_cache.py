@@ -0,0 +1,84 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from app.database import SessionLocal
+from app.services.data_version import version_datos
+
+# Caché en memoria (por proceso) de las métricas del dashboard.
+# Clave: (start_date, end_date, granularity, dias, modo). Cada entrada guarda la versión de
+# datos con la que se calculó; si el ETL confirmó cambios desde entonces (versiones_datos),
+# la entrada deja de valer. Así todos los workers invalidan sin avisarse entre sí.
+
+DASHBOARD_CACHE_MAX = int(os.getenv("DASHBOARD_CACHE_MAX", "128"))
+
+# Ventana por defecto del dashboard (la que se precalienta tras cada sync)
+DIAS_VENTANA_DEFECTO = 180
+
+
+class CacheDashboard:
+    def __init__(self, maximo=DASHBOARD_CACHE_MAX):
+        self.maximo = maximo
+        self._entradas = OrderedDict()  # clave -> (version, metricas)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.calcular = None  # obtener_metricas_raw; lo asigna el router de analítica
+
+    def obtener(self, db, start_date, end_date, granularity="month", dias=30, modo="resumen"):
+        clave = (start_date, end_date, granularity, dias, modo)
+        version = version_datos(db)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada and entrada[0] == version:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[1]
+            self.fallos += 1
+
+        metricas = self.calcular(db, start_date, end_date, granularity, dias, modo)
+        self._guardar(clave, version, metricas)
+        return metricas
+
+    def _guardar(self, clave, version, metricas):
+        with self._lock:
+            self._entradas[clave] = (version, metricas)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "maximo": self.maximo,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else None,
+            }
+
+
+CACHE_DASHBOARD = CacheDashboard()
+
+
+def precalentar_dashboard():
+    """Calcula la ventana por defecto (últimos 180 días) para que la primera visita tras un sync sea un acierto."""
+    if CACHE_DASHBOARD.calcular is None:
+        return
+    db = SessionLocal()
+    try:
+        fin = date.today()
+        CACHE_DASHBOARD.obtener(db, fin - timedelta(days=DIAS_VENTANA_DEFECTO), fin)
+        print("🔥 Dashboard precalentado (últimos 180 días)")
+    except Exception as e:
+        print(f"⚠️ No se pudo precalentar el dashboard: {e}")
+    finally:
+        db.close()
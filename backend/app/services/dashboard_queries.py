@@ -0,0 +1,207 @@
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# SQL de la analítica del dashboard. Todas las secciones parten del mismo CTE con las
+# órdenes del rango, así la versión de una sola consulta recorre ordenes_trabajo una vez
+# (o solo para el KPI de reincidencia, cuando las demás secciones salen del resumen diario).
+
+# Granularidad de tendencias -> (campo de date_trunc, paso de generate_series, formato de la etiqueta)
+GRANULARIDADES = {
+    "day": ("day", "1 day", "YYYY-MM-DD"),
+    "week": ("week", "1 week", 'IYYY-"W"IW'),
+    "month": ("month", "1 month", "YYYY-MM"),
+    "quarter": ("quarter", "3 months", 'YYYY-"Q"Q'),
+}
+
+CTE_PERIODO = """
+ordenes_periodo AS (
+    SELECT id_appsheet, fecha_ingreso, tecnico_id, servicio_id, cliente_id, equipo_id
+    FROM ordenes_trabajo
+    WHERE fecha_ingreso >= :inicio AND fecha_ingreso <= :fin
+)
+"""
+
+# Órdenes del periodo con su serie normalizada; `reincide` marca las que llegaron dentro
+# de la ventana desde la orden anterior del mismo equipo (cuyo técnico queda como responsable).
+CTE_SERIES = """
+ordenes AS (
+    SELECT o.id_appsheet, o.fecha_ingreso, o.tecnico_id, o.cliente_id, upper(e.serie) AS serie
+    FROM ordenes_periodo o
+    JOIN equipos e ON e.id = o.equipo_id
+),
+series AS (
+    SELECT id_appsheet, fecha_ingreso, cliente_id, serie,
+           count(*) OVER (PARTITION BY serie) AS veces,
+           lag(tecnico_id) OVER w AS tecnico_anterior,
+           fecha_ingreso - lag(fecha_ingreso) OVER w <= :dias AS reincide
+    FROM ordenes
+    WHERE length(serie) > 3 AND serie <> 'S/N'  -- Ignorar series basura
+    WINDOW w AS (PARTITION BY serie ORDER BY fecha_ingreso, id_appsheet)
+)
+"""
+
+SQL_REINCIDENCIAS_BASE = "WITH " + CTE_PERIODO + "," + CTE_SERIES
+
+SQL_REINCIDENCIAS_KPI = SQL_REINCIDENCIAS_BASE + """
+SELECT (SELECT count(*) FROM ordenes) AS total,
+       count(DISTINCT serie) FILTER (WHERE veces > 1) AS series_repetidas,
+       count(*) FILTER (WHERE reincide) AS en_ventana
+FROM series
+"""
+
+SQL_REINCIDENCIAS_TECNICO = SQL_REINCIDENCIAS_BASE + """
+SELECT coalesce(t.nombre_completo, 'Sin técnico') AS nombre, count(*) AS reincidencias
+FROM series s
+LEFT JOIN tecnicos t ON t.id = s.tecnico_anterior
+WHERE s.reincide
+GROUP BY 1
+ORDER BY 2 DESC
+LIMIT 10
+"""
+
+SQL_REINCIDENCIAS_CLIENTE = SQL_REINCIDENCIAS_BASE + """
+SELECT s.cliente_id, coalesce(c.nombre_fiscal, s.cliente_id, 'S/N') AS nombre, count(*) AS reincidencias
+FROM series s
+LEFT JOIN clientes c ON c.id_cliente_appsheet = s.cliente_id
+WHERE s.reincide
+GROUP BY 1, 2
+ORDER BY 3 DESC
+LIMIT 10
+"""
+
+
+# Secciones agregadas (técnicos, servicios, ciudades y conteo por periodo) según la fuente:
+# 'ordenes' cuenta las órdenes del rango; 'resumen' suma el resumen diario (daily_rollup),
+# cuyo costo depende de los días del rango y no de la cantidad de órdenes.
+def _cte_agregados(fuente, campo):
+    if fuente == "resumen":
+        return f"""
+resumen_periodo AS (
+    SELECT fecha, tecnico_id, servicio_id, con_cliente, ciudad, ordenes
+    FROM resumen_diario_ordenes
+    WHERE fecha >= :inicio AND fecha <= :fin
+),
+tecnicos_periodo AS (
+    SELECT t.nombre_completo AS name, sum(r.ordenes) AS total
+    FROM resumen_periodo r JOIN tecnicos t ON t.id = r.tecnico_id
+    GROUP BY t.nombre_completo
+),
+servicios_periodo AS (
+    SELECT ts.nombre AS name, sum(r.ordenes) AS value
+    FROM resumen_periodo r JOIN tipos_servicio ts ON ts.id = r.servicio_id
+    GROUP BY ts.nombre
+),
+ciudades_periodo AS (
+    SELECT coalesce(r.ciudad, 'S/N') AS city, sum(r.ordenes) AS count
+    FROM resumen_periodo r
+    WHERE r.con_cliente
+    GROUP BY r.ciudad
+    ORDER BY sum(r.ordenes) DESC
+    LIMIT 10
+),
+conteo_periodo AS (
+    SELECT date_trunc('{campo}', CAST(fecha AS timestamp)) AS periodo, sum(ordenes) AS total
+    FROM resumen_periodo GROUP BY 1
+)"""
+    return f"""
+tecnicos_periodo AS (
+    SELECT t.nombre_completo AS name, count(*) AS total
+    FROM ordenes_periodo o JOIN tecnicos t ON t.id = o.tecnico_id
+    GROUP BY t.nombre_completo
+),
+servicios_periodo AS (
+    SELECT ts.nombre AS name, count(*) AS value
+    FROM ordenes_periodo o JOIN tipos_servicio ts ON ts.id = o.servicio_id
+    GROUP BY ts.nombre
+),
+ciudades_periodo AS (
+    SELECT coalesce(c.ciudad, 'S/N') AS city, count(*) AS count
+    FROM ordenes_periodo o JOIN clientes c ON c.id_cliente_appsheet = o.cliente_id
+    GROUP BY c.ciudad
+    ORDER BY count(*) DESC
+    LIMIT 10
+),
+conteo_periodo AS (
+    SELECT date_trunc('{campo}', CAST(fecha_ingreso AS timestamp)) AS periodo, count(*) AS total
+    FROM ordenes_periodo GROUP BY 1
+)"""
+
+
+def _sql_dashboard(granularity, fuente="ordenes"):
+    """
+    Las cinco secciones del dashboard en una sola sentencia (una fila con columnas JSON).
+    El KPI de reincidencia siempre sale de las órdenes: necesita la serie de cada equipo.
+    """
+    campo, paso, formato = GRANULARIDADES[granularity]
+    return "WITH " + CTE_PERIODO + "," + CTE_SERIES + "," + _cte_agregados(fuente, campo) + f""",
+tendencias AS (
+    SELECT s.periodo, coalesce(x.total, 0) AS count
+    FROM generate_series(date_trunc('{campo}', CAST(:inicio AS timestamp)),
+                         date_trunc('{campo}', CAST(:fin AS timestamp)), interval '{paso}') AS s(periodo)
+    LEFT JOIN conteo_periodo x ON x.periodo = s.periodo
+),
+reincidencias_tecnico AS (
+    SELECT coalesce(t.nombre_completo, 'Sin técnico') AS name, count(*) AS count
+    FROM series s LEFT JOIN tecnicos t ON t.id = s.tecnico_anterior
+    WHERE s.reincide
+    GROUP BY 1 ORDER BY 2 DESC LIMIT 10
+),
+reincidencias_cliente AS (
+    SELECT s.cliente_id AS id, coalesce(c.nombre_fiscal, s.cliente_id, 'S/N') AS name, count(*) AS count
+    FROM series s LEFT JOIN clientes c ON c.id_cliente_appsheet = s.cliente_id
+    WHERE s.reincide
+    GROUP BY 1, 2 ORDER BY 3 DESC LIMIT 10
+)
+SELECT
+    (SELECT coalesce(json_agg(json_build_object('name', name, 'total', total) ORDER BY total DESC), CAST('[]' AS json))
+       FROM tecnicos_periodo) AS technicians,
+    (SELECT coalesce(json_agg(json_build_object('date', to_char(periodo, '{formato}'), 'count', count) ORDER BY periodo), CAST('[]' AS json))
+       FROM tendencias) AS trends,
+    (SELECT coalesce(json_agg(json_build_object('name', name, 'value', value)), CAST('[]' AS json))
+       FROM servicios_periodo) AS services,
+    (SELECT coalesce(json_agg(json_build_object('city', city, 'count', count) ORDER BY count DESC), CAST('[]' AS json))
+       FROM ciudades_periodo) AS locations,
+    (SELECT count(*) FROM ordenes) AS total,
+    (SELECT count(DISTINCT serie) FILTER (WHERE veces > 1) FROM series) AS series_repetidas,
+    (SELECT count(*) FILTER (WHERE reincide) FROM series) AS en_ventana,
+    (SELECT coalesce(json_agg(json_build_object('name', name, 'count', count) ORDER BY count DESC), CAST('[]' AS json))
+       FROM reincidencias_tecnico) AS por_tecnico,
+    (SELECT coalesce(json_agg(json_build_object('id', id, 'name', name, 'count', count) ORDER BY count DESC), CAST('[]' AS json))
+       FROM reincidencias_cliente) AS por_cliente
+"""
+
+
+def kpi_calidad(total_ordenes, reincidencias, en_ventana, dias, por_tecnico, por_cliente):
+    # Fórmula KPI
+    tasa_calidad = 100
+    if total_ordenes > 0:
+        pct_fallas = (reincidencias / total_ordenes) * 100
+        tasa_calidad = round(max(0, 100 - pct_fallas), 1)
+
+    return {
+        "total_trabajos": total_ordenes,
+        "reincidencias_detectadas": reincidencias,
+        "tasa_calidad": tasa_calidad,
+        "ventana_dias": dias,
+        "reincidencias_en_ventana": en_ventana,
+        "por_tecnico": por_tecnico,
+        "por_cliente": por_cliente,
+    }
+
+
+def metricas_una_consulta(db: Session, start_date: date, end_date: date, granularity: str = "month",
+                          dias: int = 30, fuente: str = "ordenes"):
+    """Misma respuesta que `obtener_metricas_raw` en modo 'multiple', en una sola ida al servidor."""
+    fila = db.execute(
+        text(_sql_dashboard(granularity, fuente)), {"inicio": start_date, "fin": end_date, "dias": dias}
+    ).one()
+    return {
+        "periodo": f"{start_date} al {end_date}",
+        "technicians": fila.technicians,
+        "trends": fila.trends,
+        "services": fila.services,
+        "locations": fila.locations,
+        "quality_kpi": kpi_calidad(fila.total, fila.series_repetidas, fila.en_ventana, dias,
+                                   fila.por_tecnico, fila.por_cliente),
+    }
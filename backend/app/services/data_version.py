@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import VersionDatos
+
+# Versión de los datos por tabla destino. El ETL la incrementa dentro de la misma transacción
+# de la carga, así la nueva versión se ve exactamente cuando se ven los datos nuevos, desde
+# cualquier worker. Las cachés derivadas (dashboard) se invalidan comparando versiones.
+
+
+def incrementar_version(db: Session, tabla):
+    """Suma 1 a la versión de `tabla` (no hace commit)."""
+    sentencia = insert(VersionDatos).values(tabla=tabla, version=1, actualizado=datetime.now())
+    db.execute(sentencia.on_conflict_do_update(
+        index_elements=[VersionDatos.tabla],
+        set_={"version": VersionDatos.version + 1, "actualizado": sentencia.excluded.actualizado},
+    ))
+
+
+def version_datos(db: Session):
+    """Versión global: crece cada vez que cualquier tabla cambia."""
+    return db.execute(select(func.coalesce(func.sum(VersionDatos.version), 0))).scalar()
+
+
+def versiones_de(db: Session, tablas):
+    """{tabla: (version, actualizado)} de las tablas indicadas (las que nunca cambiaron: (0, None))."""
+    filas = {
+        v.tabla: (v.version, v.actualizado)
+        for v in db.query(VersionDatos).filter(VersionDatos.tabla.in_(tablas)).all()
+    }
+    return {tabla: filas.get(tabla, (0, None)) for tabla in tablas}
+
+
+def versiones(db: Session):
+    return {
+        v.tabla: {"version": v.version, "actualizado": v.actualizado}
+        for v in db.query(VersionDatos).all()
+    }
@@ -0,0 +1,138 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from app.models import Tecnico, TipoServicio, Industria, Equipo, Cliente
+
+
+class ResolvedorDimensiones:
+    """
+    Caché en memoria de los catálogos (Técnicos, Servicios, Industrias, Equipos y Clientes)
+    para una corrida del ETL.
+
+    Flujo de uso:
+      1. `registrar_*` por cada fila (solo memoria, sin consultas).
+      2. `materializar()` una vez por lote: crea en bloque los miembros que faltan.
+      3. `*_id(...)` devuelve el ID desde la caché.
+
+    Cada catálogo se precarga con UNA consulta la primera vez que se usa, así el costo
+    del ETL depende del tamaño de la hoja y no de la latencia de la base de datos.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._tecnicos = None    # nombre_completo -> id
+        self._servicios = None   # nombre -> id
+        self._industrias = None  # nombre -> id
+        self._equipos = None     # serie -> id
+        self._clientes = None    # set de id_cliente_appsheet
+
+        # Miembros pendientes de crear (se insertan en materializar)
+        self._tecnicos_nuevos = set()
+        self._servicios_nuevos = set()
+        self._industrias_nuevas = set()
+        self._equipos_nuevos = {}  # serie -> datos del equipo (gana el primero)
+        self._clientes_nuevos = set()
+
+    # --- PRECARGA PEREZOSA ---
+    @property
+    def tecnicos(self):
+        if self._tecnicos is None:
+            self._tecnicos = dict(self.db.execute(select(Tecnico.nombre_completo, Tecnico.id)).all())
+        return self._tecnicos
+
+    @property
+    def servicios(self):
+        if self._servicios is None:
+            self._servicios = dict(self.db.execute(select(TipoServicio.nombre, TipoServicio.id)).all())
+        return self._servicios
+
+    @property
+    def industrias(self):
+        if self._industrias is None:
+            self._industrias = dict(self.db.execute(select(Industria.nombre, Industria.id)).all())
+        return self._industrias
+
+    @property
+    def equipos(self):
+        if self._equipos is None:
+            # Si hay series duplicadas nos quedamos con el equipo más antiguo
+            filas = self.db.execute(
+                select(Equipo.serie, Equipo.id).where(Equipo.serie.isnot(None)).order_by(Equipo.id.desc())
+            ).all()
+            self._equipos = dict(filas)
+        return self._equipos
+
+    @property
+    def clientes(self):
+        if self._clientes is None:
+            self._clientes = set(self.db.execute(select(Cliente.id_cliente_appsheet)).scalars().all())
+        return self._clientes
+
+    # --- REGISTRO (SOLO MEMORIA) ---
+    def registrar_tecnico(self, nombre):
+        if nombre and nombre not in self.tecnicos:
+            self._tecnicos_nuevos.add(nombre)
+
+    def registrar_servicio(self, nombre):
+        if nombre and nombre not in self.servicios:
+            self._servicios_nuevos.add(nombre)
+
+    def registrar_industria(self, nombre):
+        if nombre and nombre not in self.industrias:
+            self._industrias_nuevas.add(nombre)
+
+    def registrar_equipo(self, serie, **datos):
+        if serie and serie not in self.equipos and serie not in self._equipos_nuevos:
+            self._equipos_nuevos[serie] = datos
+
+    def registrar_cliente(self, id_cliente):
+        """Registra un cliente 'fantasma' si la FK apunta a un ID que aún no existe."""
+        if id_cliente and id_cliente not in self.clientes:
+            self._clientes_nuevos.add(id_cliente)
+
+    # --- CREACIÓN EN BLOQUE ---
+    def _crear_catalogo(self, model, columna, nombres, cache):
+        if not nombres:
+            return
+        nombres = sorted(nombres)
+        stmt = insert(model).values([{columna.key: n} for n in nombres])
+        self.db.execute(stmt.on_conflict_do_nothing(index_elements=[columna]))
+        # Releemos para incluir los que otro proceso haya creado en paralelo
+        cache.update(self.db.execute(select(columna, model.id).where(columna.in_(nombres))).all())
+
+    def materializar(self):
+        """Inserta en bloque todos los miembros pendientes y actualiza la caché con sus IDs."""
+        self._crear_catalogo(Tecnico, Tecnico.nombre_completo, self._tecnicos_nuevos, self.tecnicos)
+        self._crear_catalogo(TipoServicio, TipoServicio.nombre, self._servicios_nuevos, self.servicios)
+        self._crear_catalogo(Industria, Industria.nombre, self._industrias_nuevas, self.industrias)
+        self._tecnicos_nuevos.clear()
+        self._servicios_nuevos.clear()
+        self._industrias_nuevas.clear()
+
+        # Los clientes van antes que los equipos por la FK equipos.cliente_id
+        if self._clientes_nuevos:
+            stmt = insert(Cliente).values([
+                {"id_cliente_appsheet": c, "nombre_fiscal": f"Cliente {c}"} for c in sorted(self._clientes_nuevos)
+            ])
+            self.db.execute(stmt.on_conflict_do_nothing(index_elements=[Cliente.id_cliente_appsheet]))
+            self.clientes.update(self._clientes_nuevos)
+            self._clientes_nuevos.clear()
+
+        if self._equipos_nuevos:
+            valores = [{"serie": serie, **datos} for serie, datos in self._equipos_nuevos.items()]
+            stmt = insert(Equipo).values(valores).returning(Equipo.serie, Equipo.id)
+            self.equipos.update(self.db.execute(stmt).all())
+            self._equipos_nuevos.clear()
+
+    # --- CONSULTA DE IDS ---
+    def tecnico_id(self, nombre):
+        return self.tecnicos.get(nombre) if nombre else None
+
+    def servicio_id(self, nombre):
+        return self.servicios.get(nombre) if nombre else None
+
+    def industria_id(self, nombre):
+        return self.industrias.get(nombre) if nombre else None
+
+    def equipo_id(self, serie):
+        return self.equipos.get(serie) if serie else None
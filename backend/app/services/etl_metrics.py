@@ -0,0 +1,194 @@
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from sqlalchemy import event
+from app.database import engine, SessionLocal
+from app.models import CorridaSync
+
+# Instrumentación del ETL: tiempos por etapa (descarga, transformacion, resolucion, carga),
+# filas/seg y sentencias SQL de cada corrida, persistidos en `sync_runs`.
+#
+# La medición activa vive en un ContextVar: las etapas y el contador de SQL solo registran
+# dentro de `medir_corrida`, así los mismos helpers del ETL sirven sin medir (eventos, scripts).
+
+logger = logging.getLogger("app.etl")
+
+_medicion_actual: ContextVar = ContextVar("medicion_etl", default=None)
+
+
+class MedicionSync:
+    def __init__(self, hoja, job_id=None):
+        self.hoja = hoja
+        self.job_id = job_id
+        self.iniciado = datetime.now()
+        self._inicio = time.perf_counter()
+        self._fin = None
+        self.etapas = {}
+        self.filas = {"filas_leidas": 0, "filas_transformadas": 0, "filas_cargadas": 0}
+        self.sentencias_sql = 0
+        self.segundos_sql = 0.0
+        self.resultado = None     # respuesta del ETL (la asigna el llamador)
+        self.consumo_api = None   # consumo de la API de Sheets (sheets_client.medir_consumo)
+
+    def sumar_etapa(self, etapa, segundos):
+        self.etapas[etapa] = self.etapas.get(etapa, 0.0) + segundos
+
+    def avance(self, **campos):
+        """Recibe el mismo avance que se reporta al job (totales acumulados)."""
+        for k, v in campos.items():
+            if k in self.filas:
+                self.filas[k] = v
+
+    def resumen(self):
+        segundos = (self._fin or time.perf_counter()) - self._inicio
+        carga = self.etapas.get("carga")
+        return {
+            "segundos": round(segundos, 3),
+            **self.filas,
+            "filas_por_segundo": round(self.filas["filas_leidas"] / segundos, 1) if segundos > 0 else None,
+            "filas_cargadas_por_segundo": round(self.filas["filas_cargadas"] / carga, 1) if carga else None,
+            "sentencias_sql": self.sentencias_sql,
+            "segundos_sql": round(self.segundos_sql, 3),
+            "etapas": {k: round(v, 3) for k, v in self.etapas.items()},
+        }
+
+
+@contextmanager
+def etapa(nombre):
+    """Span de una etapa del ETL; suma su duración a la corrida en curso (si hay una)."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        medicion.sumar_etapa(nombre, segundos)
+        logger.info("etl.etapa hoja=%s etapa=%s segundos=%.3f", medicion.hoja, nombre, segundos)
+
+
+@contextmanager
+def sin_medicion():
+    """Excluye de la corrida el SQL del bloque (por ejemplo, las actualizaciones de progreso del job)."""
+    token = _medicion_actual.set(None)
+    try:
+        yield
+    finally:
+        _medicion_actual.reset(token)
+
+
+@contextmanager
+def medir_corrida(hoja, job_id=None):
+    """
+    Mide una corrida completa y al salir la guarda en `sync_runs`. El llamador asigna
+    `medicion.resultado` (y `medicion.consumo_api` si lo tiene) antes de salir del bloque.
+    """
+    medicion = MedicionSync(hoja, job_id)
+    token = _medicion_actual.set(medicion)
+    error = None
+    try:
+        yield medicion
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        medicion._fin = time.perf_counter()
+        _medicion_actual.reset(token)
+        _guardar_corrida(medicion, error)
+
+
+def _guardar_corrida(medicion: MedicionSync, error=None):
+    resumen = medicion.resumen()
+    resultado = medicion.resultado or {}
+    consumo = medicion.consumo_api or {}
+    estado = "error" if error else resultado.get("status", "success")
+    error = error or (resultado.get("message") if estado == "error" else None)
+
+    logger.info(
+        "etl.corrida hoja=%s estado=%s segundos=%.3f filas=%s filas_seg=%s sql=%s etapas=%s",
+        medicion.hoja, estado, resumen["segundos"], resumen["filas_leidas"],
+        resumen["filas_por_segundo"], resumen["sentencias_sql"], resumen["etapas"]
+    )
+
+    db = SessionLocal()
+    try:
+        db.add(CorridaSync(
+            job_id=medicion.job_id,
+            hoja=medicion.hoja,
+            estado=estado,
+            iniciado=medicion.iniciado,
+            segundos=resumen["segundos"],
+            filas_leidas=resumen["filas_leidas"],
+            filas_transformadas=resumen["filas_transformadas"],
+            filas_cargadas=resumen["filas_cargadas"],
+            filas_por_segundo=resumen["filas_por_segundo"],
+            sentencias_sql=resumen["sentencias_sql"],
+            segundos_sql=resumen["segundos_sql"],
+            llamadas_api=consumo.get("llamadas", 0),
+            bytes_api=consumo.get("bytes", 0),
+            etapas=resumen["etapas"],
+            error=error,
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning("No se pudo guardar la corrida de %s en sync_runs: %s", medicion.hoja, e)
+    finally:
+        db.close()
+
+
+def listar_corridas(hoja=None, limite=20):
+    db = SessionLocal()
+    try:
+        consulta = db.query(CorridaSync)
+        if hoja:
+            consulta = consulta.filter(CorridaSync.hoja == hoja)
+        corridas = consulta.order_by(CorridaSync.iniciado.desc()).limit(limite).all()
+        return [{
+            "id": c.id,
+            "job_id": c.job_id,
+            "hoja": c.hoja,
+            "estado": c.estado,
+            "iniciado": c.iniciado,
+            "segundos": c.segundos,
+            "filas_leidas": c.filas_leidas,
+            "filas_transformadas": c.filas_transformadas,
+            "filas_cargadas": c.filas_cargadas,
+            "filas_por_segundo": c.filas_por_segundo,
+            "sentencias_sql": c.sentencias_sql,
+            "segundos_sql": c.segundos_sql,
+            "llamadas_api": c.llamadas_api,
+            "bytes_api": c.bytes_api,
+            "etapas": c.etapas,
+            "error": c.error,
+        } for c in corridas]
+    finally:
+        db.close()
+
+
+# --- CONTADOR DE SQL (idas y vueltas reales al servidor) ---
+@event.listens_for(engine, "before_cursor_execute")
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    if _medicion_actual.get() is not None:
+        conn.info.setdefault("etl_inicio_sql", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _despues_sql(conn, cursor, statement, parameters, context, executemany):
+    medicion = _medicion_actual.get()
+    pila = conn.info.get("etl_inicio_sql")
+    if medicion is None or not pila:
+        return
+    medicion.sentencias_sql += 1
+    medicion.segundos_sql += time.perf_counter() - pila.pop()
+
+
+@event.listens_for(engine, "handle_error")
+def _error_sql(contexto):
+    pila = contexto.connection.info.get("etl_inicio_sql") if contexto.connection is not None else None
+    if pila:
+        pila.pop()
@@ -1,19 +1,26 @@
-import time
-import re
-import unicodedata
+import os
 from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
 from datetime import datetime
-from app.models import Cliente, OrdenTrabajo, VisitaCampo, Industria, Tecnico, Equipo, TipoServicio
-from app.services.sheets_client import get_gspread_client
-
-SPREADSHEET_ID = "1UxrhgQATwY1yQAhm_pM4xc3sGUpr_Aw8VQH6IRpAXkU"
+from app.models import Cliente, OrdenTrabajo, VisitaCampo
+from app.services.sheet_sources import HojaNoEncontrada, obtener_fuente
+from app.services.dimension_resolver import ResolvedorDimensiones
+from app.services.bulk_loader import upsert_por_lotes
+from app.services.column_extractor import ExtractorColumnas
+from app.services.fingerprint_store import AlmacenHuellas
+from app.services.copy_loader import copiar_clientes, copiar_ordenes, copiar_visitas
+from app.services.vectorized_transform import transformar_columnar
+from app.services.etl_metrics import etapa
+from app.services.daily_rollup import dias_de_ordenes, dias_por_cambio_de_ciudad, refrescar_dias
+from app.services.data_version import incrementar_version
 
 # Nombres exactos de las pestañas
 HOJA_CLIENTES = "Clientes"
 HOJA_INGRESOS = "Ingresos"
 HOJA_CAMPO = "Campo"
 
+# Transformación columnar (pandas) en lugar de fila por fila; mismo resultado
+ETL_VECTORIZADO = os.getenv("ETL_VECTORIZADO", "0") == "1"
+
 
 # --- HELPERS ---
 def normalizar_texto(texto):
@@ -21,14 +28,6 @@ def normalizar_texto(texto):
     return str(texto).strip()
 
 
-def normalizar_header(texto):
-    if not texto: return ""
-    texto = str(texto).lower().strip()
-    texto = ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
-    texto = re.sub(r'[^a-z0-9]', '', texto)
-    return texto
-
-
 def parse_date(date_str):
     if not date_str: return None
     date_str = str(date_str).strip()
@@ -44,43 +43,29 @@ def parse_date(date_str):
         return None
 
 
-def get_or_create(session, model, **kwargs):
-    """Busca un registro, si no existe lo crea y devuelve la instancia"""
-    instance = session.query(model).filter_by(**kwargs).first()
-    if instance:
-        return instance
-    else:
-        instance = model(**kwargs)
-        session.add(instance)
-        session.flush()  # Para obtener el ID sin commit final
-        return instance
-
-
-def obtener_valor(row, headers_map, key_db):
+def compilar_hoja(raw_data, mapeo, campo_id, nombre_hoja):
     """
-    Busca el valor en la fila normalizando las llaves.
-    Retorna None si la celda está vacía, para que la BD guarde NULL.
+    Compila el extractor de columnas contra la fila de encabezados.
+    Retorna (extractor, filas) o lanza ValueError si falta la columna ID.
     """
-    # 1. Normalizamos las llaves que vienen del Excel
-    row_normalized = {}
-    for k, v in row.items():
-        clean_key = normalizar_header(k)
-        row_normalized[clean_key] = v
+    headers = raw_data[0]
+    extractor = ExtractorColumnas(headers, mapeo)
+
+    # 🕵️ DIAGNÓSTICO (una sola vez por hoja)
+    if extractor.faltantes:
+        print(f"⚠️ [{nombre_hoja}] Campos sin columna en la hoja: {extractor.faltantes}")
+    if extractor.sin_mapear:
+        print(f"👀 [{nombre_hoja}] Columnas ignoradas: {extractor.sin_mapear}")
 
-    # 2. Buscamos según el mapa
-    posibles = headers_map.get(key_db, [])
-    for p in posibles:
-        if p in row_normalized:
-            val = row_normalized[p]
+    if campo_id in extractor.faltantes:
+        print(f"❌ ERROR CRÍTICO: No encuentro columna 'ID' en {nombre_hoja}. Encabezados reales: {headers}")
+        raise ValueError("Columna ID no encontrada")
 
-            # Si es vacío, retornamos None (Null en BD)
-            if val == "" or val is None:
-                return None
+    return extractor, raw_data[1:]
 
-            # Convertimos a string seguro (por si es número 123)
-            return str(val).strip()
 
-    return None
+def _sin_progreso(**avance):
+    pass
 
 
 # --- MAPEOS DE COLUMNAS ---
@@ -110,244 +95,404 @@ MAPEO_CAMPO = {
 }
 
 
-# --- ETL CLIENTES ---
-def ejecutar_etl_clientes(db: Session):
-    print("\n🔵 INICIANDO CARGA DE CLIENTES (MODO ROBUSTO)...")
-    try:
-        client = get_gspread_client()
-        sheet = client.open_by_key(SPREADSHEET_ID).worksheet(HOJA_CLIENTES)
-
-        # CAMBIO CLAVE: Usamos get_all_values en lugar de get_all_records
-        # Esto trae una lista de listas: [['ID', 'Nombre'], ['1', 'Juan']]
-        # No falla si hay columnas repetidas.
-        raw_data = sheet.get_all_values()
-
-        if not raw_data or len(raw_data) < 2:
-            print("❌ ERROR: La hoja parece vacía o solo tiene encabezados.")
-            return {"status": "error", "message": "Hoja vacía"}
-
-        # Separamos encabezados y datos
-        headers = raw_data[0]
-        filas = raw_data[1:]
-
-        # Convertimos la matriz en una lista de diccionarios manualmente
-        # Si hay columnas repetidas, Python se quedará con la última automáticamente y no dará error.
-        registros = []
-        for fila in filas:
-            row_dict = {}
-            for i, h in enumerate(headers):
-                # Aseguramos que no nos salgamos del índice si la fila es más corta
-                val = fila[i] if i < len(fila) else ""
-                row_dict[str(h)] = val  # Usamos el encabezado original como llave
-            registros.append(row_dict)
-
-        # 🕵️ DIAGNÓSTICO
-        headers_leidos = [normalizar_header(k) for k in headers]
-        print(f"👀 Encabezados leídos: {headers_leidos}")
-
-        if "id" not in headers_leidos:
-            print(f"❌ ERROR CRÍTICO: No encuentro columna 'ID'. Encabezados reales: {headers}")
-            return {"status": "error", "message": "Columna ID no encontrada"}
+# --- EXTRACCIÓN ---
+def leer_hoja(nombre_hoja):
+    """
+    Descarga la pestaña completa como matriz (get_all_values): [['ID', 'Nombre'], ['1', 'Juan']].
+    El origen (Google Sheets o snapshots locales) se elige con SHEETS_SOURCE.
+    """
+    return obtener_fuente().leer_hoja(nombre_hoja)
+
+
+# --- TRANSFORMACIÓN (sin base de datos) ---
+def normalizar_fila_cliente(row):
+    return {
+        "id_cliente_appsheet": row["id_cliente_appsheet"],
+        "clave": row["clave"],
+        # Si el nombre viene vacío, ponemos 'Sin Nombre' para que no quede invisible
+        "nombre_fiscal": row["nombre_fiscal"] or "Sin Nombre",
+        "ruc": row["ruc"],
+        "ciudad": row["ciudad"],
+        "direccion": row["direccion"],
+        "contacto": row["contacto"],
+        "telefono": row["telefono"],
+        "correo": row["correo"],
+        "industria_nombre": row["industria_nombre"].upper() if row["industria_nombre"] else None,
+    }
+
+
+def normalizar_fila_ingreso(row):
+    tec_nombre = row["tecnico_nombre"]
+    return {
+        "id_appsheet": row["id_appsheet"],
+        "fecha_ingreso": parse_date(row["fecha_ingreso"]),
+        "tipo_ingreso": row["tipo_ingreso"],
+        "no_orden_taller": row["no_orden_taller"],
+        "no_orden_campo": row["no_orden_campo"],
+        "estado": row["estado"],
+        "observaciones": row["observaciones"],
+        "dano_reportado": row["dano_reportado"],
+        "cliente_id": row["cliente_id"],
+        "servicio_nombre": row["servicio_nombre"].upper() if row["servicio_nombre"] else None,
+        "tecnico_nombre": tec_nombre.title() if tec_nombre and len(tec_nombre) > 2 else None,
+        "serie": row["serie"],
+        "marca": row["marca"],
+        "modelo": row["modelo"],
+        "tipo_equipo": row["tipo_equipo"],
+        "capacidad": row["capacidad"],
+        "sensibilidad": row["sensibilidad"],
+    }
+
+
+def normalizar_fila_campo(row):
+    return {
+        "id_campo_appsheet": row["id_campo_appsheet"],
+        "codigo": row["codigo"],
+        "agencia_zona": row["agencia_zona"],
+        "ubicacion": row["ubicacion"],
+        "estado": row["estado"],
+        "enlace_informe": row["enlace_informe"],
+        "ultima_fecha": parse_date(row["ultima_fecha"]),
+        "tecnico1": row["tecnico1"].title() if row["tecnico1"] else None,
+        "tecnico2": row["tecnico2"].title() if row["tecnico2"] else None,
+        "serie": row["serie"],
+        "marca": row["marca"],
+        "modelo": row["modelo"],
+    }
+
+
+# Reglas equivalentes a normalizar_fila_* para la etapa columnar (vectorized_transform)
+REGLAS_CLIENTES = {
+    "salida": ["id_cliente_appsheet", "clave", "nombre_fiscal", "ruc", "ciudad", "direccion",
+               "contacto", "telefono", "correo", "industria_nombre"],
+    "defecto": {"nombre_fiscal": "Sin Nombre"},
+    "mayusculas": ["industria_nombre"],
+}
 
-    except Exception as e:
-        print(f"❌ Error GSheets: {e}")
-        return {"status": "error", "message": f"Error GSheets: {str(e)}"}
+REGLAS_INGRESOS = {
+    "salida": ["id_appsheet", "fecha_ingreso", "tipo_ingreso", "no_orden_taller", "no_orden_campo",
+               "estado", "observaciones", "dano_reportado", "cliente_id", "servicio_nombre",
+               "tecnico_nombre", "serie", "marca", "modelo", "tipo_equipo", "capacidad", "sensibilidad"],
+    "fechas": ["fecha_ingreso"],
+    "mayusculas": ["servicio_nombre"],
+    "titulo": {"tecnico_nombre": 3},
+}
+
+REGLAS_CAMPO = {
+    "salida": ["id_campo_appsheet", "codigo", "agencia_zona", "ubicacion", "estado", "enlace_informe",
+               "ultima_fecha", "tecnico1", "tecnico2", "serie", "marca", "modelo"],
+    "fechas": ["ultima_fecha"],
+    "titulo": {"tecnico1": 1, "tecnico2": 1},
+}
 
-    procesados = 0
-    omitidos = 0
 
-    for i, row in enumerate(registros):
-        # Intentamos obtener el ID usando nuestra función auxiliar
-        id_cli = obtener_valor(row, MAPEO_CLIENTES, "id_cliente_appsheet")
+def _transformar(raw_data, mapeo, campo_id, nombre_hoja, normalizar, reglas, vectorizado=None):
+    extractor, registros = compilar_hoja(raw_data, mapeo, campo_id, nombre_hoja)
+    if ETL_VECTORIZADO if vectorizado is None else vectorizado:
+        return transformar_columnar(extractor, registros, campo_id, reglas, parse_date, nombre_hoja)
 
-        if not id_cli:
+    filas = []
+    omitidos = 0
+    for i, fila in enumerate(registros):
+        row = extractor.extraer(fila)
+        if not row[campo_id]:
             omitidos += 1
             if omitidos <= 3:
-                print(f"⚠️ Fila {i + 2} omitida: ID vacío.")
+                print(f"⚠️ [{nombre_hoja}] Fila {i + 2} omitida: ID vacío.")
             continue
+        filas.append(normalizar(row))
+    return {"filas": filas, "leidas": len(registros), "omitidos": omitidos}
+
+
+def transformar_clientes(raw_data, vectorizado=None):
+    if not raw_data or len(raw_data) < 2:
+        print("❌ ERROR: La hoja parece vacía o solo tiene encabezados.")
+        raise ValueError("Hoja vacía")
+    return _transformar(raw_data, MAPEO_CLIENTES, "id_cliente_appsheet", HOJA_CLIENTES,
+                        normalizar_fila_cliente, REGLAS_CLIENTES, vectorizado)
+
+
+def transformar_ingresos(raw_data, vectorizado=None):
+    if not raw_data:
+        raise ValueError("Hoja vacía")
+    return _transformar(raw_data, MAPEO_INGRESOS, "id_appsheet", HOJA_INGRESOS,
+                        normalizar_fila_ingreso, REGLAS_INGRESOS, vectorizado)
+
+
+def transformar_campo(raw_data, vectorizado=None):
+    if not raw_data:
+        raise ValueError("Hoja vacía")
+    return _transformar(raw_data, MAPEO_CAMPO, "id_campo_appsheet", HOJA_CAMPO,
+                        normalizar_fila_campo, REGLAS_CAMPO, vectorizado)
 
-        # Gestión de Industria
-        nombre_ind = obtener_valor(row, MAPEO_CLIENTES, "industria_nombre")
-        industria_obj = None
-        if nombre_ind:
-            industria_obj = get_or_create(db, Industria, nombre=nombre_ind.upper())
-
-        datos = {
-            "id_cliente_appsheet": id_cli,
-            "clave": obtener_valor(row, MAPEO_CLIENTES, "clave"),
-            # Si el nombre viene vacío, ponemos 'Sin Nombre' para que no quede invisible
-            "nombre_fiscal": obtener_valor(row, MAPEO_CLIENTES, "nombre_fiscal") or "Sin Nombre",
-            "ruc": obtener_valor(row, MAPEO_CLIENTES, "ruc"),
-            "ciudad": obtener_valor(row, MAPEO_CLIENTES, "ciudad"),
-            "direccion": obtener_valor(row, MAPEO_CLIENTES, "direccion"),
-            "contacto": obtener_valor(row, MAPEO_CLIENTES, "contacto"),
-            "telefono": obtener_valor(row, MAPEO_CLIENTES, "telefono"),
-            "correo": obtener_valor(row, MAPEO_CLIENTES, "correo"),
-            "industria_id": industria_obj.id if industria_obj else None,
-            "ultima_actualizacion": datetime.now()
-        }
-
-        try:
-            stmt = insert(Cliente).values(datos)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=[Cliente.id_cliente_appsheet],
-                set_=datos
-            )
-            db.execute(stmt)
-            procesados += 1
-        except Exception as e:
-            print(f"❌ Error insertando cliente {id_cli}: {e}")
+
+# --- CARGA ---
+def _confirmar(db: Session, carga, almacen, etiqueta, mensaje, dias_resumen=None):
+    """
+    Guarda huellas, recalcula el resumen diario de los días afectados, sube la versión de
+    datos de la tabla (invalida la caché del dashboard) y hace commit; retorna la respuesta
+    estándar del ETL.
+    """
+    for err in carga["errores"]:
+        print(f"❌ Error insertando {etiqueta} {err['id']}: {err['error']}")
+    conteos = almacen.guardar(err["id"] for err in carga["errores"])
 
     try:
+        if dias_resumen:
+            refrescar_dias(db, dias_resumen)
+        if carga["procesados"] or dias_resumen:
+            incrementar_version(db, almacen.tabla)
         db.commit()
-        print(f"✅ FIN: {procesados} clientes guardados.")
-        return {"status": "success", "mensaje": f"{procesados} guardados, {omitidos} omitidos."}
     except Exception as e:
         db.rollback()
         print(f"❌ Error COMMIT: {e}")
         return {"status": "error", "message": str(e)}
 
+    print(f"✅ FIN {etiqueta}: {carga['procesados']} guardados, {conteos['sin_cambios']} sin cambios.")
+    return {
+        "status": "success",
+        "mensaje": f"{mensaje}, {conteos['sin_cambios']} sin cambios.",
+        **conteos,
+        "carga": carga
+    }
+
+
+def _cargar_copy(db: Session, copiar, filas, almacen, etiqueta, plural, lote, progreso, dias_resumen=None):
+    """Modo masivo: COPY a staging + merge SQL. Si algo falla se revierte toda la hoja."""
+    try:
+        carga = copiar(db, filas)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en carga COPY de {etiqueta}: {e}")
+        return {"status": "error", "message": str(e)}
+    progreso(filas_cargadas=carga["procesados"])
+    return _confirmar(db, carga, almacen, etiqueta,
+                      f"{carga['procesados']} {plural} cargados (COPY), {lote['omitidos']} omitidos", dias_resumen)
+
+
+def cargar_clientes(db: Session, lote, tamano_lote: int = None, forzar: bool = False, progreso=None,
+                    modo: str = "lotes", resolvedor=None, almacen=None):
+    progreso = progreso or _sin_progreso
+    resolvedor = resolvedor or ResolvedorDimensiones(db)
+
+    with etapa("resolucion"):
+        almacen = almacen or AlmacenHuellas(db, Cliente, "id_cliente_appsheet")
+        # 1. Descartamos filas sin cambios y registramos industrias (solo memoria)
+        filas = [r for r in lote["filas"] if almacen.cambio(r["id_cliente_appsheet"], r, forzar)]
+        # Si cambia la ciudad de un cliente, cambian las ubicaciones de sus días en el resumen
+        dias_resumen = dias_por_cambio_de_ciudad(db, filas)
+    progreso(filas_transformadas=len(filas))
+    if modo == "copy":
+        with etapa("carga"):
+            return _cargar_copy(db, copiar_clientes, filas, almacen, "cliente", "clientes", lote, progreso,
+                                dias_resumen)
+
+    with etapa("resolucion"):
+        for r in filas:
+            resolvedor.registrar_industria(r["industria_nombre"])
+
+        # 2. Creamos en bloque las industrias nuevas
+        resolvedor.materializar()
+
+    with etapa("carga"):
+        # 3. Armamos las filas con los IDs ya resueltos desde la caché
+        ahora = datetime.now()
+        datos = []
+        for r in filas:
+            datos.append({
+                "id_cliente_appsheet": r["id_cliente_appsheet"],
+                "clave": r["clave"],
+                "nombre_fiscal": r["nombre_fiscal"],
+                "ruc": r["ruc"],
+                "ciudad": r["ciudad"],
+                "direccion": r["direccion"],
+                "contacto": r["contacto"],
+                "telefono": r["telefono"],
+                "correo": r["correo"],
+                "industria_id": resolvedor.industria_id(r["industria_nombre"]),
+                "ultima_actualizacion": ahora
+            })
+
+        # 4. Upsert en lotes
+        carga = upsert_por_lotes(db, Cliente, datos, "id_cliente_appsheet", tamano_lote,
+                                 avance=lambda n: progreso(filas_cargadas=n))
+        return _confirmar(db, carga, almacen, "cliente",
+                          f"{carga['procesados']} guardados, {lote['omitidos']} omitidos", dias_resumen)
+
+
+def cargar_ingresos(db: Session, lote, tamano_lote: int = None, forzar: bool = False, progreso=None,
+                    modo: str = "lotes", resolvedor=None, almacen=None):
+    progreso = progreso or _sin_progreso
+    resolvedor = resolvedor or ResolvedorDimensiones(db)
+
+    with etapa("resolucion"):
+        almacen = almacen or AlmacenHuellas(db, OrdenTrabajo, "id_appsheet")
+        # 1. Descartamos filas sin cambios y registramos catálogos (solo memoria)
+        filas = [r for r in lote["filas"] if almacen.cambio(r["id_appsheet"], r, forzar)]
+        # Días del resumen a recalcular: la fecha que tenía cada orden y la que trae ahora
+        dias_resumen = dias_de_ordenes(db, [r["id_appsheet"] for r in filas])
+        dias_resumen.update(r["fecha_ingreso"] for r in filas)
+    progreso(filas_transformadas=len(filas))
+    if modo == "copy":
+        with etapa("carga"):
+            return _cargar_copy(db, copiar_ordenes, filas, almacen, "orden", "órdenes", lote, progreso,
+                                dias_resumen)
+
+    with etapa("resolucion"):
+        for r in filas:
+            resolvedor.registrar_tecnico(r["tecnico_nombre"])
+            resolvedor.registrar_servicio(r["servicio_nombre"])
+            # Cliente Fantasma si falla la FK
+            resolvedor.registrar_cliente(r["cliente_id"])
+            # Equipo (Vinculado al cliente), buscado por serie
+            resolvedor.registrar_equipo(
+                r["serie"],
+                marca=r["marca"],
+                modelo=r["modelo"],
+                tipo_equipo=r["tipo_equipo"],
+                capacidad=r["capacidad"],
+                sensibilidad=r["sensibilidad"],
+                cliente_id=r["cliente_id"]
+            )
+
+        # 2. Creamos en bloque técnicos, servicios, clientes y equipos nuevos
+        resolvedor.materializar()
+
+    with etapa("carga"):
+        # 3. Armamos las filas con los IDs desde la caché
+        ahora = datetime.now()
+        datos = []
+        for r in filas:
+            datos.append({
+                "id_appsheet": r["id_appsheet"],
+                "fecha_ingreso": r["fecha_ingreso"],
+                "tipo_ingreso": r["tipo_ingreso"],
+                "no_orden_taller": r["no_orden_taller"],
+                "no_orden_campo": r["no_orden_campo"],
+                "estado": r["estado"],
+                "observaciones": r["observaciones"],
+                "dano_reportado": r["dano_reportado"],
+                "cliente_id": r["cliente_id"],
+                "equipo_id": resolvedor.equipo_id(r["serie"]),
+                "servicio_id": resolvedor.servicio_id(r["servicio_nombre"]),
+                "tecnico_id": resolvedor.tecnico_id(r["tecnico_nombre"]),
+                "ultima_actualizacion": ahora
+            })
+
+        # 4. Upsert en lotes
+        carga = upsert_por_lotes(db, OrdenTrabajo, datos, "id_appsheet", tamano_lote,
+                                 avance=lambda n: progreso(filas_cargadas=n))
+        return _confirmar(db, carga, almacen, "orden", f"{carga['procesados']} órdenes sincronizadas",
+                          dias_resumen)
+
+
+def cargar_campo(db: Session, lote, tamano_lote: int = None, forzar: bool = False, progreso=None,
+                 modo: str = "lotes", resolvedor=None, almacen=None):
+    progreso = progreso or _sin_progreso
+    resolvedor = resolvedor or ResolvedorDimensiones(db)
+
+    with etapa("resolucion"):
+        almacen = almacen or AlmacenHuellas(db, VisitaCampo, "id_campo_appsheet")
+        # 1. Descartamos filas sin cambios y registramos catálogos (solo memoria)
+        filas = [r for r in lote["filas"] if almacen.cambio(r["id_campo_appsheet"], r, forzar)]
+    progreso(filas_transformadas=len(filas))
+    if modo == "copy":
+        with etapa("carga"):
+            return _cargar_copy(db, copiar_visitas, filas, almacen, "visita", "visitas", lote, progreso)
+
+    with etapa("resolucion"):
+        for r in filas:
+            # Técnicos (Hasta 2)
+            resolvedor.registrar_tecnico(r["tecnico1"])
+            resolvedor.registrar_tecnico(r["tecnico2"])
+            # Equipo (Si existe serie). Si es nuevo equipo de campo, va sin cliente asignado por ahora
+            resolvedor.registrar_equipo(r["serie"], marca=r["marca"], modelo=r["modelo"])
+
+        # 2. Creamos en bloque técnicos y equipos nuevos
+        resolvedor.materializar()
+
+    with etapa("carga"):
+        # 3. Armamos las filas con los IDs desde la caché
+        ahora = datetime.now()
+        datos = []
+        for r in filas:
+            datos.append({
+                "id_campo_appsheet": r["id_campo_appsheet"],
+                "codigo": r["codigo"],
+                "agencia_zona": r["agencia_zona"],
+                "ubicacion": r["ubicacion"],
+                "estado": r["estado"],
+                "enlace_informe": r["enlace_informe"],
+                "ultima_fecha": r["ultima_fecha"],
+                "equipo_id": resolvedor.equipo_id(r["serie"]),
+                "tecnico1_id": resolvedor.tecnico_id(r["tecnico1"]),
+                "tecnico2_id": resolvedor.tecnico_id(r["tecnico2"]),
+                "ultima_actualizacion": ahora
+            })
+
+        # 4. Upsert en lotes
+        carga = upsert_por_lotes(db, VisitaCampo, datos, "id_campo_appsheet", tamano_lote,
+                                 avance=lambda n: progreso(filas_cargadas=n))
+        return _confirmar(db, carga, almacen, "visita", f"{carga['procesados']} visitas de campo")
+
+
+# --- ETL CLIENTES ---
+def ejecutar_etl_clientes(db: Session, tamano_lote: int = None, forzar: bool = False, progreso=None,
+                          modo: str = "lotes"):
+    progreso = progreso or _sin_progreso
+    print("\n🔵 INICIANDO CARGA DE CLIENTES (MODO ROBUSTO)...")
+    try:
+        with etapa("descarga"):
+            raw_data = leer_hoja(HOJA_CLIENTES)
+    except Exception as e:
+        print(f"❌ Error GSheets: {e}")
+        return {"status": "error", "message": f"Error GSheets: {str(e)}"}
+
+    try:
+        with etapa("transformacion"):
+            lote = transformar_clientes(raw_data)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    progreso(filas_leidas=lote["leidas"])
+    return cargar_clientes(db, lote, tamano_lote, forzar, progreso, modo)
+
 
 # --- ETL INGRESOS (Ordenes de Trabajo) ---
-def ejecutar_etl_ingresos(db: Session):
+def ejecutar_etl_ingresos(db: Session, tamano_lote: int = None, forzar: bool = False, progreso=None,
+                          modo: str = "lotes"):
+    progreso = progreso or _sin_progreso
     print("🔄 Sincronizando Ingresos...")
     try:
-        client = get_gspread_client()
-        sheet = client.open_by_key(SPREADSHEET_ID).worksheet(HOJA_INGRESOS)
-        registros = sheet.get_all_records()
+        with etapa("descarga"):
+            raw_data = leer_hoja(HOJA_INGRESOS)
+        with etapa("transformacion"):
+            lote = transformar_ingresos(raw_data)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-    procesados = 0
-    for row in registros:
-        id_orden = obtener_valor(row, MAPEO_INGRESOS, "id_appsheet")
-        if not id_orden: continue
-
-        # 1. Gestionar Técnico
-        tec_nombre = obtener_valor(row, MAPEO_INGRESOS, "tecnico_nombre")
-        tec_obj = None
-        if tec_nombre and len(tec_nombre) > 2:
-            tec_obj = get_or_create(db, Tecnico, nombre_completo=tec_nombre.title())
-
-        # 2. Gestionar Servicio
-        serv_nombre = obtener_valor(row, MAPEO_INGRESOS, "servicio_nombre")
-        serv_obj = None
-        if serv_nombre:
-            serv_obj = get_or_create(db, TipoServicio, nombre=serv_nombre.upper())
-
-        # 3. Gestionar Equipo (Vinculado al cliente)
-        cliente_id = obtener_valor(row, MAPEO_INGRESOS, "cliente_id")
-        serie = obtener_valor(row, MAPEO_INGRESOS, "serie")
-        equipo_obj = None
-
-        # Buscamos equipo por serie y cliente, si no existe, lo creamos
-        if serie:
-            equipo_obj = db.query(Equipo).filter_by(serie=serie).first()
-            if not equipo_obj:
-                equipo_obj = Equipo(
-                    serie=serie,
-                    marca=obtener_valor(row, MAPEO_INGRESOS, "marca"),
-                    modelo=obtener_valor(row, MAPEO_INGRESOS, "modelo"),
-                    tipo_equipo=obtener_valor(row, MAPEO_INGRESOS, "tipo_equipo"),
-                    capacidad=obtener_valor(row, MAPEO_INGRESOS, "capacidad"),
-                    sensibilidad=obtener_valor(row, MAPEO_INGRESOS, "sensibilidad"),
-                    cliente_id=cliente_id
-                )
-                db.add(equipo_obj)
-                db.flush()
-
-        # 4. Crear Cliente Fantasma si falla la FK
-        if cliente_id:
-            if not db.query(Cliente).filter_by(id_cliente_appsheet=cliente_id).first():
-                db.add(Cliente(id_cliente_appsheet=cliente_id, nombre_fiscal=f"Cliente {cliente_id}"))
-                db.flush()
-
-        datos = {
-            "id_appsheet": id_orden,
-            "fecha_ingreso": parse_date(obtener_valor(row, MAPEO_INGRESOS, "fecha_ingreso")),
-            "tipo_ingreso": obtener_valor(row, MAPEO_INGRESOS, "tipo_ingreso"),
-            "no_orden_taller": obtener_valor(row, MAPEO_INGRESOS, "no_orden_taller"),
-            "no_orden_campo": obtener_valor(row, MAPEO_INGRESOS, "no_orden_campo"),
-            "estado": obtener_valor(row, MAPEO_INGRESOS, "estado"),
-            "observaciones": obtener_valor(row, MAPEO_INGRESOS, "observaciones"),
-            "dano_reportado": obtener_valor(row, MAPEO_INGRESOS, "dano_reportado"),
-            "cliente_id": cliente_id,
-            "equipo_id": equipo_obj.id if equipo_obj else None,
-            "servicio_id": serv_obj.id if serv_obj else None,
-            "tecnico_id": tec_obj.id if tec_obj else None,
-            "ultima_actualizacion": datetime.now()
-        }
-
-        stmt = insert(OrdenTrabajo).values(datos)
-        stmt = stmt.on_conflict_do_update(index_elements=[OrdenTrabajo.id_appsheet], set_=datos)
-        db.execute(stmt)
-        procesados += 1
-
-    db.commit()
-    return {"status": "success", "mensaje": f"{procesados} órdenes sincronizadas."}
+    progreso(filas_leidas=lote["leidas"])
+    return cargar_ingresos(db, lote, tamano_lote, forzar, progreso, modo)
 
 
 # --- ETL CAMPO (NUEVO) ---
-def ejecutar_etl_campo(db: Session):
+def ejecutar_etl_campo(db: Session, tamano_lote: int = None, forzar: bool = False, progreso=None,
+                       modo: str = "lotes"):
+    progreso = progreso or _sin_progreso
     print("🔄 Sincronizando Campo...")
     try:
-        client = get_gspread_client()
-        # Intentamos abrir la hoja campo, si falla, retornamos aviso
-        try:
-            sheet = client.open_by_key(SPREADSHEET_ID).worksheet(HOJA_CAMPO)
-        except:
-            return {"status": "warning", "mensaje": f"No se encontró hoja '{HOJA_CAMPO}'"}
-
-        registros = sheet.get_all_records()
+        with etapa("descarga"):
+            raw_data = leer_hoja(HOJA_CAMPO)
+    except HojaNoEncontrada:
+        return {"status": "warning", "mensaje": f"No se encontró hoja '{HOJA_CAMPO}'"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-    procesados = 0
-    for row in registros:
-        id_campo = obtener_valor(row, MAPEO_CAMPO, "id_campo_appsheet")
-        if not id_campo: continue
-
-        # Gestionar Técnicos (Hasta 2)
-        t1_nom = obtener_valor(row, MAPEO_CAMPO, "tecnico1")
-        t2_nom = obtener_valor(row, MAPEO_CAMPO, "tecnico2")
-        t1_obj, t2_obj = None, None
-
-        if t1_nom: t1_obj = get_or_create(db, Tecnico, nombre_completo=t1_nom.title())
-        if t2_nom: t2_obj = get_or_create(db, Tecnico, nombre_completo=t2_nom.title())
-
-        # Gestionar Equipo (Si existe serie)
-        serie = obtener_valor(row, MAPEO_CAMPO, "serie")
-        equipo_obj = None
-        if serie:
-            equipo_obj = db.query(Equipo).filter_by(serie=serie).first()
-            if not equipo_obj:
-                # Si es nuevo equipo de campo, lo creamos sin cliente asignado por ahora
-                equipo_obj = Equipo(
-                    serie=serie,
-                    marca=obtener_valor(row, MAPEO_CAMPO, "marca"),
-                    modelo=obtener_valor(row, MAPEO_CAMPO, "modelo")
-                )
-                db.add(equipo_obj)
-                db.flush()
-
-        datos = {
-            "id_campo_appsheet": id_campo,
-            "codigo": obtener_valor(row, MAPEO_CAMPO, "codigo"),
-            "agencia_zona": obtener_valor(row, MAPEO_CAMPO, "agencia_zona"),
-            "ubicacion": obtener_valor(row, MAPEO_CAMPO, "ubicacion"),
-            "estado": obtener_valor(row, MAPEO_CAMPO, "estado"),
-            "enlace_informe": obtener_valor(row, MAPEO_CAMPO, "enlace_informe"),
-            "ultima_fecha": parse_date(obtener_valor(row, MAPEO_CAMPO, "ultima_fecha")),
-            "equipo_id": equipo_obj.id if equipo_obj else None,
-            "tecnico1_id": t1_obj.id if t1_obj else None,
-            "tecnico2_id": t2_obj.id if t2_obj else None,
-            "ultima_actualizacion": datetime.now()
-        }
-
-        stmt = insert(VisitaCampo).values(datos)
-        stmt = stmt.on_conflict_do_update(index_elements=[VisitaCampo.id_campo_appsheet], set_=datos)
-        db.execute(stmt)
-        procesados += 1
-
-    db.commit()
-    return {"status": "success", "mensaje": f"{procesados} visitas de campo."}
\ No newline at end of file
+    try:
+        with etapa("transformacion"):
+            lote = transformar_campo(raw_data)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    progreso(filas_leidas=lote["leidas"])
+    return cargar_campo(db, lote, tamano_lote, forzar, progreso, modo)
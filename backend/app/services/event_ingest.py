@@ -0,0 +1,141 @@
+from functools import lru_cache
+from sqlalchemy.orm import Session
+from app.models import Cliente, OrdenTrabajo, VisitaCampo
+from app.services.dimension_resolver import ResolvedorDimensiones
+from app.services.fingerprint_store import AlmacenHuellas
+from app.services.column_extractor import normalizar_header
+from app.services.daily_rollup import dias_de_ordenes, dias_de_clientes, refrescar_dias
+from app.services.data_version import incrementar_version
+from app.services.etl_service import (
+    HOJA_CLIENTES, HOJA_INGRESOS, HOJA_CAMPO,
+    MAPEO_CLIENTES, MAPEO_INGRESOS, MAPEO_CAMPO,
+    compilar_hoja, normalizar_fila_cliente, normalizar_fila_ingreso, normalizar_fila_campo,
+    cargar_clientes, cargar_ingresos, cargar_campo,
+)
+
+# Ingesta por eventos (webhooks de AppSheet): cada evento trae UNA fila con los mismos
+# encabezados de la hoja y se aplica en su propia transacción, reutilizando el mapeo de
+# columnas, la normalización y la carga del ETL completo. El pull completo queda como
+# reconciliación periódica (sync_jobs.iniciar_reconciliacion).
+
+DESTINOS = {
+    "clientes": {
+        "hoja": HOJA_CLIENTES, "mapeo": MAPEO_CLIENTES, "clave": "id_cliente_appsheet",
+        "model": Cliente, "normalizar": normalizar_fila_cliente, "cargar": cargar_clientes,
+        "dias_resumen": dias_de_clientes,
+    },
+    "ingresos": {
+        "hoja": HOJA_INGRESOS, "mapeo": MAPEO_INGRESOS, "clave": "id_appsheet",
+        "model": OrdenTrabajo, "normalizar": normalizar_fila_ingreso, "cargar": cargar_ingresos,
+        "dias_resumen": dias_de_ordenes,
+    },
+    "campo": {
+        "hoja": HOJA_CAMPO, "mapeo": MAPEO_CAMPO, "clave": "id_campo_appsheet",
+        "model": VisitaCampo, "normalizar": normalizar_fila_campo, "cargar": cargar_campo,
+        "dias_resumen": None,
+    },
+}
+
+ACCIONES = ("upsert", "delete")
+
+
+class EventoInvalido(ValueError):
+    pass
+
+
+@lru_cache(maxsize=64)
+def _extractor(tabla, headers):
+    """Extractor compilado por cada combinación de encabezados (los webhooks repiten la misma)."""
+    destino = DESTINOS[tabla]
+    extractor, _ = compilar_hoja([list(headers)], destino["mapeo"], destino["clave"], destino["hoja"])
+    return extractor
+
+
+def _destino(tabla):
+    clave = normalizar_header(tabla)
+    if clave not in DESTINOS:
+        raise EventoInvalido(f"Tabla desconocida '{tabla}' (use Clientes, Ingresos o Campo)")
+    return clave, DESTINOS[clave]
+
+
+def _extraer(tabla, fila):
+    """Fila del webhook ({encabezado: valor}) -> dict con los campos del mapeo."""
+    if not fila:
+        raise EventoInvalido("El evento no trae 'fila'")
+    try:
+        extractor = _extractor(tabla, tuple(fila.keys()))
+    except ValueError:
+        raise EventoInvalido("La fila no trae columna ID")
+    return extractor.extraer(list(fila.values()))
+
+
+def _upsert(db: Session, tabla, destino, fila, resolvedor):
+    row = _extraer(tabla, fila)
+    id_origen = row[destino["clave"]]
+    if not id_origen:
+        raise EventoInvalido("ID vacío")
+
+    lote = {"filas": [destino["normalizar"](row)], "leidas": 1, "omitidos": 0}
+    almacen = AlmacenHuellas(db, destino["model"], destino["clave"], ids=[id_origen])
+    resultado = destino["cargar"](db, lote, resolvedor=resolvedor, almacen=almacen)
+
+    if resultado.get("status") == "error":
+        raise RuntimeError(resultado.get("message"))
+    if resultado["carga"]["errores"]:
+        raise RuntimeError(resultado["carga"]["errores"][0]["error"])
+    estado = "sin_cambios" if resultado["sin_cambios"] else ("insertado" if resultado["insertados"] else "actualizado")
+    return id_origen, estado
+
+
+def _borrar(db: Session, tabla, destino, fila, id_origen):
+    id_origen = id_origen or (_extraer(tabla, fila)[destino["clave"]] if fila else None)
+    if not id_origen:
+        raise EventoInvalido("Un delete necesita 'id' o la fila con su ID")
+
+    model = destino["model"]
+    # Días del resumen diario que pierden la orden (o las ubicaciones del cliente) borrada
+    dias = destino["dias_resumen"](db, [id_origen]) if destino["dias_resumen"] else set()
+    borrados = db.query(model).filter(getattr(model, destino["clave"]) == id_origen).delete(synchronize_session=False)
+    AlmacenHuellas(db, model, destino["clave"], ids=[id_origen]).olvidar([id_origen])
+    refrescar_dias(db, dias)
+    if borrados:
+        incrementar_version(db, model.__tablename__)
+    db.commit()
+    return id_origen, "eliminado" if borrados else "no_existia"
+
+
+def aplicar_eventos(db: Session, eventos):
+    """
+    Aplica una lista de eventos {tabla, accion, fila, id} en orden, uno por transacción.
+    Un evento con error se revierte solo y no detiene a los demás.
+    """
+    resolvedor = ResolvedorDimensiones(db)
+    resultados = []
+    errores = []
+
+    for indice, evento in enumerate(eventos):
+        id_origen = str(evento["id"]).strip() if evento.get("id") is not None else None
+        try:
+            tabla, destino = _destino(evento.get("tabla") or "")
+            accion = (evento.get("accion") or "upsert").lower()
+            if accion not in ACCIONES:
+                raise EventoInvalido(f"Acción desconocida '{accion}' (use upsert o delete)")
+
+            if accion == "delete":
+                id_origen, estado = _borrar(db, tabla, destino, evento.get("fila"), id_origen)
+            else:
+                id_origen, estado = _upsert(db, tabla, destino, evento.get("fila"), resolvedor)
+            resultados.append({"indice": indice, "tabla": tabla, "accion": accion, "id": id_origen, "estado": estado})
+        except Exception as e:
+            db.rollback()
+            # La caché del resolvedor pudo quedar con IDs de la transacción revertida
+            resolvedor = ResolvedorDimensiones(db)
+            print(f"❌ Evento {indice} ({evento.get('tabla')}/{id_origen}): {e}")
+            errores.append({"indice": indice, "id": id_origen, "error": str(e).split("\n")[0]})
+
+    return {
+        "status": "success" if not errores else ("error" if not resultados else "partial"),
+        "procesados": len(resultados),
+        "resultados": resultados,
+        "errores": errores,
+    }
@@ -0,0 +1,78 @@
+import json
+import hashlib
+from datetime import datetime
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+from app.models import HuellaFila
+from app.services.bulk_loader import upsert_por_lotes
+
+
+def calcular_huella(row: dict) -> str:
+    """Hash estable del contenido normalizado de una fila (dict campo -> valor)."""
+    contenido = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(contenido.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class AlmacenHuellas:
+    """
+    Huellas de la última versión cargada de cada fila de una tabla destino.
+
+    Permite al ETL saltarse por completo las filas que no cambiaron desde la última
+    sincronización y escribir solo inserciones y actualizaciones reales.
+    """
+
+    def __init__(self, db: Session, model, clave, ids=None):
+        """`ids`: precarga solo esas filas (eventos puntuales) en vez de la tabla completa."""
+        self.db = db
+        self.tabla = model.__tablename__
+        columna = getattr(model, clave)
+        consulta_huellas = select(HuellaFila.id_origen, HuellaFila.huella).where(HuellaFila.tabla == self.tabla)
+        consulta_existentes = select(columna)
+        if ids is not None:
+            consulta_huellas = consulta_huellas.where(HuellaFila.id_origen.in_(ids))
+            consulta_existentes = consulta_existentes.where(columna.in_(ids))
+
+        self.huellas = dict(db.execute(consulta_huellas).all())
+        # Filas presentes hoy en la tabla destino (por si alguien las borró a mano)
+        self.existentes = set(db.execute(consulta_existentes).scalars().all())
+        self.pendientes = {}
+        self.sin_cambios = 0
+
+    def cambio(self, id_origen, row: dict, forzar=False) -> bool:
+        """True si la fila es nueva o su contenido cambió desde la última carga."""
+        huella = calcular_huella(row)
+        if not forzar and id_origen in self.existentes and self.huellas.get(id_origen) == huella:
+            self.sin_cambios += 1
+            return False
+        self.pendientes[id_origen] = huella
+        return True
+
+    def guardar(self, fallidos=()):
+        """
+        Persiste las huellas de las filas cargadas con éxito (no hace commit).
+        Retorna los conteos de insertados, actualizados y sin cambios.
+        """
+        fallidos = set(fallidos)
+        ahora = datetime.now()
+        cargadas = {k: v for k, v in self.pendientes.items() if k not in fallidos}
+
+        upsert_por_lotes(self.db, HuellaFila, [
+            {"tabla": self.tabla, "id_origen": k, "huella": v, "actualizado": ahora}
+            for k, v in cargadas.items()
+        ], ["tabla", "id_origen"])
+
+        insertados = sum(1 for k in cargadas if k not in self.existentes)
+        return {
+            "insertados": insertados,
+            "actualizados": len(cargadas) - insertados,
+            "sin_cambios": self.sin_cambios
+        }
+
+    def olvidar(self, ids):
+        """Elimina las huellas de filas borradas en el origen (no hace commit)."""
+        ids = list(ids)
+        if ids:
+            self.db.execute(delete(HuellaFila).where(HuellaFila.tabla == self.tabla, HuellaFila.id_origen.in_(ids)))
+        for k in ids:
+            self.huellas.pop(k, None)
+            self.existentes.discard(k)
@@ -0,0 +1,72 @@
+import json
+import asyncio
+import hashlib
+from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import InformeIA
+from app.services.analytics_service import (
+    MODELO_INFORME, PROMPT_VERSION, InformeNoGenerado, redactar_informe
+)
+
+# Memoización de los informes de Gemini.
+# Mismas métricas + misma versión de prompt + mismo modelo => mismo informe: se guarda en
+# `informes_ia` (sobrevive reinicios y se comparte entre workers) y nunca se pide dos veces.
+# Las peticiones simultáneas con la misma huella dentro del proceso esperan una sola llamada.
+# Todo corre en el event loop del worker, así que el diccionario no necesita lock; el SQL
+# (sesión síncrona) va al threadpool para no bloquear el loop.
+
+_en_vuelo = {}  # huella -> asyncio.Task con el texto
+
+
+def huella_informe(metricas):
+    contenido = json.dumps(metricas, sort_keys=True, ensure_ascii=False, default=str)
+    base = f"{PROMPT_VERSION}|{MODELO_INFORME}|{contenido}"
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+def _guardar(huella, metricas, texto):
+    # Sesión propia: la tarea compartida puede terminar después de la petición que la lanzó
+    db = SessionLocal()
+    try:
+        db.execute(insert(InformeIA).values(
+            huella=huella, prompt_version=PROMPT_VERSION, modelo=MODELO_INFORME,
+            periodo=metricas.get("periodo"), contenido=texto, creado=datetime.now(),
+        ).on_conflict_do_nothing(index_elements=[InformeIA.huella]))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ No se pudo guardar el informe {huella[:12]}: {e}")
+    finally:
+        db.close()
+
+
+async def _generar(huella, metricas):
+    try:
+        texto = await redactar_informe(metricas)
+    except InformeNoGenerado as e:
+        return str(e)
+    await run_in_threadpool(_guardar, huella, metricas, texto)
+    return texto
+
+
+async def obtener_informe(db: Session, metricas):
+    """
+    Retorna {"content", "origen"}: origen 'guardado' (tabla), 'compartido' (esperó la llamada
+    de otra petición) o 'generado'. Los errores de Gemini se muestran pero no se guardan.
+    """
+    huella = huella_informe(metricas)
+    guardado = await run_in_threadpool(db.get, InformeIA, huella)
+    if guardado:
+        return {"content": guardado.contenido, "origen": "guardado"}
+
+    tarea = _en_vuelo.get(huella)
+    if tarea is not None:
+        return {"content": await asyncio.shield(tarea), "origen": "compartido"}
+
+    tarea = _en_vuelo[huella] = asyncio.ensure_future(_generar(huella, metricas))
+    tarea.add_done_callback(lambda _: _en_vuelo.pop(huella, None))
+    # shield: si el cliente que la lanzó se desconecta, la llamada sigue para los que esperan
+    return {"content": await asyncio.shield(tarea), "origen": "generado"}
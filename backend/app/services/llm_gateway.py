@@ -0,0 +1,240 @@
+import os
+import time
+import json
+import asyncio
+import threading
+from collections import deque
+from google import genai
+
+# Puerta única hacia el LLM (Gemini) para las rutas async:
+#   - un solo genai.Client por proceso (client.aio, sin bloquear el event loop)
+#   - timeout por llamada y semáforo que limita las llamadas simultáneas
+#   - circuit breaker: tras N fallos seguidos se rechaza al instante durante un enfriamiento
+#   - backend 'mock' para desarrollo local sin API key
+#   - métricas de latencia y errores por modelo
+#
+# Configuración (env):
+#   LLM_BACKEND=gemini|mock   LLM_TIMEOUT_SEGUNDOS=30   LLM_MAX_CONCURRENCIA=4
+#   LLM_CIRCUITO_FALLOS=5     LLM_CIRCUITO_ENFRIAMIENTO=60
+#   LLM_MOCK_LATENCIA=0.2     (segundos simulados por llamada en modo mock)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_TIMEOUT_SEGUNDOS = float(os.getenv("LLM_TIMEOUT_SEGUNDOS", "30"))
+LLM_MAX_CONCURRENCIA = int(os.getenv("LLM_MAX_CONCURRENCIA", "4"))
+LLM_CIRCUITO_FALLOS = int(os.getenv("LLM_CIRCUITO_FALLOS", "5"))
+LLM_CIRCUITO_ENFRIAMIENTO = float(os.getenv("LLM_CIRCUITO_ENFRIAMIENTO", "60"))
+LLM_MOCK_LATENCIA = float(os.getenv("LLM_MOCK_LATENCIA", "0.2"))
+
+MUESTRAS_LATENCIA = 200
+
+
+class ErrorLLM(Exception):
+    """Falla al llamar al LLM (el mensaje es apto para logs, no para el usuario final)."""
+
+
+class LLMNoConfigurado(ErrorLLM):
+    pass
+
+
+class LLMTiempoAgotado(ErrorLLM):
+    pass
+
+
+class LLMSaturado(ErrorLLM):
+    """No hubo cupo en el semáforo dentro del timeout (carga local, no falla del proveedor)."""
+
+
+class CircuitoAbierto(ErrorLLM):
+    pass
+
+
+class CircuitoLLM:
+    """cerrado -> (N fallos seguidos) -> abierto -> (enfriamiento) -> semiabierto -> 1 prueba."""
+
+    def __init__(self, umbral=LLM_CIRCUITO_FALLOS, enfriamiento=LLM_CIRCUITO_ENFRIAMIENTO):
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.fallos_seguidos = 0
+        self.abierto_desde = None
+        self._prueba_en_curso = False
+
+    @property
+    def estado(self):
+        if self.abierto_desde is None:
+            return "cerrado"
+        if time.monotonic() - self.abierto_desde < self.enfriamiento:
+            return "abierto"
+        return "semiabierto"
+
+    def permitir(self):
+        estado = self.estado
+        if estado == "cerrado":
+            return True
+        if estado == "semiabierto" and not self._prueba_en_curso:
+            self._prueba_en_curso = True
+            return True
+        return False
+
+    def liberar(self):
+        """La llamada de prueba no llegó al proveedor (sin cupo o sin API key): no cuenta."""
+        self._prueba_en_curso = False
+
+    def exito(self):
+        self.fallos_seguidos = 0
+        self.abierto_desde = None
+        self._prueba_en_curso = False
+
+    def fallo(self):
+        self.fallos_seguidos += 1
+        if self._prueba_en_curso or self.fallos_seguidos >= self.umbral:
+            if self.abierto_desde is None or self._prueba_en_curso:
+                print(f"🔌 Circuito LLM abierto tras {self.fallos_seguidos} fallos seguidos")
+            self.abierto_desde = time.monotonic()
+        self._prueba_en_curso = False
+
+
+class MetricasModelo:
+    def __init__(self):
+        self.llamadas = 0
+        self.exitos = 0
+        self.errores = 0
+        self.timeouts = 0
+        self.rechazadas = 0  # circuito abierto o sin cupo
+        self.segundos = 0.0
+        self.latencias = deque(maxlen=MUESTRAS_LATENCIA)
+        self.ultimo_error = None
+
+    def a_dict(self):
+        orden = sorted(self.latencias)
+        percentil = lambda p: round(orden[min(len(orden) - 1, int(p * len(orden)))], 3) if orden else None
+        return {
+            "llamadas": self.llamadas,
+            "exitos": self.exitos,
+            "errores": self.errores,
+            "timeouts": self.timeouts,
+            "rechazadas": self.rechazadas,
+            "latencia_promedio": round(self.segundos / self.exitos, 3) if self.exitos else None,
+            "latencia_p50": percentil(0.5),
+            "latencia_p95": percentil(0.95),
+            "ultimo_error": self.ultimo_error,
+        }
+
+
+class _ClienteCompartido:
+    """Un genai.Client por proceso; se recrea si cambia la API key."""
+
+    def __init__(self):
+        self._cliente = None
+        self._api_key = None
+        self._lock = threading.Lock()
+
+    def obtener(self):
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise LLMNoConfigurado("Falta GEMINI_API_KEY")
+        with self._lock:
+            if self._cliente is None or api_key != self._api_key:
+                self._cliente = genai.Client(api_key=api_key)
+                self._api_key = api_key
+            return self._cliente
+
+
+_cliente = _ClienteCompartido()
+_circuito = CircuitoLLM()
+_metricas = {}
+_semaforo = None
+
+
+def _semaforo_llm():
+    # Se crea dentro del event loop que lo usa (uno por worker de uvicorn)
+    global _semaforo
+    if _semaforo is None:
+        _semaforo = asyncio.Semaphore(LLM_MAX_CONCURRENCIA)
+    return _semaforo
+
+
+async def _llamar_mock(prompt, config):
+    await asyncio.sleep(LLM_MOCK_LATENCIA)
+    if config is not None and getattr(config, "response_mime_type", None) == "application/json":
+        return json.dumps({"intencion": "desconocida", "tecnico": None, "fecha_inicio": None, "fecha_fin": None})
+    return "# 📊 Informe de prueba (LLM_BACKEND=mock)\n\nRespuesta simulada; no se llamó a Gemini."
+
+
+async def _llamar_gemini(prompt, modelo, config):
+    respuesta = await _cliente.obtener().aio.models.generate_content(model=modelo, contents=prompt, config=config)
+    return respuesta.text
+
+
+async def generar(prompt, modelo, config=None, timeout=None):
+    """Genera texto con el modelo indicado; lanza ErrorLLM (o subclase) si no se pudo."""
+    metricas = _metricas.setdefault(modelo, MetricasModelo())
+    metricas.llamadas += 1
+    timeout = timeout or LLM_TIMEOUT_SEGUNDOS
+
+    # Sin await entre la consulta y permitir(): nadie más puede tomar la prueba en medio
+    es_prueba = _circuito.estado == "semiabierto"
+    if not _circuito.permitir():
+        metricas.rechazadas += 1
+        raise CircuitoAbierto("El proveedor de IA está degradado; reintenta en unos segundos")
+
+    semaforo = _semaforo_llm()
+    try:
+        await asyncio.wait_for(semaforo.acquire(), timeout)
+    except asyncio.TimeoutError:
+        metricas.rechazadas += 1
+        if es_prueba:
+            _circuito.liberar()
+        raise LLMSaturado(f"Sin cupo para llamar a {modelo} en {timeout}s")
+    except asyncio.CancelledError:
+        # Petición cancelada (cliente desconectado) antes de llamar: la prueba queda libre
+        if es_prueba:
+            _circuito.liberar()
+        raise
+
+    inicio = time.perf_counter()
+    try:
+        llamada = _llamar_mock(prompt, config) if LLM_BACKEND == "mock" else _llamar_gemini(prompt, modelo, config)
+        texto = await asyncio.wait_for(llamada, timeout)
+    except asyncio.TimeoutError:
+        metricas.timeouts += 1
+        metricas.ultimo_error = f"timeout {timeout}s"
+        _circuito.fallo()
+        raise LLMTiempoAgotado(f"{modelo} no respondió en {timeout}s")
+    except LLMNoConfigurado:
+        if es_prueba:
+            _circuito.liberar()
+        raise
+    except asyncio.CancelledError:
+        # Sin liberar, una prueba cancelada dejaría el circuito rechazando todo hasta reiniciar
+        if es_prueba:
+            _circuito.liberar()
+        raise
+    except Exception as e:
+        metricas.errores += 1
+        metricas.ultimo_error = str(e)[:300]
+        _circuito.fallo()
+        raise ErrorLLM(str(e)) from e
+    finally:
+        semaforo.release()
+
+    segundos = time.perf_counter() - inicio
+    metricas.exitos += 1
+    metricas.segundos += segundos
+    metricas.latencias.append(segundos)
+    _circuito.exito()
+    return texto
+
+
+def estado_llm():
+    return {
+        "backend": LLM_BACKEND,
+        "timeout_segundos": LLM_TIMEOUT_SEGUNDOS,
+        "max_concurrencia": LLM_MAX_CONCURRENCIA,
+        "circuito": {
+            "estado": _circuito.estado,
+            "fallos_seguidos": _circuito.fallos_seguidos,
+            "umbral": _circuito.umbral,
+            "enfriamiento_segundos": _circuito.enfriamiento,
+        },
+        "modelos": {modelo: m.a_dict() for modelo, m in _metricas.items()},
+    }
@@ -0,0 +1,77 @@
+import json
+import base64
+from datetime import date
+from sqlalchemy import and_, or_, tuple_, func, select
+
+# Paginación keyset (por cursor) para los listados. La página siguiente se pide "después de la
+# última fila vista" en vez de con OFFSET, así cuesta lo mismo en la página 1 que en la 500
+# (el índice compuesto lleva directo a la posición).
+#
+# El cursor es opaco para el cliente: base64url de [orden, valor_orden, id] de la última fila.
+# Lleva el orden con el que se generó: un cursor de otro orden se rechaza.
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(orden, valor, id_fila):
+    if isinstance(valor, date):
+        valor = valor.isoformat()
+    contenido = json.dumps([orden, valor, id_fila], separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenido.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor, orden, es_fecha=False):
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        orden_cursor, valor, id_fila = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if orden_cursor != orden:
+            raise ValueError(f"el cursor es del orden '{orden_cursor}', no de '{orden}'")
+        if es_fecha and valor is not None:
+            valor = date.fromisoformat(valor)
+        if not isinstance(id_fila, str):
+            raise ValueError("id inválido")
+        return valor, id_fila
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido(f"Cursor inválido: {e}")
+
+
+def ordenar(columna, columna_id, descendente):
+    """ORDER BY columna, id en el mismo sentido (NULLS en la posición por defecto de Postgres)."""
+    if descendente:
+        return [columna.desc(), columna_id.desc()]
+    return [columna.asc(), columna_id.asc()]
+
+
+def despues_de(columna, columna_id, valor, id_fila, descendente):
+    """
+    Filtro 'después de la fila (valor, id_fila)' para `ordenar(columna, columna_id, descendente)`.
+    Postgres pone los NULL al final en ASC y al principio en DESC (el recorrido hacia atrás
+    del índice (columna, id)); la comparación de fila la resuelve ese índice.
+    """
+    if descendente:
+        if valor is None:
+            # Seguimos dentro del bloque de filas sin valor, luego todas las que sí tienen
+            return or_(and_(columna.is_(None), columna_id < id_fila), columna.isnot(None))
+        return tuple_(columna, columna_id) < tuple_(valor, id_fila)
+    if valor is None:
+        return and_(columna.is_(None), columna_id > id_fila)
+    return or_(tuple_(columna, columna_id) > tuple_(valor, id_fila), columna.is_(None))
+
+
+def paginar(consulta, limit, siguiente):
+    """
+    Ejecuta la consulta pidiendo una fila de más para saber si hay otra página.
+    Retorna (filas, cursor_siguiente | None); `siguiente(fila)` arma el cursor de la última fila.
+    """
+    filas = consulta.limit(limit + 1).all()
+    if len(filas) <= limit:
+        return filas, None
+    filas = filas[:limit]
+    return filas, siguiente(filas[-1])
+
+
+def contar(db, model, filtros):
+    """count(*) con los mismos filtros del listado, sin JOINs ni ORDER BY (lo resuelven los índices)."""
+    return db.execute(select(func.count()).select_from(model).where(*filtros)).scalar()
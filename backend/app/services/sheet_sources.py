@@ -0,0 +1,185 @@
+import os
+import csv
+import sys
+import json
+import contextvars
+from abc import ABC, abstractmethod
+from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
+import gspread
+from openpyxl import load_workbook
+from dotenv import load_dotenv
+from app.services.sheets_client import get_gspread_client
+
+load_dotenv()
+
+SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "1UxrhgQATwY1yQAhm_pM4xc3sGUpr_Aw8VQH6IRpAXkU")
+
+# Origen de las hojas para el ETL: 'gspread' (Google Sheets en vivo) o 'local' (snapshots)
+SHEETS_SOURCE = os.getenv("SHEETS_SOURCE", "gspread")
+SHEETS_LOCAL_PATH = os.getenv("SHEETS_LOCAL_PATH", "snapshots")
+
+
+class HojaNoEncontrada(Exception):
+    pass
+
+
+class FuenteHojas(ABC):
+    """
+    Interfaz de origen de datos del ETL. Cada pestaña se entrega como matriz de texto
+    (igual que `get_all_values()`): la primera fila son los encabezados.
+    """
+
+    @abstractmethod
+    def leer_hoja(self, nombre):
+        """Matriz de texto de la pestaña `nombre`; lanza HojaNoEncontrada si no existe."""
+
+    def leer_hojas(self, nombres):
+        """Retorna {hoja: matriz}, con None para las pestañas que no se pudieron leer."""
+        return {nombre: self._leer_o_nada(nombre) for nombre in nombres}
+
+    def _leer_o_nada(self, nombre):
+        try:
+            return self.leer_hoja(nombre)
+        except Exception as e:
+            print(f"❌ No se pudo leer la hoja '{nombre}': {e}")
+            return None
+
+
+class FuenteGSpread(FuenteHojas):
+    """Google Sheets en vivo. Abre el spreadsheet una sola vez por instancia."""
+
+    def __init__(self, spreadsheet_id=SPREADSHEET_ID):
+        self.spreadsheet_id = spreadsheet_id
+        self._libro = None
+
+    @property
+    def libro(self):
+        if self._libro is None:
+            self._libro = get_gspread_client().open_by_key(self.spreadsheet_id)
+        return self._libro
+
+    def leer_hoja(self, nombre):
+        try:
+            return self.libro.worksheet(nombre).get_all_values()
+        except gspread.exceptions.WorksheetNotFound:
+            raise HojaNoEncontrada(f"No se encontró hoja '{nombre}'")
+
+    def leer_hojas(self, nombres):
+        """
+        Intenta una sola llamada `values:batchGet`; si falla (por ejemplo, porque falta
+        una pestaña) cae a descargas concurrentes por pestaña.
+        """
+        nombres = list(nombres)
+        try:
+            respuesta = self.libro.values_batch_get(nombres)
+            rangos = respuesta.get("valueRanges", [])
+            return {nombre: rango.get("values", []) for nombre, rango in zip(nombres, rangos)}
+        except Exception as e:
+            print(f"⚠️ batchGet falló ({e}), descargando pestañas en paralelo...")
+
+        # Cada hilo lleva una copia del contexto para que sus llamadas cuenten en el consumo del sync
+        with ThreadPoolExecutor(max_workers=len(nombres)) as pool:
+            futuros = [pool.submit(contextvars.copy_context().run, self._leer_o_nada, n) for n in nombres]
+            return {nombre: f.result() for nombre, f in zip(nombres, futuros)}
+
+
+def _celda_a_texto(valor):
+    """Convierte una celda tipada (openpyxl/JSON) al texto que entregaría Google Sheets."""
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y") if valor.time() == datetime.min.time() else valor.strftime("%d/%m/%Y %H:%M:%S")
+    if isinstance(valor, date):
+        return valor.strftime("%d/%m/%Y")
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+class FuenteLocal(FuenteHojas):
+    """
+    Snapshots locales para correr el ETL sin red ni credenciales.
+
+    `ruta` puede ser:
+      - un directorio con un archivo por pestaña: Clientes.csv / Clientes.xlsx / Clientes.json
+      - un único .xlsx (una hoja por pestaña) o .json ({"Clientes": [...], ...})
+
+    En JSON cada pestaña puede ser una matriz (lista de listas) o una lista de registros.
+    """
+
+    EXTENSIONES = (".json", ".csv", ".xlsx")
+
+    def __init__(self, ruta=SHEETS_LOCAL_PATH):
+        self.ruta = ruta
+
+    def leer_hoja(self, nombre):
+        if os.path.isdir(self.ruta):
+            for ext in self.EXTENSIONES:
+                archivo = os.path.join(self.ruta, nombre + ext)
+                if os.path.exists(archivo):
+                    return self._leer_archivo(archivo, nombre)
+            raise HojaNoEncontrada(f"No se encontró hoja '{nombre}' en {self.ruta}")
+        if not os.path.exists(self.ruta):
+            raise FileNotFoundError(f"❌ No existe la ruta de snapshots: {self.ruta}")
+        return self._leer_archivo(self.ruta, nombre)
+
+    def _leer_archivo(self, archivo, nombre):
+        if archivo.endswith(".csv"):
+            with open(archivo, newline="", encoding="utf-8-sig") as f:
+                return [list(fila) for fila in csv.reader(f)]
+
+        if archivo.endswith(".xlsx"):
+            libro = load_workbook(archivo, read_only=True, data_only=True)
+            try:
+                if nombre in libro.sheetnames:
+                    hoja = libro[nombre]
+                elif len(libro.sheetnames) == 1 and os.path.isdir(self.ruta):
+                    hoja = libro.worksheets[0]
+                else:
+                    raise HojaNoEncontrada(f"No se encontró hoja '{nombre}' en {archivo}")
+                return [[_celda_a_texto(c) for c in fila] for fila in hoja.iter_rows(values_only=True)]
+            finally:
+                libro.close()
+
+        with open(archivo, encoding="utf-8") as f:
+            contenido = json.load(f)
+        if isinstance(contenido, dict):
+            if nombre not in contenido:
+                raise HojaNoEncontrada(f"No se encontró hoja '{nombre}' en {archivo}")
+            contenido = contenido[nombre]
+        return _a_matriz(contenido)
+
+
+def _a_matriz(contenido):
+    if not contenido:
+        return []
+    if isinstance(contenido[0], dict):
+        headers = list(contenido[0].keys())
+        return [headers] + [[_celda_a_texto(r.get(h)) for h in headers] for r in contenido]
+    return [[_celda_a_texto(c) for c in fila] for fila in contenido]
+
+
+def obtener_fuente():
+    """Fuente configurada por entorno (SHEETS_SOURCE / SHEETS_LOCAL_PATH)."""
+    if SHEETS_SOURCE == "local":
+        return FuenteLocal(SHEETS_LOCAL_PATH)
+    return FuenteGSpread()
+
+
+def guardar_snapshot(fuente, destino, nombres):
+    """Guarda las pestañas en `destino` como JSON (una matriz por archivo) para reproducir el ETL."""
+    os.makedirs(destino, exist_ok=True)
+    for nombre, matriz in fuente.leer_hojas(nombres).items():
+        if matriz is None:
+            continue
+        with open(os.path.join(destino, f"{nombre}.json"), "w", encoding="utf-8") as f:
+            json.dump(matriz, f, ensure_ascii=False)
+        print(f"💾 {nombre}: {max(len(matriz) - 1, 0)} filas -> {destino}")
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.services.sheet_sources [directorio_destino]
+    from app.services.etl_service import HOJA_CLIENTES, HOJA_INGRESOS, HOJA_CAMPO
+    guardar_snapshot(FuenteGSpread(), sys.argv[1] if len(sys.argv) > 1 else SHEETS_LOCAL_PATH,
+                     [HOJA_CLIENTES, HOJA_INGRESOS, HOJA_CAMPO])
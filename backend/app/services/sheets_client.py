@@ -1,6 +1,12 @@
 import os
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from gspread.http_client import HTTPClient
+from google.oauth2.service_account import Credentials
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,10 +20,77 @@ SCOPE = [
 ]
 
 
-def get_gspread_client():
+# --- CONTABILIDAD DE LLAMADAS A LA API ---
+
+class ConsumoSheets:
+    """Contador de llamadas, bytes descargados y tiempo de red contra la API de Sheets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.llamadas = 0
+        self.errores = 0
+        self.bytes = 0
+        self.segundos = 0.0
+
+    def registrar(self, bytes_=0, segundos=0.0, error=False):
+        with self._lock:
+            self.llamadas += 1
+            self.errores += int(error)
+            self.bytes += bytes_
+            self.segundos += segundos
+
+    def a_dict(self):
+        with self._lock:
+            return {
+                "llamadas": self.llamadas,
+                "errores": self.errores,
+                "bytes": self.bytes,
+                "segundos": round(self.segundos, 3),
+            }
+
+
+# Acumulado del proceso + consumo de la sincronización en curso (si hay una midiendo)
+CONSUMO_TOTAL = ConsumoSheets()
+_consumo_sync: ContextVar = ContextVar("consumo_sheets", default=None)
+
+
+@contextmanager
+def medir_consumo():
     """
-    Autentica con Google usando el archivo JSON y retorna el cliente.
+    Mide las llamadas a Sheets hechas dentro del bloque (y en hilos lanzados con
+    `contextvars.copy_context()`), sin mezclarse con otras sincronizaciones concurrentes.
     """
+    consumo = ConsumoSheets()
+    token = _consumo_sync.set(consumo)
+    try:
+        yield consumo
+    finally:
+        _consumo_sync.reset(token)
+
+
+class HTTPClientContado(HTTPClient):
+    """HTTPClient de gspread que registra cada petición en los contadores."""
+
+    def request(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        respuesta, error = None, False
+        try:
+            respuesta = super().request(*args, **kwargs)
+            return respuesta
+        except gspread.exceptions.APIError as e:
+            respuesta, error = e.response, True
+            raise
+        finally:
+            bytes_ = len(respuesta.content) if respuesta is not None else 0
+            segundos = time.perf_counter() - inicio
+            for consumo in (CONSUMO_TOTAL, _consumo_sync.get()):
+                if consumo is not None:
+                    consumo.registrar(bytes_, segundos, error)
+
+
+# --- CLIENTE COMPARTIDO ---
+
+def _ruta_credenciales():
     # Buscamos el archivo dentro del contenedor
     # En docker-compose definimos que /app/credentials/google_secret.json es la ruta
     creds_file = os.getenv("GOOGLE_CREDENTIALS_FILE", "credentials/google_secret.json")
@@ -29,7 +102,56 @@ def get_gspread_client():
             creds_file = "credentials/google_secret.json"
         else:
             raise FileNotFoundError(f"❌ ERROR CRÍTICO: No encuentro el archivo de credenciales en: {creds_file}")
+    return creds_file
+
+
+class _ClienteCompartido:
+    """
+    Un solo cliente gspread por proceso.
+
+    La sesión (AuthorizedSession de google-auth) mantiene las conexiones HTTP abiertas y
+    reutiliza el token: solo se renueva cuando está por vencer. Si cambia el archivo de
+    credenciales (rotación de la llave) el cliente se reconstruye.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cliente = None
+        self._credenciales = None
+        self._origen = None  # (ruta, mtime) del archivo con que se construyó
+        self.creado = None
+
+    def obtener(self):
+        creds_file = _ruta_credenciales()
+        origen = (creds_file, os.path.getmtime(creds_file))
+        with self._lock:
+            if self._cliente is None or self._origen != origen:
+                self._credenciales = Credentials.from_service_account_file(creds_file, scopes=SCOPE)
+                self._cliente = gspread.authorize(self._credenciales, http_client=HTTPClientContado)
+                self._origen = origen
+                self.creado = datetime.now()
+                print("🔑 Cliente de Google Sheets autenticado")
+            return self._cliente
+
+    def estado(self):
+        creds = self._credenciales
+        return {
+            "cliente_creado": self.creado,
+            "token_vigente": bool(creds and creds.valid),
+            "token_expira": creds.expiry if creds else None,
+        }
+
+
+_CLIENTE = _ClienteCompartido()
+
+
+def get_gspread_client():
+    """
+    Retorna el cliente gspread compartido del proceso (se autentica la primera vez).
+    """
+    return _CLIENTE.obtener()
+
 
-    creds = ServiceAccountCredentials.from_json_keyfile_name(creds_file, SCOPE)
-    client = gspread.authorize(creds)
-    return client
\ No newline at end of file
+def estado_cliente():
+    """Estado del cliente compartido y consumo acumulado de la API desde que arrancó el proceso."""
+    return {**_CLIENTE.estado(), "consumo": CONSUMO_TOTAL.a_dict()}
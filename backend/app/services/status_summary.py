@@ -0,0 +1,163 @@
+from datetime import date, timedelta
+from sqlalchemy import text, exists, select
+from sqlalchemy.orm import Session
+from app.models import CategoriaEstado
+
+# Resumen de estados para la página de inicio: conteos por categoría de estado, por tipo de
+# servicio y por técnico en un rango, más el KPI de reingresos, en UNA sentencia con
+# GROUPING SETS (un solo GROUP BY sobre las órdenes del rango).
+#
+# Los estados de la hoja son texto libre ("ENTREGADO AL CLIENTE", "En proceso"...). Se
+# clasifican con la tabla categorias_estado: la primera regla (por prioridad) cuyo patrón esté
+# contenido en el estado define la categoría; sin regla -> 'otro', vacío -> 'sin_estado'.
+# La tabla se puede editar sin desplegar; CATEGORIAS_POR_DEFECTO solo se carga si está vacía.
+
+TERMINADO = "terminado"
+
+CATEGORIAS_POR_DEFECTO = [
+    # (patrón, categoría, prioridad)
+    ("ENTREGADO", TERMINADO, 10),
+    ("FINALIZADO", TERMINADO, 10),
+    ("REALIZADO", TERMINADO, 10),
+    ("CERRADO", TERMINADO, 10),
+    ("PENDIENTE", "pendiente", 20),
+    ("ESPERA", "pendiente", 20),
+    ("APROBACI", "en_proceso", 30),
+    ("PROCESO", "en_proceso", 30),
+    ("INGRESO", "en_proceso", 30),
+    ("REPARACI", "en_proceso", 30),
+    ("DIAGN", "en_proceso", 30),
+]
+
+# Un equipo (por serie) que vuelve antes de estos días cuenta como reingreso
+DIAS_REINGRESO = 45
+
+# Cada estado distinto se clasifica una sola vez, no por orden
+CTE_ESTADOS = """
+estados AS (
+    SELECT e.estado,
+           CASE WHEN trim(coalesce(e.estado, '')) = '' THEN 'sin_estado'
+                ELSE coalesce(r.categoria, 'otro') END AS categoria
+    FROM (SELECT DISTINCT estado FROM ordenes) e
+    LEFT JOIN LATERAL (
+        SELECT ce.categoria FROM categorias_estado ce
+        WHERE upper(e.estado) LIKE '%' || upper(ce.patron) || '%'
+        ORDER BY ce.prioridad, ce.patron
+        LIMIT 1
+    ) r ON true
+)
+"""
+
+# ordenes: el rango más los DIAS_REINGRESO previos (la orden anterior de una serie solo importa
+# si cae dentro de la ventana). `reincide` compara con la orden anterior de la misma serie.
+SQL_RESUMEN = """
+WITH ordenes AS (
+    SELECT o.id_appsheet, o.fecha_ingreso, o.estado, o.tecnico_id, o.servicio_id,
+           CASE WHEN length(upper(e.serie)) > 3 AND upper(e.serie) <> 'S/N' THEN upper(e.serie) END AS serie
+    FROM ordenes_trabajo o
+    LEFT JOIN equipos e ON e.id = o.equipo_id
+    WHERE {filtro_ventana}
+),
+marcadas AS (
+    SELECT o.*,
+           serie IS NOT NULL
+           AND fecha_ingreso - lag(fecha_ingreso) OVER (PARTITION BY serie ORDER BY fecha_ingreso, id_appsheet) <= :dias
+               AS reincide
+    FROM ordenes o
+),
+""" + CTE_ESTADOS + """
+SELECT GROUPING(es.categoria, m.servicio_id, m.tecnico_id) AS nivel,
+       es.categoria, m.servicio_id, ts.nombre AS servicio, m.tecnico_id, t.nombre_completo AS tecnico,
+       count(*) AS total,
+       count(*) FILTER (WHERE m.reincide) AS reincidencias
+FROM marcadas m
+JOIN estados es ON es.estado IS NOT DISTINCT FROM m.estado
+LEFT JOIN tipos_servicio ts ON ts.id = m.servicio_id
+LEFT JOIN tecnicos t ON t.id = m.tecnico_id
+WHERE {filtro_periodo}
+GROUP BY GROUPING SETS ((), (es.categoria), (m.servicio_id, ts.nombre), (m.tecnico_id, t.nombre_completo))
+"""
+
+SQL_ESTADOS = """
+WITH ordenes AS (SELECT estado FROM ordenes_trabajo),
+""" + CTE_ESTADOS + """
+SELECT es.estado, es.categoria, count(*) AS ordenes
+FROM ordenes o
+JOIN estados es ON es.estado IS NOT DISTINCT FROM o.estado
+GROUP BY 1, 2
+ORDER BY 3 DESC
+"""
+
+# GROUPING(categoria, servicio_id, tecnico_id): bit en 1 = columna no agrupada en esa fila
+NIVEL_TOTAL = 0b111
+NIVEL_CATEGORIA = 0b011
+NIVEL_SERVICIO = 0b101
+NIVEL_TECNICO = 0b110
+
+
+def asegurar_categorias(db: Session):
+    """Carga las reglas por defecto si la tabla está vacía (al arrancar)."""
+    if db.scalar(select(exists().select_from(CategoriaEstado))):
+        return
+    db.add_all([CategoriaEstado(patron=p, categoria=c, prioridad=n) for p, c, n in CATEGORIAS_POR_DEFECTO])
+    db.commit()
+    print(f"🏷️ Categorías de estado por defecto cargadas ({len(CATEGORIAS_POR_DEFECTO)} reglas)")
+
+
+def _sql_resumen(inicio, fin):
+    ventana, periodo = [], []
+    if inicio:
+        ventana.append("o.fecha_ingreso >= :desde")
+        periodo.append("m.fecha_ingreso >= :inicio")
+    if fin:
+        ventana.append("o.fecha_ingreso <= :fin")
+    return SQL_RESUMEN.format(filtro_ventana=" AND ".join(ventana) or "TRUE",
+                              filtro_periodo=" AND ".join(periodo) or "TRUE")
+
+
+def resumen_estados(db: Session, inicio: date = None, fin: date = None, dias: int = DIAS_REINGRESO):
+    """
+    Conteos del rango [inicio, fin] (ambos opcionales: sin fechas es el histórico completo,
+    incluidas las órdenes sin fecha de ingreso).
+    """
+    parametros = {"inicio": inicio, "fin": fin, "dias": dias,
+                  "desde": inicio - timedelta(days=dias) if inicio else None}
+    filas = db.execute(text(_sql_resumen(inicio, fin)), parametros).mappings().all()
+
+    total, reincidencias = 0, 0
+    por_estado, por_servicio, por_tecnico = {}, [], []
+    for f in filas:
+        if f["nivel"] == NIVEL_TOTAL:
+            total, reincidencias = f["total"], f["reincidencias"]
+        elif f["nivel"] == NIVEL_CATEGORIA:
+            por_estado[f["categoria"]] = f["total"]
+        elif f["nivel"] == NIVEL_SERVICIO:
+            por_servicio.append({"id": f["servicio_id"], "nombre": f["servicio"] or "Sin servicio", "total": f["total"]})
+        elif f["nivel"] == NIVEL_TECNICO:
+            por_tecnico.append({"id": f["tecnico_id"], "nombre": f["tecnico"] or "Sin asignar", "total": f["total"]})
+
+    calidad = 100
+    if total > 0:
+        calidad = round(max(0, 100 - reincidencias / total * 100), 1)
+
+    return {
+        "periodo": {"inicio": inicio, "fin": fin},
+        "total": total,
+        "terminados": por_estado.get(TERMINADO, 0),
+        "en_proceso": total - por_estado.get(TERMINADO, 0),  # Todo lo que no está terminado
+        "por_estado": por_estado,
+        "por_servicio": sorted(por_servicio, key=lambda x: -x["total"]),
+        "por_tecnico": sorted(por_tecnico, key=lambda x: -x["total"]),
+        "reincidencias": reincidencias,
+        "ventana_dias": dias,
+        "calidad": calidad,
+    }
+
+
+def clasificacion_estados(db: Session):
+    """Reglas vigentes y cómo queda clasificado cada estado distinto de la base."""
+    reglas = db.query(CategoriaEstado).order_by(CategoriaEstado.prioridad, CategoriaEstado.patron).all()
+    return {
+        "reglas": [{"patron": r.patron, "categoria": r.categoria, "prioridad": r.prioridad} for r in reglas],
+        "estados": [dict(f) for f in db.execute(text(SQL_ESTADOS)).mappings().all()],
+    }
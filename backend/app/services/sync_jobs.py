@@ -0,0 +1,248 @@
+import os
+import time
+import uuid
+import zlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from app.database import engine, SessionLocal
+from app.models import TrabajoSync
+from app.services.etl_service import ejecutar_etl_clientes, ejecutar_etl_ingresos, ejecutar_etl_campo
+from app.services.sync_pipeline import ejecutar_sync_completo
+from app.services.sheets_client import medir_consumo
+from app.services.etl_metrics import medir_corrida, sin_medicion
+from app.services.dashboard_cache import precalentar_dashboard
+
+ETLS = {
+    "clientes": ejecutar_etl_clientes,
+    "ingresos": ejecutar_etl_ingresos,
+    "campo": ejecutar_etl_campo,
+    "todo": ejecutar_sync_completo,
+}
+
+EN_CURSO = ("pendiente", "ejecutando")
+
+# Pull completo periódico para reconciliar lo que los webhooks no hayan traído (0 = apagado)
+SYNC_RECONCILIAR_MINUTOS = int(os.getenv("SYNC_RECONCILIAR_MINUTOS", "0"))
+
+# Hilos dedicados al ETL: no consumen el threadpool de FastAPI
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SYNC_WORKERS", "2")), thread_name_prefix="sync")
+
+
+# Hojas que escribe cada job. "todo" toma los locks de las tres (siempre en este orden), así no
+# corre a la vez que una hoja suelta sobre las mismas filas, ni dos "todo" entre sí.
+HOJAS_DEL_JOB = {
+    "clientes": ("clientes",),
+    "ingresos": ("ingresos",),
+    "campo": ("campo",),
+    "todo": ("clientes", "ingresos", "campo"),
+}
+
+
+class SyncEnCurso(Exception):
+    """Otro job tiene tomadas hojas de esta sincronización y no cubre lo pedido."""
+
+    def __init__(self, hoja, job=None):
+        self.hoja = hoja
+        self.job = job
+        en_curso = f"'{job['hoja']}'" if job else "otra"
+        super().__init__(f"No se puede iniciar '{hoja}': ya hay una sincronización {en_curso} en curso")
+
+
+def _clave_lock(hoja):
+    """Llave entera para pg_advisory_lock (estable entre procesos)."""
+    return zlib.crc32(f"sync:{hoja}".encode("utf-8"))
+
+
+def _hojas_en_conflicto(hoja):
+    """Jobs que comparten alguna hoja con `hoja` (incluido el propio)."""
+    return [h for h, hojas in HOJAS_DEL_JOB.items() if set(hojas) & set(HOJAS_DEL_JOB[hoja])]
+
+
+def _tomar_locks(conn, hoja):
+    """pg_try_advisory_lock de cada hoja del job; si falta alguno suelta los ya tomados."""
+    tomados = []
+    for h in HOJAS_DEL_JOB[hoja]:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _clave_lock(h)}).scalar():
+            _soltar_locks(conn, tomados)
+            return False
+        tomados.append(h)
+    return True
+
+
+def _soltar_locks(conn, hojas):
+    for h in reversed(hojas):
+        conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _clave_lock(h)})
+    conn.commit()
+
+
+def _a_dict(job: TrabajoSync):
+    fin = job.finalizado or datetime.now()
+    return {
+        "job_id": job.id,
+        "hoja": job.hoja,
+        "estado": job.estado,
+        "filas_leidas": job.filas_leidas or 0,
+        "filas_transformadas": job.filas_transformadas or 0,
+        "filas_cargadas": job.filas_cargadas or 0,
+        "iniciado": job.iniciado,
+        "finalizado": job.finalizado,
+        "segundos": round((fin - job.iniciado).total_seconds(), 1) if job.iniciado else None,
+        "resultado": job.resultado,
+    }
+
+
+def _actualizar(job_id, **campos):
+    """Actualiza el job en su propia sesión para no interferir con la transacción del ETL."""
+    db = SessionLocal()
+    try:
+        # El SQL del progreso no cuenta en las métricas de la corrida
+        with sin_medicion():
+            db.query(TrabajoSync).filter(TrabajoSync.id == job_id).update(campos)
+            db.commit()
+    finally:
+        db.close()
+
+
+def _ejecutar(job_id, hoja, conn_lock, opciones):
+    db = SessionLocal()
+    completado = False
+    try:
+        _actualizar(job_id, estado="ejecutando")
+        def progreso(**avance):
+            medicion.avance(**avance)
+            _actualizar(job_id, **avance)
+
+        with medir_corrida(hoja, job_id) as medicion, medir_consumo() as consumo:
+            resultado = ETLS[hoja](db, progreso=progreso, **opciones)
+            # Llamadas/bytes/tiempo de red contra Sheets, separados del tiempo de carga
+            medicion.consumo_api = consumo.a_dict()
+            medicion.resultado = resultado = {**resultado, "sheets_api": medicion.consumo_api}
+        resultado["metricas"] = medicion.resumen()
+        estado = "error" if resultado.get("status") == "error" else "completado"
+        _actualizar(job_id, estado=estado, resultado=resultado, finalizado=datetime.now())
+        completado = estado == "completado"
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error en sync {hoja} ({job_id}): {e}")
+        _actualizar(job_id, estado="error", resultado={"status": "error", "message": str(e)},
+                    finalizado=datetime.now())
+    finally:
+        db.close()
+        try:
+            _soltar_locks(conn_lock, HOJAS_DEL_JOB[hoja])
+        finally:
+            conn_lock.close()
+
+    # Con los locks ya liberados: un sync pedido durante el precalentamiento arranca normalmente
+    if completado:
+        precalentar_dashboard()
+
+
+def _job_en_curso(hoja, intentos=10):
+    """
+    Busca el job activo que tiene tomadas las hojas de `hoja` (de otra petición/worker; puede
+    tardar un instante en aparecer): el de la misma hoja, un "todo" o, para "todo", una hoja suelta.
+    """
+    for _ in range(intentos):
+        db = SessionLocal()
+        try:
+            job = (
+                db.query(TrabajoSync)
+                .filter(TrabajoSync.hoja.in_(_hojas_en_conflicto(hoja)), TrabajoSync.estado.in_(EN_CURSO))
+                .order_by(TrabajoSync.iniciado.desc())
+                .first()
+            )
+            if job:
+                return _a_dict(job)
+        finally:
+            db.close()
+        time.sleep(0.2)
+    return None
+
+
+def encolar_sync(hoja, tamano_lote=None, forzar=False, modo="lotes"):
+    """
+    Encola la sincronización de `hoja` y retorna el job.
+
+    Advisory locks de Postgres (de sesión, en una conexión dedicada; uno por hoja, ver
+    HOJAS_DEL_JOB) garantizan una sola ejecución por hoja aunque haya varios workers de
+    uvicorn: si ya hay una en curso que cubre lo pedido (misma hoja o "todo"), la petición
+    se une a ese job en lugar de lanzar otro ETL. Si no hay job al que unirse, lanza
+    SyncEnCurso (el router responde 409).
+    """
+    conn = engine.connect()
+    try:
+        obtenido = _tomar_locks(conn, hoja)
+        conn.commit()
+    except Exception:
+        conn.close()
+        raise
+
+    if not obtenido:
+        conn.close()
+        job = _job_en_curso(hoja)
+        if job and job["hoja"] not in (hoja, "todo"):
+            # Ej.: "todo" pedido mientras corre solo "clientes": unirse no cumpliría lo pedido
+            raise SyncEnCurso(hoja, job)
+        if not job:
+            # Lock tomado pero su job aún no es visible: no hay a qué unirse ni nada que reportar como hecho
+            raise SyncEnCurso(hoja)
+        return {**job, "coalescido": True}
+
+    try:
+        db = SessionLocal()
+        try:
+            # Si tenemos los locks, cualquier job 'en curso' sobre estas hojas es de un proceso que murió
+            db.query(TrabajoSync).filter(
+                TrabajoSync.hoja.in_(_hojas_en_conflicto(hoja)), TrabajoSync.estado.in_(EN_CURSO)
+            ).update({"estado": "abandonado", "finalizado": datetime.now()}, synchronize_session=False)
+
+            job = TrabajoSync(id=str(uuid.uuid4()), hoja=hoja, estado="pendiente", iniciado=datetime.now())
+            db.add(job)
+            db.commit()
+            respuesta = {**_a_dict(job), "coalescido": False}
+        finally:
+            db.close()
+
+        opciones = {"tamano_lote": tamano_lote, "forzar": forzar, "modo": modo}
+        _executor.submit(_ejecutar, respuesta["job_id"], hoja, conn, opciones)
+        return respuesta
+    except Exception:
+        _soltar_locks(conn, HOJAS_DEL_JOB[hoja])
+        conn.close()
+        raise
+
+
+def obtener_job(job_id):
+    db = SessionLocal()
+    try:
+        job = db.query(TrabajoSync).filter(TrabajoSync.id == job_id).first()
+        return _a_dict(job) if job else None
+    finally:
+        db.close()
+
+
+def iniciar_reconciliacion():
+    """
+    Lanza (una vez por proceso) el hilo que encola el sync completo cada SYNC_RECONCILIAR_MINUTOS.
+    Con varios workers el advisory lock hace que solo uno ejecute; el resto se une al job.
+    """
+    if SYNC_RECONCILIAR_MINUTOS <= 0:
+        return
+
+    def ciclo():
+        while True:
+            time.sleep(SYNC_RECONCILIAR_MINUTOS * 60)
+            try:
+                job = encolar_sync("todo")
+                if not job.get("coalescido"):
+                    print(f"🔁 Reconciliación programada: job {job['job_id']}")
+            except SyncEnCurso as e:
+                print(f"⏭️ Reconciliación omitida: {e}")
+            except Exception as e:
+                print(f"❌ No se pudo encolar la reconciliación: {e}")
+
+    threading.Thread(target=ciclo, name="sync-reconciliacion", daemon=True).start()
+    print(f"🔁 Reconciliación completa cada {SYNC_RECONCILIAR_MINUTOS} min")
@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from app.services.sheet_sources import obtener_fuente
+from app.services.etl_metrics import etapa
+from app.services.etl_service import (
+    HOJA_CLIENTES, HOJA_INGRESOS, HOJA_CAMPO,
+    transformar_clientes, transformar_ingresos, transformar_campo,
+    cargar_clientes, cargar_ingresos, cargar_campo
+)
+
+# Orden de carga seguro para las FKs: clientes antes que ingresos y campo
+ETAPAS = [
+    ("clientes", HOJA_CLIENTES, transformar_clientes, cargar_clientes),
+    ("ingresos", HOJA_INGRESOS, transformar_ingresos, cargar_ingresos),
+    ("campo", HOJA_CAMPO, transformar_campo, cargar_campo),
+]
+
+
+class _ProgresoAcumulado:
+    """Suma el avance de cada hoja para reportarlo como un solo job."""
+
+    def __init__(self, progreso):
+        self.progreso = progreso
+        self.por_hoja = {}
+
+    def para(self, hoja):
+        def _avance(**campos):
+            self.por_hoja.setdefault(hoja, {}).update(campos)
+            totales = {}
+            for avance in self.por_hoja.values():
+                for k, v in avance.items():
+                    totales[k] = totales.get(k, 0) + v
+            self.progreso(**totales)
+        return _avance
+
+
+def ejecutar_sync_completo(db: Session, tamano_lote: int = None, forzar: bool = False, progreso=None,
+                           modo: str = "lotes"):
+    """
+    Pipeline completo: descarga las tres pestañas en paralelo, las transforma en un pool
+    de hilos y las carga en orden de dependencias (clientes -> ingresos -> campo).
+    """
+    acumulado = _ProgresoAcumulado(progreso or (lambda **avance: None))
+    tiempos = {}
+    print("🔄 Sincronización completa (Clientes, Ingresos, Campo)...")
+
+    # 1. EXTRACCIÓN (una sola apertura del spreadsheet, idealmente un solo batchGet)
+    t0 = time.perf_counter()
+    try:
+        with etapa("descarga"):
+            matrices = obtener_fuente().leer_hojas([hoja for _, hoja, _, _ in ETAPAS])
+    except Exception as e:
+        print(f"❌ Error GSheets: {e}")
+        return {"status": "error", "message": f"Error GSheets: {str(e)}"}
+    tiempos["descarga"] = round(time.perf_counter() - t0, 3)
+
+    # 2. TRANSFORMACIÓN (concurrente, sin base de datos)
+    def _transformar(etapa):
+        nombre, hoja, transformar, _ = etapa
+        if matrices.get(hoja) is None:
+            return nombre, None, f"No se encontró hoja '{hoja}'"
+        try:
+            return nombre, transformar(matrices[hoja]), None
+        except ValueError as e:
+            return nombre, None, str(e)
+
+    t0 = time.perf_counter()
+    with etapa("transformacion"), ThreadPoolExecutor(max_workers=len(ETAPAS)) as pool:
+        transformados = {nombre: (lote, error) for nombre, lote, error in pool.map(_transformar, ETAPAS)}
+    tiempos["transformacion"] = round(time.perf_counter() - t0, 3)
+
+    # 3. CARGA (secuencial y en orden de FKs, una transacción por hoja)
+    resultados = {}
+    t0 = time.perf_counter()
+    for nombre, _, _, cargar in ETAPAS:
+        lote, error = transformados[nombre]
+        if error:
+            resultados[nombre] = {"status": "error", "message": error}
+            continue
+        avance = acumulado.para(nombre)
+        avance(filas_leidas=lote["leidas"])
+        resultados[nombre] = cargar(db, lote, tamano_lote, forzar, avance, modo)
+    tiempos["carga"] = round(time.perf_counter() - t0, 3)
+
+    fallidas = [n for n, r in resultados.items() if r.get("status") == "error"]
+    return {
+        "status": "error" if len(fallidas) == len(ETAPAS) else ("warning" if fallidas else "success"),
+        "mensaje": " | ".join(f"{n}: {r.get('mensaje') or r.get('message')}" for n, r in resultados.items()),
+        "hojas": resultados,
+        "tiempos": tiempos
+    }
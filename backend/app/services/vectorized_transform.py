@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Etapa de transformación columnar (opcional) para el ETL.
+# Produce exactamente las mismas filas que los helpers fila por fila de etl_service
+# (normalizar_fila_*), pero trabajando por columna completa.
+#
+# Cada columna se codifica como diccionario (pd.factorize): las hojas repiten muchísimo
+# técnicos, servicios, estados y fechas, así que la limpieza, el parseo de fechas y los
+# cambios de mayúsculas corren una vez por valor DISTINTO y se propagan con `take`.
+
+
+def _por_valor_unico(serie: pd.Series, funcion) -> pd.Series:
+    """Aplica `funcion` a cada valor distinto no nulo de la columna; los nulos quedan en None."""
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    if len(unicos) == 0:
+        return pd.Series(None, index=serie.index, dtype=object)
+    # Posición extra al final para los nulos (código -1)
+    tabla = np.empty(len(unicos) + 1, dtype=object)
+    tabla[:-1] = [funcion(v) for v in unicos]
+    tabla[-1] = None
+    return pd.Series(tabla.take(codigos), index=serie.index, dtype=object)
+
+
+def _limpiar(valor):
+    """Celda vacía -> None; en otro caso, texto sin espacios extremos (como ExtractorColumnas)."""
+    return None if valor == "" else str(valor).strip()
+
+
+def transformar_columnar(extractor, registros, campo_id, reglas, parse_date, nombre_hoja=""):
+    """
+    Convierte la matriz cruda en columnas (DataFrame), aplica las reglas del mapeo y
+    retorna {"filas", "leidas", "omitidos"} igual que `etl_service._transformar`.
+
+    `reglas`:
+      - salida:     campos (en orden) de la fila normalizada
+      - fechas:     campos a convertir con `parse_date`
+      - mayusculas: campos a `.upper()` (vacío -> None)
+      - titulo:     {campo: largo_minimo} a `.title()` si tiene al menos ese largo (si no, None)
+      - defecto:    {campo: valor} si la celda viene vacía
+    """
+    leidas = len(registros)
+    crudo = pd.DataFrame.from_records(registros) if registros else pd.DataFrame()
+
+    df = pd.DataFrame(index=crudo.index)
+    for campo in reglas["salida"]:
+        i = extractor.plan.get(campo)
+        if i is not None and i in crudo.columns:
+            df[campo] = _por_valor_unico(crudo[i], _limpiar)
+        else:
+            df[campo] = pd.Series(None, index=crudo.index, dtype=object)
+
+    # Filas sin ID (None o texto vacío tras limpiar)
+    ids = df[campo_id]
+    validas = ids.notna() & (ids != "")
+    omitidas = (~validas).to_numpy().nonzero()[0]
+    for i in omitidas[:3]:
+        print(f"⚠️ [{nombre_hoja}] Fila {i + 2} omitida: ID vacío.")
+    df = df[validas]
+
+    for campo, valor in reglas.get("defecto", {}).items():
+        df[campo] = _por_valor_unico(df[campo], lambda v: v or valor).where(df[campo].notna(), valor)
+
+    for campo in reglas.get("mayusculas", []):
+        df[campo] = _por_valor_unico(df[campo], lambda v: v.upper() if v else None)
+
+    for campo, largo_minimo in reglas.get("titulo", {}).items():
+        df[campo] = _por_valor_unico(df[campo], lambda v, n=largo_minimo: v.title() if v and len(v) >= n else None)
+
+    for campo in reglas.get("fechas", []):
+        df[campo] = _por_valor_unico(df[campo], parse_date)
+
+    # Reconstrucción de filas sin to_dict('records') (que encajona celda por celda)
+    salida = reglas["salida"]
+    columnas = [df[c].tolist() for c in salida]
+    filas = [dict(zip(salida, valores)) for valores in zip(*columnas)]
+    return {"filas": filas, "leidas": leidas, "omitidos": len(omitidas)}
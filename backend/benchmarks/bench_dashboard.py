@@ -0,0 +1,163 @@
+"""
+Compara el dashboard de analítica en modo 'multiple' (una consulta por sección), 'unico'
+(una sola sentencia sobre un CTE con las órdenes del rango) y 'resumen' (secciones desde el
+resumen diario; el KPI de reincidencia sigue leyendo las órdenes).
+
+Crea un esquema aparte (bench_dashboard) en la base configurada (DB_HOST, DB_NAME...), lo llena
+con datos sintéticos y lo elimina al terminar; no toca las tablas reales.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_dashboard                 # 200.000 órdenes en 3 años
+    python -m benchmarks.bench_dashboard 500000
+    python -m benchmarks.bench_dashboard 200000 --conservar   # deja el esquema para inspeccionarlo
+    python -m benchmarks.bench_dashboard 200000 --guardar     # agrega los tiempos a resultados_dashboard.md
+
+Verifica además que los tres modos devuelven las mismas métricas. Con --guardar los tiempos
+(mediana de 5 corridas, en ms) se agregan a benchmarks/resultados_dashboard.md junto con la
+versión de Postgres, para dejarlos registrados al lado del script.
+"""
+import os
+import sys
+import time
+import statistics
+from datetime import date, timedelta
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app import models
+from app.database import engine, SQLALCHEMY_DATABASE_URL
+from app.routers.analytics import obtener_metricas_raw
+from app.services.daily_rollup import reconstruir_resumen
+
+ESQUEMA = "bench_dashboard"
+RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados_dashboard.md")
+
+CIUDADES = ["Quito", "Guayaquil", "Cuenca", "Ambato", "Manta", "Loja", "Machala", "Ibarra",
+            "Riobamba", "Esmeraldas", "Portoviejo", "Latacunga", "Santo Domingo", None]
+
+SQL_DATOS = [
+    "SELECT setseed(0.42)",
+    "INSERT INTO tecnicos (nombre_completo, activo) SELECT 'Tecnico ' || g, true FROM generate_series(1, 25) g",
+    """INSERT INTO tipos_servicio (nombre)
+       SELECT unnest(ARRAY['MANTENIMIENTO PREVENTIVO', 'REPARACIÓN', 'CALIBRACIÓN', 'INSTALACIÓN',
+                           'VERIFICACIÓN', 'DIAGNÓSTICO'])""",
+    """INSERT INTO clientes (id_cliente_appsheet, nombre_fiscal, ciudad)
+       SELECT 'CLI-' || g, 'Cliente ' || g, (CAST(:ciudades AS text[]))[1 + g % :n_ciudades]
+       FROM generate_series(1, :clientes) g""",
+    # 1 de cada 50 equipos con serie basura, como en las hojas reales
+    """INSERT INTO equipos (serie, marca, modelo, cliente_id)
+       SELECT CASE WHEN g % 50 = 0 THEN 'S/N' ELSE 'SER' || g END, 'Mettler', 'PS-30', 'CLI-' || (1 + g % :clientes)
+       FROM generate_series(1, :equipos) g""",
+    """INSERT INTO ordenes_trabajo (id_appsheet, fecha_ingreso, estado, cliente_id, equipo_id, servicio_id, tecnico_id)
+       SELECT 'ORD-' || g,
+              DATE '2023-01-01' + CAST(random() * 1095 AS int),
+              (ARRAY['ENTREGADO', 'EN PROCESO', 'PENDIENTE'])[1 + CAST(random() * 2 AS int)],
+              'CLI-' || (1 + CAST(random() * (:clientes - 1) AS int)),
+              1 + CAST(random() * (:equipos - 1) AS int),
+              1 + CAST(random() * 5 AS int),
+              CASE WHEN random() < 0.05 THEN NULL ELSE 1 + CAST(random() * 24 AS int) END
+       FROM generate_series(1, :ordenes) g""",
+]
+
+
+def preparar(ordenes):
+    with engine.begin() as conn:
+        # Los índices trigram de la búsqueda usan gin_trgm_ops (extensión en public)
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {ESQUEMA}"))
+
+    # public va detrás solo para resolver gin_trgm_ops; las tablas se crean y leen en ESQUEMA.
+    # checkfirst=False: con public en el search_path, create_all vería las tablas reales y no
+    # crearía las del benchmark (el esquema es nuevo, no hay nada que chequear)
+    motor = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"options": f"-csearch_path={ESQUEMA},public"})
+    models.Base.metadata.create_all(bind=motor, checkfirst=False)
+
+    t0 = time.perf_counter()
+    params = {
+        "ordenes": ordenes, "clientes": max(ordenes // 100, 50), "equipos": max(ordenes // 15, 100),
+        "ciudades": CIUDADES, "n_ciudades": len(CIUDADES),
+    }
+    with motor.begin() as conn:
+        for sql in SQL_DATOS:
+            conn.execute(text(sql), params)
+    with Session(motor) as db:
+        reconstruir_resumen(db)
+    with motor.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE"))
+    print(f"🧪 {ordenes} órdenes sintéticas en '{ESQUEMA}' ({time.perf_counter() - t0:.1f}s)")
+    return motor
+
+
+def medir(db, modo, inicio, fin, repeticiones):
+    tiempos, resultado = [], None
+    obtener_metricas_raw(db, inicio, fin, modo=modo)  # calentamiento (planes y caché de Postgres)
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = obtener_metricas_raw(db, inicio, fin, modo=modo)
+        tiempos.append(time.perf_counter() - t0)
+        db.rollback()
+    return statistics.median(tiempos) * 1000, resultado
+
+
+def _comparable(metricas):
+    """Ignora el orden de secciones sin ORDER BY en el modo multiple y los empates."""
+    return {
+        **metricas,
+        "technicians": sorted(metricas["technicians"], key=lambda x: (-x["total"], x["name"])),
+        "services": sorted(metricas["services"], key=lambda x: x["name"]),
+        "locations": sorted(metricas["locations"], key=lambda x: (-x["count"], x["city"])),
+        "quality_kpi": {
+            **metricas["quality_kpi"],
+            "por_tecnico": sorted(metricas["quality_kpi"]["por_tecnico"], key=lambda x: (-x["count"], x["name"])),
+            "por_cliente": sorted(metricas["quality_kpi"]["por_cliente"], key=lambda x: (-x["count"], x["name"])),
+        },
+    }
+
+
+def guardar(ordenes, version_pg, filas):
+    nuevo = not os.path.exists(RESULTADOS)
+    with open(RESULTADOS, "a", encoding="utf-8") as f:
+        if nuevo:
+            f.write("# Dashboard: multiple vs unico vs resumen\n\n"
+                    "Generado por `python -m benchmarks.bench_dashboard N --guardar` (mediana de 5 corridas).\n")
+        f.write(f"\n## {date.today()} | {ordenes} órdenes | {version_pg}\n\n"
+                "| Rango (días) | multiple (ms) | unico (ms) | resumen (ms) | multiple / resumen |\n"
+                "|---|---|---|---|---|\n")
+        for dias, t_multi, t_unico, t_resumen in filas:
+            f.write(f"| {dias} | {t_multi:.1f} | {t_unico:.1f} | {t_resumen:.1f} | x{t_multi / t_resumen:.1f} |\n")
+    print(f"📝 Resultados agregados a {RESULTADOS}")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    ordenes = int(args[0]) if args else 200000
+    conservar = "--conservar" in sys.argv
+
+    motor = preparar(ordenes)
+    filas = []
+    try:
+        with Session(motor) as db:
+            version_pg = db.execute(text("SHOW server_version")).scalar()
+            fin = date(2025, 12, 31)
+            for dias in (180, 365, 1095):
+                inicio = fin - timedelta(days=dias)
+                t_multi, r_multi = medir(db, "multiple", inicio, fin, 5)
+                t_unico, r_unico = medir(db, "unico", inicio, fin, 5)
+                t_resumen, r_resumen = medir(db, "resumen", inicio, fin, 5)
+                iguales = _comparable(r_multi) == _comparable(r_unico) == _comparable(r_resumen)
+                print(f"Rango {dias} días: multiple {t_multi:.1f} ms | unico {t_unico:.1f} ms "
+                      f"| resumen {t_resumen:.1f} ms | x{t_multi / t_resumen:.1f} | resultados idénticos: {iguales}")
+                if not iguales:
+                    sys.exit(1)
+                filas.append((dias, t_multi, t_unico, t_resumen))
+        if "--guardar" in sys.argv:
+            guardar(ordenes, f"PostgreSQL {version_pg}", filas)
+    finally:
+        motor.dispose()
+        if not conservar:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
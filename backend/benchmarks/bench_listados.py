@@ -0,0 +1,87 @@
+"""
+Compara /api/trabajos (y /api/campo, /api/clientes) en modo JSON (lista completa en memoria)
+vs. streaming NDJSON (Accept: application/x-ndjson, yield_per + serialización por lotes).
+
+Levanta un uvicorn nuevo por medición para que el pico de memoria (VmHWM) sea solo de esa
+petición, y mide tiempo al primer byte, tiempo total y bytes. Usa la base configurada
+(DB_HOST, DB_NAME...) tal cual: correrlo con datos reales cargados. Solo Linux (/proc).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_listados                  # /api/trabajos, limit=5000
+    python -m benchmarks.bench_listados 2000 /api/campo
+"""
+import sys
+import time
+import socket
+import subprocess
+import urllib.request
+
+PUERTO = 8765
+RUTAS_POR_DEFECTO = ["/api/trabajos"]
+
+
+def _pico_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for linea in f:
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1]) / 1024
+    return None
+
+
+def _esperar_puerto(timeout=30):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            with socket.create_connection(("127.0.0.1", PUERTO), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("uvicorn no arrancó")
+
+
+def medir(ruta, limite, stream):
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PUERTO), "--log-level", "warning"],
+    )
+    try:
+        _esperar_puerto()
+        base_rss = _pico_rss_mb(servidor.pid)
+        peticion = urllib.request.Request(
+            f"http://127.0.0.1:{PUERTO}{ruta}?limit={limite}",
+            headers={"Accept": "application/x-ndjson" if stream else "application/json"},
+        )
+        t0 = time.perf_counter()
+        primer_byte, total = None, 0
+        with urllib.request.urlopen(peticion) as respuesta:
+            while True:
+                bloque = respuesta.read(65536)
+                if primer_byte is None:
+                    primer_byte = time.perf_counter() - t0
+                if not bloque:
+                    break
+                total += len(bloque)
+        segundos = time.perf_counter() - t0
+        return {
+            "ttfb_ms": primer_byte * 1000,
+            "total_ms": segundos * 1000,
+            "mb": total / 1e6,
+            "rss_extra_mb": _pico_rss_mb(servidor.pid) - base_rss,
+        }
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def main():
+    limite = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rutas = sys.argv[2:] or RUTAS_POR_DEFECTO
+    for ruta in rutas:
+        for stream in (False, True):
+            r = medir(ruta, limite, stream)
+            modo = "ndjson" if stream else "json  "
+            print(f"{ruta} limit={limite} {modo}: primer byte {r['ttfb_ms']:.0f} ms | total {r['total_ms']:.0f} ms "
+                  f"| {r['mb']:.1f} MB | pico RSS +{r['rss_extra_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
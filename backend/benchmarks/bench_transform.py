@@ -0,0 +1,72 @@
+"""
+Compara la transformación fila por fila vs. la columnar (pandas) del ETL.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_transform            # hoja sintética de 20.000 filas
+    python -m benchmarks.bench_transform 50000
+    SHEETS_SOURCE=local python -m benchmarks.bench_transform --snapshot   # snapshots reales
+
+Verifica además que ambos modos producen exactamente las mismas filas.
+"""
+import sys
+import time
+import random
+from app.services import etl_service
+from app.services.sheet_sources import obtener_fuente
+
+ENCABEZADOS = ["ID", "Fecha Ingreso", "Tipo Ingreso", "No. Orden Taller", "No. Orden Campo", "Cliente",
+               "Servicio", "Técnico Ejecución", "Estado", "Marca", "Modelo", "Serie", "Tipo",
+               "Capacidad", "Sensibilidad", "Observaciones", "Daño Balanza"]
+
+
+def hoja_sintetica(n):
+    random.seed(42)
+    tecnicos = ["juan perez", "MARIA LOPEZ", "  carlos  ", "", "JO"]
+    servicios = ["mantenimiento preventivo", "Reparación", "calibración", ""]
+    fechas = [f"{d:02d}/{m:02d}/2024" for d in range(1, 29) for m in range(1, 13)] + ["2024-05-01", "", "s/f"]
+    filas = [ENCABEZADOS]
+    for i in range(n):
+        filas.append([
+            f"ORD-{i}", random.choice(fechas), "Taller", str(i), "", f"CLI-{i % 400}",
+            random.choice(servicios), random.choice(tecnicos), random.choice(["ENTREGADO", "EN PROCESO"]),
+            "Mettler", "PS-30", f"SER{i % 3000}", "Balanza", "30 kg", "5 g", " obs ", ""
+        ])
+    return filas
+
+
+def medir(funcion, raw, repeticiones=3):
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion(raw)
+        dt = time.perf_counter() - t0
+        mejor = dt if mejor is None else min(mejor, dt)
+    return mejor, resultado
+
+
+def main():
+    args = sys.argv[1:]
+    if "--snapshot" in args:
+        hojas = [
+            (etl_service.HOJA_CLIENTES, etl_service.transformar_clientes),
+            (etl_service.HOJA_INGRESOS, etl_service.transformar_ingresos),
+            (etl_service.HOJA_CAMPO, etl_service.transformar_campo),
+        ]
+        matrices = obtener_fuente().leer_hojas([h for h, _ in hojas])
+        casos = [(h, matrices[h], f) for h, f in hojas if matrices.get(h)]
+    else:
+        n = int(args[0]) if args else 20000
+        casos = [("Ingresos (sintética)", hoja_sintetica(n), etl_service.transformar_ingresos)]
+
+    for nombre, raw, transformar in casos:
+        t_filas, r_filas = medir(lambda m: transformar(m, vectorizado=False), raw)
+        t_col, r_col = medir(lambda m: transformar(m, vectorizado=True), raw)
+        iguales = r_filas == r_col
+        print(f"{nombre}: {len(raw) - 1} filas | fila por fila {t_filas:.3f}s | columnar {t_col:.3f}s "
+              f"| x{t_filas / t_col:.1f} | resultados idénticos: {iguales}")
+        if not iguales:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
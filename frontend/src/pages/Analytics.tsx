@@ -9,6 +9,14 @@ import {
 import ReactMarkdown from 'react-markdown';
 import { api } from '../services/api';
 
+// Agrupación de la tendencia (se calcula en el servidor)
+const GRANULARIDADES = [
+  { value: 'day', label: 'Diaria' },
+  { value: 'week', label: 'Semanal' },
+  { value: 'month', label: 'Mensual' },
+  { value: 'quarter', label: 'Trimestral' },
+];
+
 // Paleta de colores profesional
 const COLORS = ['#3B82F6', '#10B981', '#F59E0B', '#EF4444', '#8B5CF6', '#EC4899', '#6366F1'];
 
@@ -25,6 +33,7 @@ export default function Analytics() {
     return d.toISOString().split('T')[0];
   });
   const [endDate, setEndDate] = useState(new Date().toISOString().split('T')[0]);
+  const [granularity, setGranularity] = useState('month');
 
   // Estados para la IA
   const [insight, setInsight] = useState<string | null>(null);
@@ -34,14 +43,14 @@ export default function Analytics() {
   useEffect(() => {
     loadAnalytics();
     setInsight(null); // Limpiar insight al cambiar fechas
-  }, [startDate, endDate]);
+  }, [startDate, endDate, granularity]);
 
   // --- FUNCIONES ---
   const loadAnalytics = async () => {
     setLoading(true);
     setError('');
     try {
-      const result = await api.getAnalytics(startDate, endDate);
+      const result = await api.getAnalytics(startDate, endDate, granularity);
       setData(result);
     } catch (err) {
       console.error("Error cargando analítica", err);
@@ -206,6 +215,11 @@ export default function Analytics() {
                 <p className="text-slate-400 text-xs mt-1 font-medium inline-block">
                     {data.quality_kpi?.reincidencias_detectadas || 0} equipos reincidentes
                 </p>
+                {data.quality_kpi?.ventana_dias && (
+                    <p className="text-slate-400 text-[10px] mt-0.5">
+                        {data.quality_kpi.reincidencias_en_ventana || 0} regresos en ≤ {data.quality_kpi.ventana_dias} días
+                    </p>
+                )}
             </div>
 
             {/* Gráfico Circular SVG */}
@@ -265,12 +279,23 @@ export default function Analytics() {
 
         {/* Tendencia Temporal */}
         <div className="bg-white p-6 rounded-2xl border border-slate-200 shadow-sm flex flex-col">
-            <div className="mb-6">
-                <h3 className="text-lg font-bold text-slate-800 flex items-center gap-2">
-                    <TrendingUp size={20} className="text-purple-500"/>
-                    Tendencia de Demanda
-                </h3>
-                <p className="text-sm text-slate-500">Evolución histórica mensual</p>
+            <div className="mb-6 flex justify-between items-start gap-4">
+                <div>
+                    <h3 className="text-lg font-bold text-slate-800 flex items-center gap-2">
+                        <TrendingUp size={20} className="text-purple-500"/>
+                        Tendencia de Demanda
+                    </h3>
+                    <p className="text-sm text-slate-500">
+                        Evolución histórica {GRANULARIDADES.find(g => g.value === granularity)?.label.toLowerCase()}
+                    </p>
+                </div>
+                <select
+                    value={granularity}
+                    onChange={(e) => setGranularity(e.target.value)}
+                    className="text-sm border border-slate-200 rounded-lg px-2 py-1 text-slate-600 bg-white"
+                >
+                    {GRANULARIDADES.map(g => <option key={g.value} value={g.value}>{g.label}</option>)}
+                </select>
             </div>
             <div className="h-80 w-full flex-1 min-h-[300px]">
                 <ResponsiveContainer width="100%" height="100%">
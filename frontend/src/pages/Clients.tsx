@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useMemo } from 'react';
+import React, { useEffect, useState } from 'react';
 import { Search, MapPin, Building2, Phone, Mail, User, RefreshCw, ChevronLeft, ChevronRight } from 'lucide-react';
 import { api } from '../services/api';
 
@@ -18,16 +18,29 @@ export default function Clients() {
     const [clientes, setClientes] = useState<Cliente[]>([]);
     const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState('');
+    const [busqueda, setBusqueda] = useState('');
+    const [totalClientes, setTotalClientes] = useState(0);
+    const [cursores, setCursores] = useState<(string | null)[]>([null]);
+    const [siguiente, setSiguiente] = useState<string | null>(null);
     const [currentPage, setCurrentPage] = useState(1);
     const itemsPerPage = 10;
 
-    useEffect(() => { loadData(); }, []);
+    // Búsqueda en el servidor (nombre fiscal, RUC o ID) tras una pausa al escribir
+    useEffect(() => {
+        const espera = setTimeout(() => setBusqueda(searchTerm.trim()), 300);
+        return () => clearTimeout(espera);
+    }, [searchTerm]);
 
-    const loadData = async () => {
+    useEffect(() => { loadData(); }, [busqueda]);
+
+    const loadPage = async (pagina: number, cursor: string | null) => {
         setLoading(true);
         try {
-            const data = await api.getClientes();
-            setClientes(data);
+            const data = await api.buscarClientes({ q: busqueda, orden: 'nombre_fiscal' }, cursor, itemsPerPage);
+            setClientes(data.filas);
+            setSiguiente(data.siguiente);
+            if (data.total != null) setTotalClientes(data.total);
+            setCurrentPage(pagina);
         } catch (error) {
             console.error("Error cargando clientes", error);
         } finally {
@@ -35,24 +48,31 @@ export default function Clients() {
         }
     };
 
-    const filteredData = useMemo(() => {
-        return clientes.filter(c =>
-            (c.nombre_fiscal || '').toLowerCase().includes(searchTerm.toLowerCase()) ||
-            (c.ruc || '').includes(searchTerm) ||
-            (c.asesor_responsable || '').toLowerCase().includes(searchTerm.toLowerCase())
-        );
-    }, [clientes, searchTerm]);
+    const loadData = () => {
+        setCursores([null]);
+        loadPage(1, null);
+    };
+
+    const irSiguiente = () => {
+        if (!siguiente) return;
+        setCursores(prev => [...prev.slice(0, currentPage), siguiente]);
+        loadPage(currentPage + 1, siguiente);
+    };
+
+    const irAnterior = () => {
+        if (currentPage > 1) loadPage(currentPage - 1, cursores[currentPage - 2]);
+    };
 
-    // Paginación
-    const totalPages = Math.ceil(filteredData.length / itemsPerPage);
-    const currentData = filteredData.slice((currentPage - 1) * itemsPerPage, currentPage * itemsPerPage);
+    // Paginación (el total llega en X-Total-Count)
+    const totalPages = Math.max(1, Math.ceil(totalClientes / itemsPerPage));
+    const currentData = clientes;
 
     return (
         <div className="space-y-6">
             <div className="flex justify-between items-center">
                 <div>
                     <h1 className="text-2xl font-bold text-slate-800">Directorio de Clientes</h1>
-                    <p className="text-slate-500">Cartera total: {clientes.length} empresas</p>
+                    <p className="text-slate-500">Cartera total: {totalClientes} empresas</p>
                 </div>
                 <button onClick={loadData} className="p-2 bg-white border rounded-lg hover:bg-slate-50">
                     <RefreshCw size={20} className={loading ? 'animate-spin' : ''} />
@@ -65,7 +85,7 @@ export default function Clients() {
                         <Search className="absolute left-3 top-1/2 -translate-y-1/2 text-slate-400" size={18} />
                         <input
                             type="text"
-                            placeholder="Buscar empresa, RUC o asesor..."
+                            placeholder="Buscar empresa o RUC..."
                             className="w-full pl-10 pr-4 py-2 bg-white border border-slate-200 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500/20"
                             onChange={(e) => setSearchTerm(e.target.value)}
                         />
@@ -119,8 +139,8 @@ export default function Clients() {
                  <div className="flex items-center justify-between px-6 py-4 border-t border-slate-100 bg-slate-50">
                     <span className="text-sm text-slate-500">Página {currentPage} de {totalPages}</span>
                     <div className="flex gap-2">
-                        <button onClick={() => setCurrentPage(p => Math.max(1, p - 1))} disabled={currentPage === 1} className="p-2 bg-white border rounded hover:bg-slate-50 disabled:opacity-50"><ChevronLeft size={16}/></button>
-                        <button onClick={() => setCurrentPage(p => Math.min(totalPages, p + 1))} disabled={currentPage === totalPages} className="p-2 bg-white border rounded hover:bg-slate-50 disabled:opacity-50"><ChevronRight size={16}/></button>
+                        <button onClick={irAnterior} disabled={currentPage === 1 || loading} className="p-2 bg-white border rounded hover:bg-slate-50 disabled:opacity-50"><ChevronLeft size={16}/></button>
+                        <button onClick={irSiguiente} disabled={!siguiente || loading} className="p-2 bg-white border rounded hover:bg-slate-50 disabled:opacity-50"><ChevronRight size={16}/></button>
                     </div>
                 </div>
             </div>
@@ -6,22 +6,31 @@ export default function Config() {
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState<{ type: 'success' | 'error', text: string } | null>(null);
 
-  const handleSync = async (type: 'clientes' | 'ingresos' | 'campo') => {
+  const handleSync = async (type: 'clientes' | 'ingresos' | 'campo' | 'todo') => {
     setLoading(true);
     setMessage(null);
     try {
-      let response;
-      if (type === 'clientes') response = await api.syncClientes();
-      if (type === 'ingresos') response = await api.syncIngresos();
-      if (type === 'campo') response = await api.syncCampo();
+      let job;
+      if (type === 'clientes') job = await api.syncClientes();
+      if (type === 'ingresos') job = await api.syncIngresos();
+      if (type === 'campo') job = await api.syncCampo();
+      if (type === 'todo') job = await api.syncTodo();
+
+      // El backend responde con un job en segundo plano; esperamos a que termine
+      const final = await api.esperarSync(job);
 
       setMessage({
-        type: 'success',
-        text: response.mensaje || `Sincronización de ${type} completada.`
+        type: final.estado === 'error' ? 'error' : 'success',
+        text: final.resultado?.mensaje || final.resultado?.message || `Sincronización de ${type} completada.`
       });
-    } catch (error) {
+    } catch (error: any) {
       console.error(error);
-      setMessage({ type: 'error', text: 'Error al conectar con el servidor.' });
+      // 409: ya corre otra sincronización sobre estas hojas (no se lanzó nada nuevo)
+      if (error?.response?.status === 409) {
+        setMessage({ type: 'error', text: error.response.data?.detail?.mensaje || 'Ya hay una sincronización en curso; intenta en unos minutos.' });
+      } else {
+        setMessage({ type: 'error', text: 'Error al conectar con el servidor.' });
+      }
     } finally {
       setLoading(false);
     }
@@ -39,6 +48,14 @@ export default function Config() {
         <p className="text-slate-500 text-sm mt-1">
           Administra la sincronización manual con Google Sheets.
         </p>
+        <button
+          onClick={() => handleSync('todo')}
+          disabled={loading}
+          className="mt-4 flex items-center justify-center gap-2 px-4 py-2.5 bg-blue-600 text-white font-medium rounded-xl hover:bg-blue-700 transition-colors disabled:opacity-50"
+        >
+          {loading ? <RefreshCw className="animate-spin" size={18}/> : <Play size={18}/>}
+          Sincronizar Todo
+        </button>
       </div>
 
       {/* Mensajes de Estado */}
@@ -3,34 +3,34 @@ import { Users, RefreshCw, CalendarDays, X, TrendingUp, AlertCircle, CheckCircle
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Cell } from 'recharts';
 import { api } from '../services/api';
 
-// 1. INTERFAZ QUE COINCIDE CON TU BACKEND ACTUAL (Schemas.py)
-interface Trabajo {
-    id_appsheet: string;
-    no_orden_taller?: string;
-    no_orden_campo?: string;
-    estado?: string;
-    fecha_ingreso?: string;
-    dano_reportado?: string;
-
-    // Relación nueva (Backend actualizado)
-    tecnico_rel?: {
-        id: number;
-        nombre_completo: string;
-    };
-
-    // Campo antiguo (por si acaso quedan datos viejos)
-    tecnico_ejecucion?: string;
+// 1. RESPUESTA DE /api/trabajos/summary (conteos calculados en el servidor)
+interface ConteoResumen {
+    id: number | null;
+    nombre: string;
+    total: number;
+}
 
-    // Relación Equipo (CRÍTICO PARA TU IDEA)
-    equipo_rel?: {
-        serie?: string;
-        modelo?: string;
-        marca?: string;
-    };
+interface ResumenTrabajos {
+    total: number;
+    terminados: number;
+    en_proceso: number;
+    por_estado: Record<string, number>;
+    por_servicio: ConteoResumen[];
+    por_tecnico: ConteoResumen[];
+    reincidencias: number;
+    ventana_dias: number;
+    calidad: number;
 }
 
+// Fecha local en formato YYYY-MM-DD (toISOString la pasaría a UTC)
+const aFechaISO = (fecha: Date) => {
+    const mes = String(fecha.getMonth() + 1).padStart(2, '0');
+    const dia = String(fecha.getDate()).padStart(2, '0');
+    return `${fecha.getFullYear()}-${mes}-${dia}`;
+};
+
 export default function DashboardHome() {
-    const [trabajos, setTrabajos] = useState<Trabajo[]>([]);
+    const [resumen, setResumen] = useState<ResumenTrabajos | null>(null);
     const [loading, setLoading] = useState(true);
     const [periodo, setPeriodo] = useState<'dia' | 'semana' | 'mes' | 'anio' | 'todo'>('mes');
     const [showTechModal, setShowTechModal] = useState(false);
@@ -39,17 +39,34 @@ export default function DashboardHome() {
     const [selectedYear, setSelectedYear] = useState(new Date().getFullYear());
     const [selectedMonth, setSelectedMonth] = useState(new Date().getMonth());
 
+    // --- 2. RANGO DE FECHAS DEL PERIODO (lo filtra el servidor) ---
+    const rango = useMemo((): { inicio?: string; fin?: string } => {
+        const hoy = new Date();
+        if (periodo === 'dia') return { inicio: aFechaISO(hoy), fin: aFechaISO(hoy) };
+        if (periodo === 'semana') {
+            const hace7dias = new Date();
+            hace7dias.setDate(hace7dias.getDate() - 7);
+            return { inicio: aFechaISO(hace7dias), fin: aFechaISO(hoy) };
+        }
+        if (periodo === 'mes') {
+            return {
+                inicio: aFechaISO(new Date(selectedYear, selectedMonth, 1)),
+                fin: aFechaISO(new Date(selectedYear, selectedMonth + 1, 0)),
+            };
+        }
+        if (periodo === 'anio') return { inicio: `${selectedYear}-01-01`, fin: `${selectedYear}-12-31` };
+        return {};
+    }, [periodo, selectedMonth, selectedYear]);
+
     useEffect(() => {
         loadData();
-    }, []);
+    }, [rango]);
 
     const loadData = async () => {
         setLoading(true);
         try {
-            // Asegúrate de que api.getTrabajos llama a /api/trabajos
-            const data = await api.getTrabajos();
-            console.log("Datos recibidos:", data); // Para depuración
-            setTrabajos(data);
+            const data = await api.getResumenTrabajos(rango.inicio, rango.fin);
+            setResumen(data);
         } catch (error) {
             console.error("Error cargando dashboard", error);
         } finally {
@@ -57,42 +74,6 @@ export default function DashboardHome() {
         }
     };
 
-    // --- 2. FILTRO DE TIEMPO PERSONALIZABLE ---
-    const trabajosFiltrados = useMemo(() => {
-        if (periodo === 'todo') return trabajos;
-
-        const hoy = new Date();
-        const inicioDia = new Date(hoy.setHours(0,0,0,0));
-
-        return trabajos.filter(t => {
-            if (!t.fecha_ingreso) return false;
-            // Convertimos fecha string a objeto Date (ajustando zona horaria si es necesario)
-            const fechaTrabajo = new Date(t.fecha_ingreso);
-            // Parche rápido para fechas UTC que pueden caer el día anterior
-            const fechaAjustada = new Date(fechaTrabajo.getTime() + (fechaTrabajo.getTimezoneOffset() * 60000));
-
-            if (periodo === 'dia') {
-                return fechaAjustada.getDate() === new Date().getDate() &&
-                       fechaAjustada.getMonth() === new Date().getMonth() &&
-                       fechaAjustada.getFullYear() === new Date().getFullYear();
-            }
-            if (periodo === 'semana') {
-                const hace7dias = new Date();
-                hace7dias.setDate(hace7dias.getDate() - 7);
-                return fechaAjustada >= hace7dias;
-            }
-            if (periodo === 'mes') {
-                // Filtra por el mes y año seleccionados en los dropdowns
-                return fechaAjustada.getMonth() === selectedMonth &&
-                       fechaAjustada.getFullYear() === selectedYear;
-            }
-            if (periodo === 'anio') {
-                 return fechaAjustada.getFullYear() === selectedYear;
-            }
-            return true;
-        });
-    }, [trabajos, periodo, selectedMonth, selectedYear]);
-
     // Calcular el rango de fechas mostrado para el título
     const rangoFechasTexto = useMemo(() => {
         if (periodo === 'todo') return 'Histórico Completo';
@@ -107,97 +88,21 @@ export default function DashboardHome() {
     }, [periodo, selectedMonth, selectedYear]);
 
 
-    // --- 3. CÁLCULO INTELIGENTE DE CALIDAD (ALGORITMO DE REINCIDENCIA) ---
+    // --- 3. KPIs (el servidor ya trae los conteos y la calidad por reingresos) ---
     const stats = useMemo(() => {
-        const total = trabajosFiltrados.length;
-
-        // --- A. Contadores Básicos ---
-        const enProceso = trabajosFiltrados.filter(t => {
-            const st = (t.estado || '').toUpperCase();
-            return !st.includes('ENTREGADO') && !st.includes('FINALIZADO') && !st.includes('REALIZADO') && !st.includes('CERRADO');
-        }).length;
-
-        const terminados = trabajosFiltrados.filter(t => {
-            const st = (t.estado || '').toUpperCase();
-            return st.includes('ENTREGADO') || st.includes('FINALIZADO') || st.includes('REALIZADO') || st.includes('CERRADO');
-        }).length;
-
-        // --- B. ALGORITMO DE REINCIDENCIA ---
-        // 1. Agrupar historial por Serie (usando todos los trabajos para ver historial)
-        const historialEquipos: Record<string, Trabajo[]> = {};
-
-        trabajos.forEach(t => {
-            const serie = t.equipo_rel?.serie;
-            if (serie && serie.length > 3 && serie.toUpperCase() !== "S/N") {
-                if (!historialEquipos[serie]) historialEquipos[serie] = [];
-                historialEquipos[serie].push(t);
-            }
-        });
-
-        let reincidenciasCriticas = 0;
-        const seriesConProblemas = new Set<string>();
-
-        // 2. Analizar cada equipo
-        Object.entries(historialEquipos).forEach(([serie, historial]) => {
-            // Ordenamos por fecha
-            historial.sort((a, b) => new Date(a.fecha_ingreso || '').getTime() - new Date(b.fecha_ingreso || '').getTime());
-
-            for (let i = 1; i < historial.length; i++) {
-                const visitaActual = historial[i];
-                const visitaAnterior = historial[i - 1];
-
-                const fechaActual = new Date(visitaActual.fecha_ingreso || '');
-                // Verificar si esta visita está dentro del periodo filtrado
-                const esDelPeriodo = trabajosFiltrados.some(tf => tf.id_appsheet === visitaActual.id_appsheet);
-
-                if (esDelPeriodo) {
-                    const fechaAnterior = new Date(visitaAnterior.fecha_ingreso || '');
-                    const diffTiempo = Math.abs(fechaActual.getTime() - fechaAnterior.getTime());
-                    const diffDias = Math.ceil(diffTiempo / (1000 * 60 * 60 * 24));
-
-                    // REGLA: Si vuelve en menos de 45 días
-                    if (diffDias <= 45) {
-                        reincidenciasCriticas++;
-                        seriesConProblemas.add(serie);
-                    }
-                }
-            }
-        });
-
-        // --- C. KPI FINAL: CALIDAD TÉCNICA ---
-        let calidadTecnica = 100;
-        if (total > 0) {
-            const porcentajeFallas = (reincidenciasCriticas / total) * 100;
-            calidadTecnica = Math.max(0, 100 - porcentajeFallas);
-        }
-
-        // --- D. Agrupación Técnicos ---
-        const tecnicosMap: Record<string, number> = {};
-        trabajosFiltrados.forEach(t => {
-            let nombre = "SIN ASIGNAR";
-            if (t.tecnico_rel?.nombre_completo) {
-                nombre = t.tecnico_rel.nombre_completo.trim().toUpperCase();
-            } else if (t.tecnico_ejecucion) {
-                nombre = t.tecnico_ejecucion.trim().toUpperCase();
-            }
-            if (nombre !== "SIN ASIGNAR" && nombre !== "0" && nombre.length > 2) {
-                tecnicosMap[nombre] = (tecnicosMap[nombre] || 0) + 1;
-            }
-        });
-
-        const listaTecnicos = Object.entries(tecnicosMap)
-            .map(([name, count]) => ({ name, count }))
-            .sort((a, b) => b.count - a.count);
+        const listaTecnicos = (resumen?.por_tecnico ?? [])
+            .filter(t => t.id !== null && t.nombre.trim().length > 2)
+            .map(t => ({ name: t.nombre.trim().toUpperCase(), count: t.total }));
 
         return {
-            total,
-            enProceso,
-            terminados,
-            reincidenciasCriticas,
-            calidad: Math.round(calidadTecnica),
+            total: resumen?.total ?? 0,
+            enProceso: resumen?.en_proceso ?? 0,
+            terminados: resumen?.terminados ?? 0,
+            reincidenciasCriticas: resumen?.reincidencias ?? 0,
+            calidad: Math.round(resumen?.calidad ?? 100),
             listaTecnicos
         };
-    }, [trabajosFiltrados, trabajos]);
+    }, [resumen]);
 
 
     if (loading) return (
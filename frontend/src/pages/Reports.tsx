@@ -1,4 +1,4 @@
-import { useEffect, useState, useMemo } from 'react';
+import { useEffect, useState } from 'react';
 import { Download, Search, ChevronLeft, ChevronRight, Eye, RefreshCw, Filter, Calendar } from 'lucide-react';
 import { api } from '../services/api';
 
@@ -21,20 +21,36 @@ export default function Reports() {
     const [trabajos, setTrabajos] = useState<Trabajo[]>([]);
     const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState('');
+    const [busqueda, setBusqueda] = useState('');
+    const [totalRegistros, setTotalRegistros] = useState(0);
+    // Cursores de cada página visitada: cursores[i] trae la página i + 1 (la 1ª va sin cursor)
+    const [cursores, setCursores] = useState<(string | null)[]>([null]);
+    const [siguiente, setSiguiente] = useState<string | null>(null);
     const [currentPage, setCurrentPage] = useState(1);
     const itemsPerPage = 15; // Mostramos 15 registros por página
 
-    // 1. Cargar datos al iniciar
+    // 1. La búsqueda se manda al servidor un momento después de dejar de escribir
     useEffect(() => {
-        loadData();
-    }, []);
+        const espera = setTimeout(() => setBusqueda(searchTerm.trim()), 300);
+        return () => clearTimeout(espera);
+    }, [searchTerm]);
 
-    const loadData = async () => {
+    // 2. Cada búsqueda nueva vuelve a la página 1
+    useEffect(() => {
+        setCursores([null]);
+        setCurrentPage(1);
+        loadPage(1, null);
+    }, [busqueda]);
+
+    const loadPage = async (pagina: number, cursor: string | null) => {
         setLoading(true);
         try {
-            // Traemos hasta 5000 registros para tener toda la base
-            const data = await api.getTrabajos();
-            setTrabajos(data);
+            // El servidor filtra, ordena y pagina: solo viajan las filas de la página
+            const data = await api.buscarTrabajos({ q: busqueda }, cursor, itemsPerPage);
+            setTrabajos(data.filas);
+            setSiguiente(data.siguiente);
+            if (data.total != null) setTotalRegistros(data.total);
+            setCurrentPage(pagina);
         } catch (error) {
             console.error("Error cargando reportes:", error);
         } finally {
@@ -42,34 +58,25 @@ export default function Reports() {
         }
     };
 
-    // 2. LÓGICA DE BÚSQUEDA MULTI-CAMPO
-    // Usamos useMemo para que el filtrado sea instantáneo sin bloquear la pantalla
-    const filteredData = useMemo(() => {
-        if (!searchTerm) return trabajos;
-
-        const term = searchTerm.toLowerCase();
+    const loadData = () => {
+        setCursores([null]);
+        loadPage(1, null);
+    };
 
-        return trabajos.filter(item => {
-            // 1. Buscar por Número de Orden
-            const orden = (item.numero_orden_final || '').toLowerCase();
-            // 2. Buscar por Nombre de Cliente
-            const cliente = (item.cliente_rel?.nombre_fiscal || '').toLowerCase();
-            // 3. Buscar por RUC
-            const ruc = (item.cliente_rel?.ruc || '').toLowerCase();
-            // 4. Buscar por Técnico
-            const tecnico = (item.tecnico_ejecucion || '').toLowerCase();
+    const irSiguiente = () => {
+        if (!siguiente) return;
+        setCursores(prev => [...prev.slice(0, currentPage), siguiente]);
+        loadPage(currentPage + 1, siguiente);
+    };
 
-            // Si coincide con cualquiera, lo mostramos
-            return orden.includes(term) || cliente.includes(term) || ruc.includes(term) || tecnico.includes(term);
-        });
-    }, [trabajos, searchTerm]);
+    const irAnterior = () => {
+        if (currentPage === 1) return;
+        loadPage(currentPage - 1, cursores[currentPage - 2]);
+    };
 
-    // 3. Lógica de Paginación
-    const totalPages = Math.ceil(filteredData.length / itemsPerPage);
-    const currentData = filteredData.slice(
-        (currentPage - 1) * itemsPerPage,
-        currentPage * itemsPerPage
-    );
+    // 3. Paginación (el total llega en X-Total-Count)
+    const totalPages = Math.ceil(totalRegistros / itemsPerPage);
+    const currentData = trabajos;
 
    // Helper para colorear el estado (VERSIÓN SEGURA)
     const getStatusColor = (estado: string | null | undefined) => {
@@ -91,7 +98,7 @@ export default function Reports() {
                 <div>
                     <h1 className="text-2xl font-bold text-slate-800">Base de Datos de Ingresos</h1>
                     <p className="text-slate-500">
-                        Mostrando {filteredData.length} registros totales
+                        Mostrando {totalRegistros} registros totales
                         {loading && ' (Actualizando...)'}
                     </p>
                 </div>
@@ -124,7 +131,7 @@ export default function Reports() {
                         <input
                             type="text"
                             value={searchTerm}
-                            onChange={(e) => { setSearchTerm(e.target.value); setCurrentPage(1); }} // Resetea a pág 1 al buscar
+                            onChange={(e) => setSearchTerm(e.target.value)} // Resetea a pág 1 al buscar
                             placeholder="Buscar por Orden, Técnico o Cliente..."
                             className="w-full pl-10 pr-4 py-2.5 bg-white border border-slate-200 rounded-xl focus:outline-none focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500 transition-all shadow-sm"
                         />
@@ -247,12 +254,12 @@ export default function Reports() {
                 {/* Footer de Paginación */}
                 <div className="flex items-center justify-between px-6 py-4 border-t border-slate-100 bg-slate-50">
                     <span className="text-sm text-slate-500 hidden sm:block">
-                        Mostrando {Math.min(filteredData.length, (currentPage - 1) * itemsPerPage + 1)} - {Math.min(filteredData.length, currentPage * itemsPerPage)} de {filteredData.length} registros
+                        Mostrando {Math.min(totalRegistros, (currentPage - 1) * itemsPerPage + 1)} - {Math.min(totalRegistros, (currentPage - 1) * itemsPerPage + currentData.length)} de {totalRegistros} registros
                     </span>
                     <div className="flex items-center gap-2">
                         <button
-                            onClick={() => setCurrentPage(prev => Math.max(prev - 1, 1))}
-                            disabled={currentPage === 1}
+                            onClick={irAnterior}
+                            disabled={currentPage === 1 || loading}
                             className="p-2 bg-white border border-slate-200 rounded-lg hover:bg-slate-50 disabled:opacity-50 text-slate-600 cursor-pointer disabled:cursor-not-allowed shadow-sm"
                         >
                             <ChevronLeft size={18} />
@@ -263,8 +270,8 @@ export default function Reports() {
                         </div>
 
                         <button
-                            onClick={() => setCurrentPage(prev => Math.min(prev + 1, totalPages))}
-                            disabled={currentPage === totalPages || totalPages === 0}
+                            onClick={irSiguiente}
+                            disabled={!siguiente || loading}
                             className="p-2 bg-white border border-slate-200 rounded-lg hover:bg-slate-50 disabled:opacity-50 text-slate-600 cursor-pointer disabled:cursor-not-allowed shadow-sm"
                         >
                             <ChevronRight size={18} />
@@ -1,5 +1,85 @@
 import axios from 'axios';
 
+export interface SyncJob {
+    job_id: string | null;
+    hoja: string;
+    estado: 'pendiente' | 'ejecutando' | 'completado' | 'error' | 'abandonado';
+    filas_leidas?: number;
+    filas_transformadas?: number;
+    filas_cargadas?: number;
+    segundos?: number;
+    resultado?: { status?: string; mensaje?: string; message?: string } | null;
+}
+
+const getSyncJob = async (jobId: string): Promise<SyncJob> => {
+    const response = await axios.get(`/api/sync/jobs/${jobId}`);
+    return response.data;
+};
+
+// Listados paginados por cursor: se sigue el header X-Next-Cursor hasta `maximo` filas (el tope
+// que tenían las tablas antes del cursor); para ver más, las páginas buscan en el servidor
+const getPaginado = async (url: string, maximo: number, limite = 1000) => {
+    const filas: any[] = [];
+    let cursor: string | null = null;
+    do {
+        const params = new URLSearchParams({ limit: String(Math.min(limite, maximo - filas.length)) });
+        if (cursor) params.append('cursor', cursor);
+        const response = await axios.get(`${url}?${params.toString()}`);
+        filas.push(...response.data);
+        cursor = response.headers['x-next-cursor'] ?? null;
+    } while (cursor && filas.length < maximo);
+    return filas;
+};
+
+// Una página filtrada/buscada en el servidor (?q=, filtros, orden). `total` solo viene en la
+// primera página (sin cursor): X-Total-Count se calcula una vez por búsqueda.
+export interface Pagina<T = any> {
+    filas: T[];
+    siguiente: string | null;
+    total: number | null;
+}
+
+const getPagina = async (url: string, filtros: Record<string, string | undefined>, cursor: string | null, limite: number): Promise<Pagina> => {
+    const params = new URLSearchParams({ limit: String(limite) });
+    for (const [clave, valor] of Object.entries(filtros)) {
+        if (valor) params.append(clave, valor);
+    }
+    if (cursor) params.append('cursor', cursor);
+    const response = await axios.get(`${url}?${params.toString()}`);
+    const total = response.headers['x-total-count'];
+    return {
+        filas: response.data,
+        siguiente: response.headers['x-next-cursor'] ?? null,
+        total: total != null ? Number(total) : null,
+    };
+};
+
+// /api/trabajos?formato=compacto: las órdenes traen IDs y las relaciones vienen una sola vez.
+// Se rearman los *_rel compartiendo el mismo objeto, así las páginas usan la forma de siempre.
+// Como getPaginado, se detiene en `maximo` órdenes (el tope anterior de la tabla).
+const getTrabajosCompactos = async (maximo = 5000, limite = 2000) => {
+    const ordenes: any[] = [];
+    let cursor: string | null = null;
+    do {
+        const params = new URLSearchParams({ limit: String(Math.min(limite, maximo - ordenes.length)), formato: 'compacto' });
+        if (cursor) params.append('cursor', cursor);
+        const response = await axios.get(`/api/trabajos?${params.toString()}`);
+        const { clientes, industrias, tecnicos, servicios, equipos } = response.data;
+        for (const c of Object.values<any>(clientes)) {
+            c.industria_rel = c.industria_id != null ? industrias[c.industria_id] ?? null : null;
+        }
+        for (const o of response.data.ordenes) {
+            o.cliente_rel = o.cliente_id != null ? clientes[o.cliente_id] ?? null : null;
+            o.tecnico_rel = o.tecnico_id != null ? tecnicos[o.tecnico_id] ?? null : null;
+            o.servicio_rel = o.servicio_id != null ? servicios[o.servicio_id] ?? null : null;
+            o.equipo_rel = o.equipo_id != null ? equipos[o.equipo_id] ?? null : null;
+            ordenes.push(o);
+        }
+        cursor = response.headers['x-next-cursor'] ?? null;
+    } while (cursor && ordenes.length < maximo);
+    return ordenes;
+};
+
 export const api = {
     // 1. Sincronización (ETL)
     syncClientes: async () => {
@@ -17,22 +97,51 @@ export const api = {
         return response.data;
     },
 
-    // 2. Obtención de Datos Reales (Tablas)
-    getTrabajos: async () => {
-        const response = await axios.get('/api/trabajos?limit=5000');
+    syncTodo: async () => {
+        const response = await axios.post('/api/sync/todo');
         return response.data;
     },
 
-    getClientes: async () => {
-        const response = await axios.get('/api/clientes?limit=5000');
+    // Las sincronizaciones corren en segundo plano: consultamos el job hasta que termine
+    getSyncJob,
+
+    esperarSync: async (job: SyncJob, intervaloMs = 1500) => {
+        if (!job.job_id) throw new Error(`Sin job para esperar (estado: ${job.estado})`);
+        let actual = job;
+        while (actual.job_id && (actual.estado === 'pendiente' || actual.estado === 'ejecutando')) {
+            await new Promise(resolve => setTimeout(resolve, intervaloMs));
+            actual = await getSyncJob(actual.job_id);
+        }
+        return actual;
+    },
+
+    // 2. Obtención de Datos Reales (Tablas)
+    getTrabajos: async () => getTrabajosCompactos(),
+
+    getClientes: async () => getPaginado('/api/clientes', 5000),
+
+    buscarTrabajos: async (filtros: Record<string, string | undefined>, cursor: string | null = null, limite = 15) =>
+        getPagina('/api/trabajos', filtros, cursor, limite),
+
+    buscarClientes: async (filtros: Record<string, string | undefined>, cursor: string | null = null, limite = 10) =>
+        getPagina('/api/clientes', filtros, cursor, limite),
+
+    // Resumen de estados para la página de inicio (conteos calculados en el servidor)
+    getResumenTrabajos: async (startDate?: string, endDate?: string) => {
+        const params = new URLSearchParams();
+        if (startDate) params.append('start_date', startDate);
+        if (endDate) params.append('end_date', endDate);
+
+        const response = await axios.get(`/api/trabajos/summary?${params.toString()}`);
         return response.data;
     },
 
     // 3. NUEVO: Analítica y Gráficos (Dashboard)
-    getAnalytics: async (startDate?: string, endDate?: string) => {
+    getAnalytics: async (startDate?: string, endDate?: string, granularity?: string) => {
         const params = new URLSearchParams();
         if (startDate) params.append('start_date', startDate);
         if (endDate) params.append('end_date', endDate);
+        if (granularity) params.append('granularity', granularity);
 
         const response = await axios.get(`/api/analytics/dashboard?${params.toString()}`);
         return response.data;
@@ -47,8 +156,5 @@ export const api = {
         const response = await axios.get(`/api/analytics/insight?${params.toString()}`);
         return response.data;
     },
-getCampo: async () => {
-        const response = await axios.get('/api/campo?limit=1000');
-        return response.data;
-    },
+getCampo: async () => getPaginado('/api/campo', 1000),
 };
\ No newline at end of file